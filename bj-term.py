@@ -1,71 +1,51 @@
 # Import necessary modules
+import time
+
+# Startup timing for --startup-profile, as (phase, seconds) in order. The
+# interpreter's own startup can only be seen as the CPU time it used.
+startup_phases = [('interpreter (cpu)', time.process_time())]
+_startup_clock = time.perf_counter()
+
+def startup_mark(phase):
+    """Record the time since the previous mark under `phase`."""
+    global _startup_clock
+    now = time.perf_counter()
+    startup_phases.append((phase, now - _startup_clock))
+    _startup_clock = now
+
 import os
 import sys
 import random
-from art import *
 import argparse
-import json
-from datetime import datetime
+startup_mark('stdlib imports')
 from colorama import init, Fore, Back, Style
-import time
-
-# Initialize colorama for cross-platform colored output
-init(autoreset=True)
-print(Back.BLACK + Fore.WHITE, end='')
-
-class Stats:
-    def __init__(self):
-        self.games_played = 0
-        self.wins = 0
-        self.losses = 0
-        self.pushes = 0
-        self.biggest_win = 0
-        self.biggest_loss = 0
-        self.current_streak = 0
-        self.best_streak = 0
-        self.hot_streak = 0
-
-    def to_dict(self):
-        return {
-            'games_played': self.games_played,
-            'wins': self.wins,
-            'losses': self.losses,
-            'pushes': self.pushes,
-            'biggest_win': self.biggest_win,
-            'biggest_loss': self.biggest_loss,
-            'current_streak': self.current_streak,
-            'best_streak': self.best_streak,
-            'hot_streak': self.hot_streak
-        }
-
-    def from_dict(self, data):
-        self.games_played = data.get('games_played', 0)
-        self.wins = data.get('wins', 0)
-        self.losses = data.get('losses', 0)
-        self.pushes = data.get('pushes', 0)
-        self.biggest_win = data.get('biggest_win', 0)
-        self.biggest_loss = data.get('biggest_loss', 0)
-        self.current_streak = data.get('current_streak', 0)
-        self.best_streak = data.get('best_streak', 0)
-        self.hot_streak = data.get('hot_streak', 0)
-
-    def update(self, result, amount):
-        self.games_played += 1
-        if result == "win":
-            self.wins += 1
-            self.current_streak = max(1, self.current_streak + 1)
-            self.biggest_win = max(self.biggest_win, amount)
-            self.hot_streak += 1
-        elif result == "loss":
-            self.losses += 1
-            self.current_streak = min(-1, self.current_streak - 1)
-            self.biggest_loss = min(self.biggest_loss, amount)
-            self.hot_streak = 0
-        else:  # push
-            self.pushes += 1
-            self.current_streak = 0
-            self.hot_streak = 0
-        self.best_streak = max(self.best_streak, abs(self.current_streak))
+startup_mark('colorama import')
+from bj_anim import Animator
+from bj_core import MAX_DECKS, MIN_DECKS, Hand, Shoe, Strategy, calculate_score
+from bj_count import SYSTEMS as COUNT_SYSTEMS, CardCounter
+from bj_journal import HandJournal
+from bj_keys import KeyInput
+from bj_odds import DealerOdds
+from bj_render import FrameRenderer
+from bj_rng import add_rng_argument, make_rng
+from bj_rules import add_rule_arguments, rules_from_args
+import bj_stats
+from bj_table import TableSession
+from bj_view import display_title, print_table
+startup_mark('game modules')
+
+# All game screens are drawn through one frame renderer
+renderer = FrameRenderer()
+
+# Functions timed by --profile. The prompts of the key reader are timed as
+# input, which covers the time spent waiting on the player.
+PROFILED_PHASES = ('clear_screen', 'display_hands', 'save_game', 'record_hand', 'play_sound',
+                   'dealer_turn', 'determine_winner', 'get_player_action')
+
+class Stats(bj_stats.Stats):
+    """Session statistics, plus the statistics screen."""
+
+    __slots__ = ()
 
     def display(self, current_balance=None):
         clear_screen()
@@ -80,28 +60,50 @@ class Stats:
 {Back.BLACK}    {Fore.RED}Biggest Loss: ${stats.biggest_loss}{Style.RESET_ALL}{Back.BLACK}
 {Back.BLACK}    {Fore.CYAN}Current Streak: {stats.current_streak}{Style.RESET_ALL}{Back.BLACK}
 {Back.BLACK}    {Fore.CYAN}Best Streak: {stats.best_streak}{Style.RESET_ALL}{Back.BLACK}
+"""
+        if stats.measured > 1:
+            low, high = stats.confidence_interval()
+            p5, median, p95 = (stats.quantile(q) for q in (0.05, 0.5, 0.95))
+            stats_display += f"""
+{Back.BLACK}    {Fore.WHITE}Net Result: ${stats.net:+}  Per Hand: ${stats.mean:+.2f} ± ${stats.std_dev:.2f}{Style.RESET_ALL}{Back.BLACK}
+{Back.BLACK}    {Fore.WHITE}95% Interval Per Hand: ${low:+.2f} to ${high:+.2f}{Style.RESET_ALL}{Back.BLACK}
+{Back.BLACK}    {Fore.WHITE}Last {len(stats.window)} Hands: ${stats.window_mean:+.2f} per hand{Style.RESET_ALL}{Back.BLACK}
+{Back.BLACK}    {Fore.WHITE}Payouts: 5% ${p5:+.0f}  median ${median:+.0f}  95% ${p95:+.0f}{Style.RESET_ALL}{Back.BLACK}
 """
         if current_balance is not None:
             stats_display += f"\n{Back.BLACK}    {Fore.YELLOW}Current Balance: ${current_balance}{Style.RESET_ALL}{Back.BLACK}"
+        stats_display += f"\n\n{Back.BLACK}    {Fore.CYAN}Table: {rules.describe()}{Style.RESET_ALL}{Back.BLACK}"
+        stats_display += f"\n{Back.BLACK}    {Fore.CYAN}House Edge: {house_edge():.2%}{Style.RESET_ALL}{Back.BLACK}"
+        if history:
+            stats_display += history_report()
         
         print(stats_display)
-        print(f"\n{Back.BLACK}    {Fore.CYAN}Press Enter to return to game...{Style.RESET_ALL}")
-        input()
-
-class Deck:
-    def __init__(self):
-        self.reset()
-        
-    def reset(self):
-        suits = ["Spades", "Diamonds", "Hearts", "Clubs"]
-        values = ["2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A"]
-        self.cards = [{"suit": s, "value": v} for s in suits for v in values]
-        random.shuffle(self.cards)
-        
-    def deal(self):
-        if len(self.cards) < 10:  # Reshuffle when deck gets low
-            self.reset()
-        return self.cards.pop()
+        print(f"\n{Back.BLACK}    {Fore.CYAN}Press {keys.any_key} to return to game...{Style.RESET_ALL}")
+        keys.wait()
+
+def house_edge():
+    """The house edge at this table, from bj_edge's cache (worked out on first use)."""
+    from bj_edge import cached_edge
+    return cached_edge(rules)
+
+def history_report():
+    """Aggregates from the hand history for the statistics screen."""
+    def line(label, hands, wins, net):
+        color = Fore.GREEN if net > 0 else Fore.RED if net < 0 else Fore.WHITE
+        return f"\n{Back.BLACK}      {label:<10} {hands:>7,} hands  {wins / hands:4.0%} won  {color}net {net:+,}{Style.RESET_ALL}{Back.BLACK}"
+
+    report = f"\n\n{Back.BLACK}    {Fore.CYAN}HAND HISTORY ({history.count():,} hands){Style.RESET_ALL}{Back.BLACK}"
+    week = history.results_by_bet(since=time.time() - 7 * 24 * 3600)
+    if week:
+        report += f"\n{Back.BLACK}    {Fore.WHITE}Last 7 days by bet:{Style.RESET_ALL}{Back.BLACK}"
+        for bet, hands, wins, net in week:
+            report += line(f"${bet}", hands, wins, net)
+    stiff = history.results_by_start(range(12, 17), False, range(7, 12))
+    if stiff:
+        report += f"\n{Back.BLACK}    {Fore.WHITE}Hard 12-16 against a dealer 7-A:{Style.RESET_ALL}{Back.BLACK}"
+        for score, hands, wins, net in stiff:
+            report += line(f"Hard {score}", hands, wins, net)
+    return report
 
 class Achievements:
     def __init__(self):
@@ -125,58 +127,56 @@ class Achievements:
             print(f"\n{Back.YELLOW}{Fore.BLACK} 🏆 Achievement Unlocked: {achievement['name']} - {achievement['desc']} 🏆 {Style.RESET_ALL}")
             play_sound('achievement')
 
-class Strategy:
-    @staticmethod
-    def get_basic_strategy(player_score, dealer_up_card_value, has_ace):
-        dealer_value = 10 if dealer_up_card_value in ['J', 'Q', 'K'] else (11 if dealer_up_card_value == 'A' else int(dealer_up_card_value))
-        
-        if has_ace:  # Soft hands
-            if player_score >= 19: return 'Stand'
-            if player_score == 18:
-                if dealer_value in [9, 10, 11]: return 'Hit'
-                return 'Stand'
-            return 'Hit'
-        else:  # Hard hands
-            if player_score >= 17: return 'Stand'
-            if player_score <= 11: return 'Hit'
-            if player_score >= 13 and dealer_value <= 6: return 'Stand'
-            return 'Hit'
+SAVE_FILE = 'blackjack_save.json'
 
 def save_game(balance, stats):
-    """Save the current game state to a file."""
-    save_data = {
-        'balance': balance,
-        'stats': stats.to_dict(),
-        'timestamp': datetime.now().isoformat()
-    }
-    
-    with open('blackjack_save.json', 'w') as f:
-        json.dump(save_data, f)
-    print(f"{Back.BLACK}{Fore.GREEN}    Game saved successfully!{Style.RESET_ALL}")
+    """Compact the game state into the save file and wait for it to be written."""
+    journal.compact({'balance': balance, 'stats': stats.to_dict()})
+    journal.close()
+    if journal.error:
+        print(f"{Back.BLACK}{Fore.RED}    Could not save the game: {journal.error}{Style.RESET_ALL}")
+    else:
+        print(f"{Back.BLACK}{Fore.GREEN}    Game saved successfully!{Style.RESET_ALL}")
+
+def record_hand(player_hand, dealer_hand, bet, outcome, amount, balance, actions):
+    """Journal one finished hand. Writing happens in the background."""
+    if history:
+        history.add(bet, amount, outcome, player_hand.cards, dealer_hand.cards, actions)
+    if recorder:
+        recorder.hand(bet // 2 if actions == 'D' else bet, actions, balance)
+    journal.append({'kind': 'hand', 'bet': bet, 'outcome': outcome, 'result': bj_stats.result_for(amount),
+                    'amount': amount, 'balance': balance})
+    if journal.compaction_due:
+        journal.compact({'balance': balance, 'stats': stats.to_dict()})
 
 def load_game():
-    try:
-        with open("blackjack_save.json", "r") as f:
-            data = json.load(f)
+    """Load the save file and replay any hands journaled after it."""
+    global journal
+    journal = HandJournal(SAVE_FILE)
+    snapshot, records = journal.recover()
+    balance, stats = 100, Stats()
+    if snapshot:
+        balance = snapshot['balance']
+        stats.from_dict(snapshot['stats'])
+    for record in records:
+        if record['kind'] == 'hand':
+            stats.update(record['result'], record['amount'])
+        elif record['kind'] == 'reset':
             stats = Stats()
-            stats.from_dict(data["stats"])
-            return data["balance"], stats
-    except FileNotFoundError:
-        return 100, Stats()
-
-# Suppress pygame welcome message
-old_stdout = sys.stdout
-sys.stdout = open(os.devnull, 'w')
-
-import pygame
-from pygame import mixer
-
-sys.stdout = old_stdout
+        balance = record['balance']
+    return balance, stats
 
 # Dictionary to store loaded sounds
 sounds = {}
 
-def load_sounds():
+def init_sound():
+    """Import pygame and start the mixer. Only called when sound is on."""
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')  # Suppress pygame welcome message
+    from pygame import mixer
+    mixer.init()
+    return mixer
+
+def load_sounds(mixer):
     """Load all sound files into memory"""
     sound_files = {
         'deal': 'deal.wav',
@@ -203,48 +203,7 @@ def play_sound(sound_name):
 
 # Clear the terminal or console screen
 def clear_screen():
-    os.system('clear' if os.name == 'posix' else 'cls')
-    try:
-        # Try to get terminal size and fill with black background
-        columns, lines = os.get_terminal_size()
-        print(Back.BLACK + ' ' * columns * lines, end='')
-        print('\033[H', end='')  # Move cursor to top-left
-    except OSError:
-        # Fallback if we can't get terminal size
-        print(Back.BLACK + '\n' * 100, end='')
-        print('\033[H', end='')  # Move cursor to top-left
-
-# Initialize pygame and mixer
-pygame.init()
-mixer.init()
-load_sounds()
-
-# Function to randomly deal a card
-def deal_card():
-    suits = ["Spades", "Diamonds", "Hearts", "Clubs"]
-    values = ["2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A"]
-    card = {"suit": random.choice(suits), "value": random.choice(values)}
-    return card
-
-# Function to calculate the score of a hand
-def calculate_score(hand):
-    total = 0
-    aces = 0
-    for card in hand:
-        value = card["value"]
-        if value == "A":
-            aces += 1
-            total += 11
-        elif value in ["K", "Q", "J"]:
-            total += 10
-        else:
-            total += int(value)
-
-    while total > 21 and aces > 0:
-        total -= 10
-        aces -= 1
-
-    return total
+    renderer.clear()
 
 # Function to ask user if they want to play again
 def play_again():
@@ -260,44 +219,10 @@ def play_again():
 # This function displays the hands of both the player and the dealer
 def display_hands(player_hand, dealer_hand, hidden=True, balance=None, dealer_action=None):
     """Display the current state of the game."""
-    clear_screen()
-    display_title(balance)
-    
-    # Display dealer's hand
-    print(f"{Back.BLACK}    {Fore.CYAN}♠ ♥ DEALER'S HAND ♦ ♣{Style.RESET_ALL}{Back.BLACK}")
-    if hidden:
-        print(f"{Back.BLACK}    {Fore.YELLOW}Hidden{Style.RESET_ALL}{Back.BLACK}")
-        print_cards([reg_card_visual(c) for c in dealer_hand[:1]] + [hidden_card()], padding=f"{Back.BLACK}    ")
-    else:
-        dealer_score = calculate_score(dealer_hand)
-        color_dealer = Fore.GREEN if dealer_score <= 21 else Fore.RED
-        dealer_status = f"{Back.BLACK}    {color_dealer}{dealer_score}"
-        if dealer_action:
-            dealer_status += f"    {Fore.CYAN}{dealer_action}{Style.RESET_ALL}{Back.BLACK}"
-        else:
-            dealer_status += f"{Style.RESET_ALL}{Back.BLACK}"
-        print(dealer_status)
-        print_cards([reg_card_visual(c) for c in dealer_hand], padding=f"{Back.BLACK}    ")
-    
-    # Display player's hand
-    print(f"{Back.BLACK}\n{Back.BLACK}")
-    print(f"{Back.BLACK}    {Fore.CYAN}♠ ♥ PLAYER'S HAND ♦ ♣{Style.RESET_ALL}{Back.BLACK}")
-    player_score = calculate_score(player_hand)
-    color = Fore.GREEN if player_score <= 21 else Fore.RED
-    print(f"{Back.BLACK}    {color}{player_score}{Style.RESET_ALL}{Back.BLACK}")
-    print_cards([reg_card_visual(c) for c in player_hand], padding=f"{Back.BLACK}    ")
-    print(Back.BLACK)
-    
-    # Add basic strategy hint only during player's turn (when dealer's card is hidden)
-    if hidden and not args.no_hints:
-        dealer_up_card = dealer_hand[0]["value"]
-        has_ace = any(card["value"] == "A" for card in player_hand)
-        suggestion = Strategy.get_basic_strategy(player_score, dealer_up_card, has_ace)
-        print(f"{Back.BLACK}    {Fore.CYAN}Suggested Play: {suggestion}{Style.RESET_ALL}{Back.BLACK}")
-    
-    # Show hot/cold streak
-    if stats.hot_streak >= 3:
-        print(f"{Back.BLACK}    {Fore.RED}🔥 Hot Streak: {stats.hot_streak} wins in a row! 🔥{Style.RESET_ALL}")
+    # Drawn as one frame, so only what changed since the last frame is sent
+    with renderer.frame():
+        print_table(player_hand, dealer_hand, hidden, balance, dealer_action, stats.hot_streak,
+                    rules, None if args.no_hints else counter, odds, deviations)
 
 def display_game_options():
     options = f"""{Back.BLACK}
@@ -306,7 +231,10 @@ def display_game_options():
 {Back.BLACK}    (H) Hit     - Draw another card{Style.RESET_ALL}{Back.BLACK}
 {Back.BLACK}    (S) Stand   - Keep current hand{Style.RESET_ALL}{Back.BLACK}
 {Back.BLACK}    (D) Double  - Double bet & draw{Style.RESET_ALL}{Back.BLACK}
-{Back.BLACK}    (Q) Quit    - Exit game{Style.RESET_ALL}{Back.BLACK}
+"""
+    if rules.surrender:
+        options += f"{Back.BLACK}    (R) Surrender - Give up half your bet{Style.RESET_ALL}{Back.BLACK}\n"
+    options += f"""{Back.BLACK}    (Q) Quit    - Exit game{Style.RESET_ALL}{Back.BLACK}
 {Back.BLACK}    (?) Help    - Show commands{Style.RESET_ALL}{Back.BLACK}
 """
     print(options)
@@ -321,30 +249,39 @@ def get_player_action(hand, dealer_up_card, balance, bet):
     """Get the player's action choice."""
     while True:
         display_game_options()
-        choice = input(f"\n{Back.BLACK}    {Fore.CYAN}(h)it, (s)tand, (d)ouble, (q)uit, or (?) help: {Style.RESET_ALL}{Back.BLACK}").lower()
+        choice = keys.choose(f"\n{Back.BLACK}    {Fore.CYAN}(h)it, (s)tand, (d)ouble, (q)uit, or (?) help: {Style.RESET_ALL}{Back.BLACK}",
+                             'hsdq?r' if rules.surrender else 'hsdq?')
         if choice in ['h', 'hit']:
-            hand.append(deck.deal())
+            table.hit()
             play_sound('deal')
-            display_hands(hand, [dealer_up_card], balance=balance)
-            if calculate_score(hand) > 21:
+            display_hands(hand, Hand([dealer_up_card]), balance=balance)
+            if hand.bust:
                 play_sound('lose')
                 return ('bust', bet)
             continue  # Let player keep hitting if they want
         elif choice in ['s', 'stand', 'stay']:
+            table.stand()
             return ('stand', bet)
         elif choice in ['d', 'dbl', 'double']:
-            if len(hand) == 2 and balance >= bet:
-                hand.append(deck.deal())
+            if table.can_double:
+                table.double()
                 play_sound('deal')
-                display_hands(hand, [dealer_up_card], balance=balance)
-                return ('double', bet * 2)
+                display_hands(hand, Hand([dealer_up_card]), balance=balance)
+                return ('double', table.bet)
+            elif rules.double_on != 'any':
+                print(f"{Back.BLACK}    You can only double down on hard {rules.double_on}, on your first two cards and if you have enough balance.{Style.RESET_ALL}{Back.BLACK}")
             else:
                 print(f"{Back.BLACK}    You can only double down on your first two cards and if you have enough balance.{Style.RESET_ALL}{Back.BLACK}")
+        elif choice in ['r', 'surrender'] and rules.surrender:
+            if table.can_surrender:
+                table.surrender()
+                return ('surrender', bet)
+            print(f"{Back.BLACK}    You can only surrender on your first two cards.{Style.RESET_ALL}{Back.BLACK}")
         elif choice in ['q', 'quit']:
             return ('quit', bet)
         elif choice == '?':
             display_help()
-            display_hands(hand, [dealer_up_card], balance=balance)
+            display_hands(hand, Hand([dealer_up_card]), balance=balance)
         else:
             print(f"{Back.BLACK}    Invalid choice. Type ? for help.{Style.RESET_ALL}{Back.BLACK}")
 
@@ -367,12 +304,16 @@ def display_game_over():
 """)
     print(f"{Back.BLACK}    {Fore.CYAN}You've run out of money! Would you like to start fresh with $100?{Style.RESET_ALL}{Back.BLACK}")
     while True:
-        choice = input(f"{Back.BLACK}    {Fore.CYAN}(y)es or (n)o: {Style.RESET_ALL}{Back.BLACK}").lower()
+        choice = keys.choose(f"{Back.BLACK}    {Fore.CYAN}(y)es or (n)o: {Style.RESET_ALL}{Back.BLACK}", 'yn')
         if choice in ['y', 'yes']:
             # Reset stats and balance
             global stats
-            stats = Stats()  # Reset stats for new game
-            return 100  # Give player fresh start with $100
+            table.rebuy(100)  # Give player fresh start with $100
+            stats = table.stats  # Reset stats for new game
+            journal.append({'kind': 'reset', 'balance': table.balance})
+            if recorder:
+                recorder.reset(table.balance)
+            return table.balance
         elif choice in ['n', 'no']:
             sys.exit()  # Exit game
         else:
@@ -389,71 +330,25 @@ def get_bet(balance):
         except ValueError:
             print(f"{Back.BLACK}    Invalid input, please enter a number.{Style.RESET_ALL}{Back.BLACK}")
 
-def print_cards(cardlist, padding=""):
-    if not cardlist:
-        return
-    
-    # Add black background to padding and between cards
-    formatted_padding = f"{Back.BLACK}{padding}"
-    card_separator = f"{Back.BLACK}  "
-    
-    for i in range(len(cardlist[0])):
-        print(formatted_padding + card_separator.join(card[i] for card in cardlist) + Back.BLACK)
-
-def hidden_card():
-    card = [
-        f'{Back.BLACK}{Fore.WHITE}╭─────────╮{Style.RESET_ALL}',
-        f'{Back.BLACK}{Fore.WHITE}│{Fore.BLUE}░░░░░░░░░{Fore.WHITE}│{Style.RESET_ALL}',
-        f'{Back.BLACK}{Fore.WHITE}│{Fore.BLUE}░░░░░░░░░{Fore.WHITE}│{Style.RESET_ALL}',
-        f'{Back.BLACK}{Fore.WHITE}│{Fore.BLUE}░░░░░░░░░{Fore.WHITE}│{Style.RESET_ALL}',
-        f'{Back.BLACK}{Fore.WHITE}│{Fore.BLUE}░░░░░░░░░{Fore.WHITE}│{Style.RESET_ALL}',
-        f'{Back.BLACK}{Fore.WHITE}│{Fore.BLUE}░░░░░░░░░{Fore.WHITE}│{Style.RESET_ALL}',
-        f'{Back.BLACK}{Fore.WHITE}╰─────────╯{Style.RESET_ALL}'
-    ]
-    return card
-
-def reg_card_visual(card):
-    suits = "Spades Diamonds Hearts Clubs".split()
-    suit_symbols = ['♠','♦','♥','♣']
-    suit_colors = {
-        '♠': Fore.WHITE,
-        '♦': Fore.RED,
-        '♥': Fore.RED,
-        '♣': Fore.WHITE
-    }
-    
-    # Get card details
-    value = card["value"]
-    suit = suit_symbols[suits.index(card["suit"])]
-    color = suit_colors[suit]
-    
-    # Create a decorative card
-    card = [
-        f'{Back.BLACK}{Fore.WHITE}╭─────────╮{Style.RESET_ALL}',
-        f'{Back.BLACK}{Fore.WHITE}│{color}{value:<9}{Fore.WHITE}│{Style.RESET_ALL}',
-        f'{Back.BLACK}{Fore.WHITE}│         │{Style.RESET_ALL}',
-        f'{Back.BLACK}{Fore.WHITE}│    {color}{suit}    {Fore.WHITE}│{Style.RESET_ALL}',
-        f'{Back.BLACK}{Fore.WHITE}│         │{Style.RESET_ALL}',
-        f'{Back.BLACK}{Fore.WHITE}│{color}{value:>9}{Fore.WHITE}│{Style.RESET_ALL}',
-        f'{Back.BLACK}{Fore.WHITE}╰─────────╯{Style.RESET_ALL}'
-    ]
-    return card
 
 def dealer_turn(dealer_hand, player_hand, balance):
-    """Handle dealer's turn according to standard Blackjack rules."""
-    while calculate_score(dealer_hand) < 17:  # Dealer must hit on 16 and below
+    """Handle dealer's turn according to standard Blackjack rules.
+
+    Yields the pause after each frame, for the animator to play.
+    """
+    while table.dealer_must_hit:  # Dealer must hit on 16 and below
         dealer_score = calculate_score(dealer_hand)
         display_hands(player_hand, dealer_hand, hidden=False, balance=balance, dealer_action=f"has {dealer_score}, hitting...")
-        time.sleep(1.5)  # Longer pause to read dealer's current score
-        dealer_hand.append(deck.deal())
+        yield 1.5  # Longer pause to read dealer's current score
+        table.dealer_hit()
         play_sound('deal')
         display_hands(player_hand, dealer_hand, hidden=False, balance=balance)
-        time.sleep(1.2)  # Longer pause to see the new card
+        yield 1.2  # Longer pause to see the new card
     
     final_score = calculate_score(dealer_hand)
     if final_score <= 21:
         display_hands(player_hand, dealer_hand, hidden=False, balance=balance, dealer_action=f"stands on {final_score}")
-        time.sleep(1.5)  # Longer pause to read dealer's final action
+        yield 1.5  # Longer pause to read dealer's final action
 
 def determine_winner(player_hand, dealer_hand, bet, balance):
     """Determine the winner and update balance accordingly."""
@@ -462,72 +357,38 @@ def determine_winner(player_hand, dealer_hand, bet, balance):
     
     # Always show dealer's cards before announcing result
     display_hands(player_hand, dealer_hand, hidden=False, balance=balance)
-    time.sleep(0.3)  # Brief pause to see dealer's cards
+    animator.pause(0.3)  # Brief pause to see dealer's cards
     
-    # Handle player bust
-    if player_score > 21:
-        display_result("Bust! You lose!", -bet, balance - bet)
-        stats.update("loss", -bet)
-        return balance - bet
-
-    # Handle dealer bust
-    if dealer_score > 21:
-        # Only pay 3:2 for natural blackjack, not doubled hands
-        if len(player_hand) == 2 and player_score == 21:
-            amount = int(bet * 1.5)
-        else:
-            amount = bet
-        new_balance = balance + amount
+    outcome, amount = table.settle()  # Also updates the stats
+    new_balance = table.balance
+
+    if outcome == 'bust':
+        display_result("Bust! You lose!", amount, new_balance)
+    elif outcome == 'surrender':
+        display_result("You surrender. Half your bet is returned.", amount, new_balance)
+    elif outcome == 'blackjack_push':
+        display_result("Both have Blackjack! Push!", 0, new_balance)
+    elif outcome == 'push':
+        display_result(f"Push! Both have {player_score}!", 0, new_balance)
+    elif outcome == 'loss':
+        play_sound('lose')
+        display_result(f"Dealer wins with {dealer_score}!", amount, new_balance)
+    else:
+        messages = {
+            'dealer_bust': "Dealer busts! You win!",
+            'blackjack': "Blackjack! You win!",
+            'win': "You win!",
+        }
         play_sound('win')
-        display_result("Dealer busts! You win!", amount, new_balance)
-        stats.update("win", amount)
-        
+        display_result(messages[outcome], amount, new_balance)
+
         # Check achievements only on wins
-        check_achievements(player_hand, dealer_hand, bet, balance, amount)
-        
-        return new_balance
-
-    # Handle blackjack (but not on doubled hands)
-    if len(player_hand) == 2 and player_score == 21:
-        if len(dealer_hand) == 2 and dealer_score == 21:
-            display_result("Both have Blackjack! Push!", 0, balance)
-            stats.update("push", 0)
-            return balance
-        else:
-            amount = int(bet * 1.5)
-            new_balance = balance + amount
-            play_sound('win')
-            display_result("Blackjack! You win!", amount, new_balance)
-            stats.update("win", amount)
-            
-            # Check achievements for blackjack win
+        if outcome == 'blackjack':
             achievements.check_achievement('blackjack_master', True)
-            check_achievements(player_hand, dealer_hand, bet, balance, amount)
-            
-            return new_balance
-
-    # Compare scores
-    if player_score > dealer_score:
-        amount = bet  # Regular win pays 1:1
-        new_balance = balance + amount
-        play_sound('win')
-        display_result("You win!", amount, new_balance)
-        stats.update("win", amount)
-        
-        # Check achievements on regular win
         check_achievements(player_hand, dealer_hand, bet, balance, amount)
-        
-        return new_balance
-    elif dealer_score > player_score:
-        new_balance = balance - bet
-        play_sound('lose')
-        display_result(f"Dealer wins with {dealer_score}!", -bet, new_balance)
-        stats.update("loss", -bet)
-        return new_balance
-    else:
-        display_result(f"Push! Both have {player_score}!", 0, balance)
-        stats.update("push", 0)
-        return balance
+
+    record_hand(player_hand, dealer_hand, bet, outcome, amount, new_balance, table.actions)
+    return new_balance
 
 def check_achievements(player_hand, dealer_hand, bet, balance, amount):
     # High Roller achievement
@@ -553,76 +414,181 @@ def display_help():
 {Back.BLACK}    • Stand (S) to keep your current hand{Style.RESET_ALL}{Back.BLACK}
 {Back.BLACK}    • Double Down (D) to double your bet and get one more card{Style.RESET_ALL}{Back.BLACK}
 {Back.BLACK}    • Quit (Q) to exit the game{Style.RESET_ALL}{Back.BLACK}
+{Back.BLACK}    • At the bet prompt: Enter repeats your last bet, X doubles it, A bets it all{Style.RESET_ALL}{Back.BLACK}
 {Back.BLACK}    {Fore.CYAN}GAME RULES{Style.RESET_ALL}{Back.BLACK}
 {Back.BLACK}    • Beat the dealer's hand without going over 21{Style.RESET_ALL}{Back.BLACK}
 {Back.BLACK}    • Face cards (J,Q,K) are worth 10{Style.RESET_ALL}{Back.BLACK}
 {Back.BLACK}    • Aces are worth 11 or 1, whichever is better{Style.RESET_ALL}{Back.BLACK}
-{Back.BLACK}    • Dealer must hit on 16 and below, stand on 17 and above{Style.RESET_ALL}{Back.BLACK}
-{Back.BLACK}    • Blackjack (A + 10/Face card) pays 3:2{Style.RESET_ALL}{Back.BLACK}
+{Back.BLACK}    • Dealer must hit on 16 and below, {'and on soft 17, ' if rules.hit_soft_17 else ''}stand on 17 and above{Style.RESET_ALL}{Back.BLACK}
+{Back.BLACK}    • Blackjack (A + 10/Face card) pays {rules.blackjack_pays}{Style.RESET_ALL}{Back.BLACK}
 
 {Back.BLACK}    {Fore.CYAN}STRATEGY HINTS{Style.RESET_ALL}{Back.BLACK}
 {Back.BLACK}    • Basic strategy suggestions guide optimal play{Style.RESET_ALL}{Back.BLACK}
 {Back.BLACK}    • Hot streaks indicate when to increase bets{Style.RESET_ALL}{Back.BLACK}
 
-{Back.BLACK}    Press Enter to return to game...{Style.RESET_ALL}"""
+{Back.BLACK}    Press {keys.any_key} to return to game...{Style.RESET_ALL}"""
     clear_screen()
     print(help_text)
-    input()  # Wait for user input before continuing
-
-def display_title(balance=None):
-    title = f"""{Back.BLACK}
-{Back.BLACK}
-{Back.BLACK}    {Fore.BLUE}██████╗ ██╗      █████╗  ██████╗██╗  ██╗     ██╗ █████╗  ██████╗██╗  ██╗{Style.RESET_ALL}{Back.BLACK}
-{Back.BLACK}    {Fore.BLUE}██╔══██╗██║     ██╔══██╗██╔════╝██║ ██╔╝     ██║██╔══██╗██╔════╝██║ ██╔╝{Style.RESET_ALL}{Back.BLACK}
-{Back.BLACK}    {Fore.CYAN}██████╔╝██║     ███████║██║     █████╔╝      ██║███████║██║     █████╔╝{Style.RESET_ALL}{Back.BLACK}
-{Back.BLACK}    {Fore.CYAN}██╔══██╗██║     ██╔══██║██║     ██╔═██╗ ██   ██║██╔══██║██║     ██╔═██╗{Style.RESET_ALL}{Back.BLACK}
-{Back.BLACK}    {Fore.WHITE}██████╔╝███████╗██║  ██║╚██████╗██║  ██╗╚█████╔╝██║  ██║╚██████╗██║  ██╗{Style.RESET_ALL}{Back.BLACK}
-{Back.BLACK}    {Fore.WHITE}╚═════╝ ╚══════╝╚═╝  ╚═╝ ╚═════╝╚═╝  ╚═╝ ╚════╝ ╚═╝  ╚═╝ ╚═════╝╚═╝  ╚═╝{Style.RESET_ALL}{Back.BLACK}
-
-{Back.BLACK}             {Fore.BLUE}♠{Fore.WHITE} 'h' for help  {Fore.CYAN}♥{Fore.WHITE} 'q' to quit {Fore.WHITE}♦{Fore.WHITE} Enter bet to play {Fore.BLUE}♣{Style.RESET_ALL}{Back.BLACK}
-"""
-    if balance is not None:
-        title += f"\n{Back.BLACK}    {Fore.CYAN}Current Balance: ${balance}{Style.RESET_ALL}{Back.BLACK}\n"
-    title += f"\n{Back.BLACK}"
-    print(title)
+    keys.wait()  # Wait for a key before continuing
+
+def run_simulation_report(args, rules):
+    """Run the headless simulator at a table with `rules` and print its report."""
+    import bj_sim
+    if args.engine == 'numpy':
+        import bj_batch
+        workers = 1
+        sink = None
+        if args.columns:
+            from bj_columns import HandSink
+            sink = HandSink(args.columns, meta={'seed': args.seed, 'decks': args.decks, 'penetration': args.penetration, 'bet': args.sim_bet, 'rules': rules.describe()})
+        try:
+            result, seed = bj_batch.run_batch(args.simulate, seed=args.seed, bet=args.sim_bet, decks=args.decks, penetration=args.penetration, sink=sink, rules=rules)
+            if sink:
+                sink.meta['seed'] = seed  # Picked by run_batch when not given
+        finally:
+            if sink:
+                sink.close()
+    else:
+        workers = args.workers or os.cpu_count() or 1
+        result, seed = bj_sim.run_simulation(args.simulate, workers=workers, seed=args.seed, bet=args.sim_bet, decks=args.decks, penetration=args.penetration, rng=args.rng, rules=rules)
+    print(Style.RESET_ALL + bj_sim.format_report(result, seed, workers, args.decks, args.penetration, rules))
+
+def startup_report():
+    """Format the startup phases recorded by startup_mark."""
+    total = sum(seconds for _, seconds in startup_phases)
+    lines = ["Startup profile:"]
+    for phase, seconds in startup_phases:
+        lines.append(f"  {phase:<20} {seconds * 1000:8.1f} ms")
+    lines.append(f"  {'total':<20} {total * 1000:8.1f} ms")
+    return "\n".join(lines)
 
 def main():
-    global deck, stats, balance, achievements, args
+    global shoe, table, rules, odds, counter, deviations, animator, keys, history, recorder, stats, balance, achievements, args
     
+    # Initialize colorama for cross-platform colored output
+    init(autoreset=True)
+    print(Back.BLACK + Fore.WHITE, end='')
+
     parser = argparse.ArgumentParser(description='Terminal Blackjack Game')
     parser.add_argument('--no-sound', action='store_true', help='Disable sound effects')
     parser.add_argument('--no-hints', action='store_true', help='Disable strategy hints')
+    parser.add_argument('--decks', type=int, default=1, choices=range(MIN_DECKS, MAX_DECKS + 1), metavar=f'{MIN_DECKS}-{MAX_DECKS}', help='Number of decks in the shoe (default: 1)')
+    parser.add_argument('--penetration', type=float, default=0.75, help='Fraction of the shoe dealt before the reshuffle (default: 0.75)')
+    parser.add_argument('--count-system', choices=sorted(COUNT_SYSTEMS), default='hilo', help='Card counting system shown with the hints (default: hilo)')
+    parser.add_argument('--line-input', action='store_true', help='Type every answer and press Enter, instead of single keys')
+    parser.add_argument('--speed', type=float, default=1.0, help='Animation speed multiplier, 0 for instant (default: 1). Any key skips an animation')
+    parser.add_argument('--history', nargs='?', const='blackjack_history.db', metavar='DB', help='Record every hand in a SQLite database for the statistics screen (default file: blackjack_history.db)')
+    parser.add_argument('--startup-profile', action='store_true', help='Print how long each part of startup took and exit before the first hand')
+    parser.add_argument('--profile', action='store_true', help='Time each phase of the game and print p50/p95/p99 latencies on exit')
+    parser.add_argument('--profile-trace', metavar='FILE', help='With --profile, also write every timed call to FILE as a Chrome trace (JSON)')
+    parser.add_argument('--render-stats', action='store_true', help='Print bytes and time per frame when the game exits')
+    parser.add_argument('--simulate', type=int, metavar='N', help='Play N hands headless with basic strategy and print the results')
+    parser.add_argument('--workers', type=int, help='Worker processes for --simulate (default: all cores)')
+    parser.add_argument('--seed', type=int, help='Seed for the shuffle, makes games and --simulate runs repeatable')
+    parser.add_argument('--record', metavar='FILE', help='Log the seed and every decision to FILE, for replaying with bj_replay.py')
+    parser.add_argument('--sim-bet', type=int, default=10, help='Flat bet per hand for --simulate (default: 10)')
+    parser.add_argument('--engine', choices=['scalar', 'numpy'], default='scalar', help='Simulation engine: scalar process pool or NumPy batches (default: scalar)')
+    parser.add_argument('--columns', metavar='DIR', help='With --engine numpy, log every hand to DIR as chunked column files (read them with bj_columns.py)')
+    add_rule_arguments(parser)
+    add_rng_argument(parser)
     args = parser.parse_args()
+    if not 0 < args.penetration <= 1:
+        parser.error('--penetration must be between 0 and 1')
+    rules = rules_from_args(args)
+    if args.speed < 0:
+        parser.error("--speed can't be negative")
+    if args.columns and args.engine != 'numpy':
+        parser.error("--columns needs --engine numpy")
+    if args.rng == 'secrets' and (args.seed is not None or args.record):
+        parser.error("--rng secrets can't be seeded, so it can't be used with --seed or --record")
+
+    if args.simulate:
+        run_simulation_report(args, rules)
+        return
+
+    # Single keys on a terminal, whole lines when input is piped or with --line-input
+    keys = KeyInput(raw=not args.line_input)
+
+    # Timing wrappers only go in when asked for, so normal games pay nothing
+    if args.profile or args.profile_trace:
+        from bj_profile import Profiler
+        profiler = Profiler()
+        profiler.enable(args.profile_trace, report=lambda text: print(Style.RESET_ALL + text))
+        profiler.instrument(globals(), PROFILED_PHASES)
+        renderer.present = profiler.wrap('render', renderer.present)
+        for prompt in ('choose', 'line', 'wait'):
+            setattr(keys, prompt, profiler.wrap('input', getattr(keys, prompt)))
+
+    startup_mark('arguments')
 
     # Initialize pygame mixer for sound
     if not args.no_sound:
         try:
-            pygame.init()
-            mixer.init()
-            load_sounds()
-        except:
+            load_sounds(init_sound())
+        except Exception:
             print(f"{Back.BLACK}    Warning: Sound initialization failed. Running without sound.{Style.RESET_ALL}")
             args.no_sound = True
+        startup_mark('sound')
 
     # Load saved game if exists
     balance, stats = load_game()
+    history = None
+    if args.history:
+        from bj_history import HandHistory
+        history = HandHistory(args.history)
+    # Every session has a seed, so any session can be recorded and replayed
+    seed = args.seed if args.seed is not None else random.randrange(2**32)
+    recorder = None
+    if args.record:
+        from bj_replay import SessionRecorder
+        recorder = SessionRecorder(args.record, seed, args.decks, args.penetration, balance, rules=rules, rng=args.rng)
     
     # Initialize achievements
     achievements = Achievements()
-    
+    startup_mark('save file')
+
+    # One shoe for the whole session, shuffled by its own seeded generator
+    shoe = Shoe(args.decks, args.penetration, rng=make_rng(args.rng, seed))
+    table = TableSession(shoe, balance, stats, rules)
+    odds = DealerOdds.for_shoe(shoe, rules.hit_soft_17)
+    counter = CardCounter.for_shoe(shoe, args.count_system)
+    animator = Animator(args.speed, keys=keys)
+    startup_mark('shoe and trackers')
+    Strategy.table(shoe.decks, rules.hit_soft_17)  # Load or build the hint table before the first hand
+    startup_mark('strategy table')
+    # Hi-Lo index plays, if bj_index.py has generated them for these rules
+    deviations = None
+    if args.count_system == 'hilo' and not args.no_hints:
+        from bj_index import load_deviations
+        deviations = load_deviations(shoe.decks, rules.hit_soft_17)
+    startup_mark('deviation table')
+
+    if args.startup_profile:
+        print(Style.RESET_ALL + startup_report())
+        return
+
+    keys.start()
+    last_bet = None
     while True:
-        # Clear screen and show initial display
-        clear_screen()
-        print(Back.BLACK, end='')  # Ensure black background persists
-        display_title(balance)
+        # Show initial display
+        with renderer.frame():
+            print(Back.BLACK, end='')  # Ensure black background persists
+            display_title(balance)
         
         # Check if player is out of money before asking for bet
         if balance <= 0:
             balance = display_game_over()
             continue
         
-        # Get bet or command
-        bet_input = input(f"{Back.BLACK}    {Fore.CYAN}Enter bet (1-{balance}) or command: {Style.RESET_ALL}{Back.BLACK}").lower()
+        # Get bet or command. Enter repeats the last bet, x doubles it and a bets everything
+        repeat = f", Enter = ${min(last_bet, balance)}" if last_bet else ''
+        bet_input = keys.line(f"{Back.BLACK}    {Fore.CYAN}Enter bet (1-{balance}{repeat}) or command: {Style.RESET_ALL}{Back.BLACK}", instant='qhxa')
+        if bet_input == '' and last_bet:
+            bet_input = str(min(last_bet, balance))
+        elif bet_input == 'x' and last_bet:
+            bet_input = str(min(last_bet * 2, balance))
+        elif bet_input == 'a':
+            bet_input = str(balance)
         
         # Handle commands
         if bet_input == 'q':
@@ -637,19 +603,17 @@ def main():
             bet = int(bet_input)
             if bet <= 0 or bet > balance:
                 print(f"{Back.BLACK}    Invalid bet amount. Must be between 1 and {balance}.{Style.RESET_ALL}{Back.BLACK}")
-                time.sleep(1.5)
+                animator.pause(1.5)
                 continue
         except ValueError:
             print(f"{Back.BLACK}    Invalid input. Enter a bet amount or command (h for help, q to quit).{Style.RESET_ALL}{Back.BLACK}")
-            time.sleep(1.5)
+            animator.pause(1.5)
             continue
         
-        # Start new game
-        deck = Deck()
-        
-        # Deal initial cards
-        player_hand = [deck.deal(), deck.deal()]
-        dealer_hand = [deck.deal(), deck.deal()]
+        # Start new hand, reshuffling if the cut card has come out, and deal
+        last_bet = bet
+        table.place_bet(bet)
+        player_hand, dealer_hand = table.player_hand, table.dealer_hand
         
         play_sound('deal')
         display_hands(player_hand, dealer_hand, balance=balance)
@@ -661,28 +625,30 @@ def main():
             break
         
         # Dealer's turn if player hasn't busted
-        if action != 'bust':
-            dealer_turn(dealer_hand, player_hand, balance)
+        if action not in ('bust', 'surrender'):
+            animator.play(dealer_turn(dealer_hand, player_hand, balance))
         
         # Determine winner and update balance
         balance = determine_winner(player_hand, dealer_hand, bet, balance)
         
-        # Save game after each hand
-        save_game(balance, stats)
-        
         # Check if player is out of money
         if balance <= 0:
             balance = display_game_over()
 
         # Ask what to do next
         display_next_move_options()
-        next_action = input(f"{Back.BLACK}    Choice: {Style.RESET_ALL}").strip()
+        next_action = keys.choose(f"{Back.BLACK}    Choice: {Style.RESET_ALL}", '123')
         if next_action == '2':
             save_game(balance, stats)
             break
         elif next_action == '3':
             stats.display(balance)
 
+    animator.close()
+    keys.close()
+    if args.render_stats:
+        print(f"{Back.BLACK}    {renderer.summary()}{Style.RESET_ALL}")
+
  # Runs the main() function
 if __name__ == "__main__":
     main()
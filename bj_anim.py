@@ -0,0 +1,171 @@
+# Animation pacing: the game's pauses run on an asyncio event loop instead of
+# blocking in time.sleep, so a keypress can cut the current animation short
+# and the whole thing can be sped up or turned off with a speed multiplier.
+# asyncio is only imported once something actually animates, which keeps it
+# out of startup and out of --speed 0 sessions entirely.
+import os
+import sys
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows
+    termios = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# How often to check for a key where stdin can't be watched directly
+KEY_POLL = 0.02
+
+
+class Animator:
+    """Plays animations: generators that draw a frame and yield the pause after it.
+
+    Pauses are divided by `speed`, and speed 0 makes every animation instant.
+    While an animation is paused, any key finishes it: the remaining frames
+    are still drawn, just without waiting. Keys are only watched when stdin is
+    a terminal, so piped input is never swallowed. With `keys` (a KeyInput)
+    the keys pressed are queued as type-ahead for the next prompts rather
+    than thrown away.
+    """
+
+    def __init__(self, speed=1.0, stream=None, keys=None):
+        if speed < 0:
+            raise ValueError("speed can't be negative")
+        self.speed = speed
+        self.stream = stream or sys.stdin
+        self.keys = keys
+        self.loop = None
+        self.skipped = 0
+
+    def scaled(self, seconds):
+        return seconds / self.speed if self.speed else 0.0
+
+    def pause(self, seconds):
+        """Wait for `seconds` (scaled by speed), or until a key is pressed."""
+        self.play(iter((seconds,)))
+
+    def play(self, animation):
+        """Run an animation to the end."""
+        if not self.speed:
+            # Nothing to wait for: draw every frame straight away
+            for _ in animation:
+                pass
+            return
+        if self.loop is None:
+            import asyncio
+            self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self._play(animation))
+
+    async def _play(self, animation):
+        import asyncio
+        pressed = asyncio.Event()
+        with self._watch_keys(pressed):
+            for seconds in animation:
+                delay = self.scaled(seconds)
+                if pressed.is_set() or delay <= 0:
+                    continue
+                try:
+                    await asyncio.wait_for(pressed.wait(), delay)
+                    self.skipped += 1
+                except asyncio.TimeoutError:
+                    pass
+
+    def _watch_keys(self, pressed):
+        if not self._is_terminal():
+            return _NoKeys()
+        on_key = self.keys.typeahead if self.keys is not None else None
+        if termios is not None:
+            return _TerminalKeys(self.loop, self.stream.fileno(), pressed, on_key)
+        if msvcrt is not None:
+            return _ConsoleKeys(self.loop, pressed, on_key)
+        return _NoKeys()
+
+    def _is_terminal(self):
+        try:
+            return self.stream.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    def close(self):
+        if self.loop is not None:
+            self.loop.close()
+            self.loop = None
+
+
+class _NoKeys:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _TerminalKeys:
+    """Put a POSIX terminal in cbreak mode and set `pressed` on any key.
+
+    The keys go to `on_key` if given, otherwise they're swallowed so they
+    don't reach the next prompt.
+    """
+
+    def __init__(self, loop, fd, pressed, on_key=None):
+        self.loop = loop
+        self.fd = fd
+        self.pressed = pressed
+        self.on_key = on_key
+        self.saved = None
+
+    def __enter__(self):
+        try:
+            self.saved = termios.tcgetattr(self.fd)
+            tty.setcbreak(self.fd)
+        except termios.error:
+            self.saved = None
+            return self
+        self.loop.add_reader(self.fd, self._key)
+        return self
+
+    def _key(self):
+        data = os.read(self.fd, 1024)
+        if self.on_key is not None:
+            self.on_key(data.decode(errors='ignore'))
+        self.pressed.set()
+
+    def __exit__(self, *exc):
+        if self.saved is not None:
+            self.loop.remove_reader(self.fd)
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self.saved)
+        return False
+
+
+class _ConsoleKeys:
+    """Poll the Windows console for a key and set `pressed` when one arrives."""
+
+    def __init__(self, loop, pressed, on_key=None):
+        self.loop = loop
+        self.pressed = pressed
+        self.on_key = on_key
+        self.task = None
+
+    async def _poll(self):
+        import asyncio
+        while True:
+            if msvcrt.kbhit():
+                keys = ''
+                while msvcrt.kbhit():
+                    keys += msvcrt.getwch()
+                if self.on_key is not None:
+                    self.on_key(keys)
+                self.pressed.set()
+                return
+            await asyncio.sleep(KEY_POLL)
+
+    def __enter__(self):
+        self.task = self.loop.create_task(self._poll())
+        return self
+
+    def __exit__(self, *exc):
+        self.task.cancel()
+        return False
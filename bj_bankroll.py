@@ -0,0 +1,220 @@
+# Bankroll Monte Carlo: how betting systems change the risk of ruin.
+#
+# The hand results come from the batch engine, so they follow the game's
+# rules and the strategy hints exactly. Their distribution is measured once,
+# then whole sessions are played for every trajectory at once: each step
+# draws one hand result per trajectory, sizes its bet by the betting system
+# and updates its balance, all as NumPy arrays. Every system sees the same
+# hand results (common random numbers), so the differences between them are
+# down to the betting and not to luck. Hands are treated as independent,
+# which ignores the small correlation between hands dealt from one shoe.
+# As at the table, a player can only double when the balance covers it: a
+# trajectory that can't draws from the results of hands played without
+# doubling, so no balance ever goes below zero.
+import argparse
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only needed for bankroll runs
+    np = None
+
+from bj_batch import build_action_tables, play_shoes, require_numpy, shuffle_shoes
+from bj_core import MAX_DECKS, MIN_DECKS, shoe_cut
+from bj_rules import add_rule_arguments, rules_from_args
+from bj_sim import DEFAULT_RULES
+
+# Hand results are measured with a $2 bet, so every payout is a whole number
+# of half bets: -4 (lost double), -2, -1 (surrender), 0, 2, 4 (won double).
+# A paid natural is stored as NATURAL instead and paid by the table's rules.
+MEASURE_BET = 2
+NATURAL = 3
+# Entries in the sampling table; probabilities are rounded to 1 / SAMPLE_TABLE
+SAMPLE_TABLE = 1 << 20
+# Trajectories advanced together, to bound memory for very large runs
+CHUNK = 1 << 17
+
+SYSTEMS = ('flat', 'hot-streak', 'kelly')
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def hand_distribution(hands=1000000, seed=0, decks=1, penetration=0.75, rules=None, double=True):
+    """Play `hands` hands with the batch engine and return (hand results, probabilities).
+
+    The results are payouts in half bets, or NATURAL. With double=False the
+    hands are played by a player who can't afford to double.
+    """
+    require_numpy()
+    rng = np.random.default_rng(seed)
+    tables = build_action_tables(decks, rules, double)
+    size = 52 * decks
+    cut = shoe_cut(size, penetration)
+    amounts = []
+    played = 0
+    while played < hands:
+        shoes = shuffle_shoes(rng, max(1, (hands - played) // max(1, cut // 5) + 1), decks)
+        for _, _, amount, natural in play_shoes(shoes, cut, MEASURE_BET, tables, hands - played, rules=rules):
+            amounts.append(np.where(natural & (amount > 0), NATURAL, amount))
+            played += len(amount)
+    values, counts = np.unique(np.concatenate(amounts), return_counts=True)
+    return values, counts / counts.sum()
+
+
+def sampling_table(values, probabilities):
+    """A lookup table from uniform integers to payouts, so sampling is one gather."""
+    bounds = np.round(np.cumsum(probabilities) * SAMPLE_TABLE).astype(np.int64)
+    bounds[-1] = SAMPLE_TABLE
+    return np.repeat(values.astype(np.int8), np.diff(bounds, prepend=0))
+
+
+def unit_payouts(values, rules=None):
+    """What each hand result pays per unit bet."""
+    win, stake = (rules or DEFAULT_RULES).natural_pays
+    return np.where(values == NATURAL, win / stake, values / MEASURE_BET)
+
+
+def kelly_fraction(values, probabilities, rules=None):
+    """Full Kelly fraction of the bankroll (mean over variance). Negative means don't bet."""
+    units = unit_payouts(values, rules)
+    mean = float((units * probabilities).sum())
+    return mean / float((units * units * probabilities).sum() - mean * mean)
+
+
+class BankrollResult:
+    """Final balances and bust times of every trajectory for one betting system."""
+
+    def __init__(self, system, final, busted_at, balance, elapsed=0.0):
+        self.system = system
+        self.final = final
+        self.busted_at = busted_at  # Hand the balance hit zero on, 0 if it never did
+        self.balance = balance
+        self.elapsed = elapsed
+
+    def summary(self):
+        busted = self.busted_at[self.busted_at > 0]
+        return {
+            'system': self.system,
+            'ruin': float(len(busted) / len(self.final)),
+            'ahead': float((self.final > self.balance).mean()),
+            'mean_final': float(self.final.mean()),
+            'quantiles': [float(v) for v in np.quantile(self.final, QUANTILES)],
+            'median_hands_to_bust': float(np.median(busted)) if len(busted) else None,
+            'mean_hands_to_bust': float(busted.mean()) if len(busted) else None,
+        }
+
+
+def simulate(system, tables, sessions, hands, balance=100, bet=10, fraction=0.1, seed=0, rules=None):
+    """Play `sessions` trajectories of up to `hands` hands under one betting system.
+
+    `tables` holds the sampling tables of hands played with and without
+    doubling, for the table's `rules`. Returns (final balances, hand each
+    trajectory went broke on or 0). The same seed gives every system the
+    same hand results.
+    """
+    require_numpy()
+    table, no_double = tables
+    natural_win, natural_stake = (rules or DEFAULT_RULES).natural_pays
+    finals = []
+    busts = []
+    for start in range(0, sessions, CHUNK):
+        count = min(CHUNK, sessions - start)
+        rng = np.random.default_rng([seed, start])
+        money = np.full(count, balance, dtype=np.int64)
+        busted_at = np.zeros(count, dtype=np.int32)
+        # Only the trajectories still in play are worked on. They keep their
+        # own slots in the random draws, so every system sees the same hands.
+        live = np.arange(count)
+        cash = money.copy()
+        stake = np.full(count, bet, dtype=np.int64)
+        streak = np.zeros(count, dtype=np.int16)
+        for hand in range(1, hands + 1):
+            draws = rng.integers(0, SAMPLE_TABLE, count, dtype=np.uint32)
+            # The bet for this hand, never more than the balance
+            if system == 'flat':
+                wager = np.minimum(bet, cash)
+            elif system == 'hot-streak':
+                # Follow the game's hint: double the last bet while on a streak of 2+ wins
+                wager = np.minimum(np.where(streak >= 2, stake * 2, bet), cash)
+            else:
+                wager = np.minimum(np.maximum(cash * fraction, 1).astype(np.int64), cash)
+            # Doubling needs the balance to cover a second bet, as in TableSession.can_double
+            draw = draws[live]
+            result = np.where(cash >= 2 * wager, table[draw], no_double[draw])
+            # Floor division rounds a surrender's odd dollar in the house's favour, as the table does
+            won = np.where(result == NATURAL, wager * natural_win // natural_stake, wager * result // MEASURE_BET)
+            cash += won
+            streak = np.where(won > 0, streak + 1, 0).astype(np.int16)
+            stake = wager
+            broke = cash <= 0
+            if broke.any():
+                gone = live[broke]
+                money[gone] = cash[broke]
+                busted_at[gone] = hand
+                keep = ~broke
+                live, cash, stake, streak = live[keep], cash[keep], stake[keep], streak[keep]
+                if not len(live):
+                    break
+        money[live] = cash
+        finals.append(money)
+        busts.append(busted_at)
+    return np.concatenate(finals), np.concatenate(busts)
+
+
+def run(systems, sessions, hands, balance=100, bet=10, fraction=0.1, seed=0,
+        sample_hands=1000000, decks=1, penetration=0.75, rules=None):
+    """Measure the hand distributions, then simulate every system. Returns (BankrollResults, kelly fraction)."""
+    values, probabilities = hand_distribution(sample_hands, seed, decks, penetration, rules)
+    tables = (sampling_table(values, probabilities),
+              sampling_table(*hand_distribution(sample_hands, seed, decks, penetration, rules, double=False)))
+    results = []
+    for system in systems:
+        start = time.perf_counter()
+        final, busted_at = simulate(system, tables, sessions, hands, balance, bet, fraction, seed, rules)
+        results.append(BankrollResult(system, final, busted_at, balance, time.perf_counter() - start))
+    return results, kelly_fraction(values, probabilities, rules)
+
+
+def format_results(results):
+    lines = [f"  {'system':<11} {'ruin':>7} {'ahead':>7} {'p5':>7} {'p25':>7} {'median':>7} {'p75':>7} {'p95':>7} "
+             f"{'bust at (median)':>17} {'time':>7}"]
+    for result in results:
+        d = result.summary()
+        bust = f"{d['median_hands_to_bust']:,.0f} hands" if d['median_hands_to_bust'] else '-'
+        quantiles = ' '.join(f"{v:>7,.0f}" for v in d['quantiles'])
+        lines.append(f"  {d['system']:<11} {d['ruin']:>7.2%} {d['ahead']:>7.2%} {quantiles} {bust:>17} {result.elapsed:>6.2f}s")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare betting systems by risk of ruin over many simulated sessions')
+    parser.add_argument('--sessions', type=int, default=100000, help='Trajectories per betting system (default: 100000)')
+    parser.add_argument('--hands', type=int, default=1000, help='Most hands per session (default: 1000)')
+    parser.add_argument('--balance', type=int, default=100, help='Starting balance (default: 100, as in the game)')
+    parser.add_argument('--bet', type=int, default=10, help='Base bet (default: 10)')
+    parser.add_argument('--kelly-fraction', type=float, default=0.1, help='Fraction of the balance bet by the kelly system (default: 0.1)')
+    parser.add_argument('--systems', nargs='+', choices=SYSTEMS, default=list(SYSTEMS), help='Betting systems to compare (default: all)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the hand results (default: 0)')
+    parser.add_argument('--sample-hands', type=int, default=1000000, help='Hands played to measure the hand results (default: 1000000)')
+    parser.add_argument('--decks', type=int, default=1, choices=range(MIN_DECKS, MAX_DECKS + 1), metavar=f'{MIN_DECKS}-{MAX_DECKS}', help='Decks in the shoe (default: 1)')
+    parser.add_argument('--penetration', type=float, default=0.75, help='Fraction of the shoe dealt before the reshuffle (default: 0.75)')
+    add_rule_arguments(parser)
+    args = parser.parse_args()
+    if not 0 < args.kelly_fraction <= 1:
+        parser.error('--kelly-fraction must be between 0 and 1')
+
+    rules = rules_from_args(args)
+
+    start = time.perf_counter()
+    results, kelly = run(args.systems, args.sessions, args.hands, args.balance, args.bet, args.kelly_fraction,
+                         args.seed, args.sample_hands, args.decks, args.penetration, rules)
+    print(f"BANKROLL SIMULATION: {args.sessions:,} sessions of up to {args.hands:,} hands, "
+          f"${args.balance} balance, ${args.bet} base bet")
+    print(f"  Rules: {rules.describe()}")
+    print(f"  Full Kelly fraction for this game: {kelly:+.4f}{' (Kelly says not to bet)' if kelly <= 0 else ''}; "
+          f"the kelly system bets {args.kelly_fraction:.0%} of the balance")
+    print(format_results(results))
+    print(f"  Final balances in dollars; ruin means the balance reached $0. Total {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+# Batched simulator: resolves whole batches of hands at once with NumPy.
+# Each row of a batch is one shuffled shoe. Every shoe plays hands until its
+# cut card comes out, exactly like a Shoe in the game, and all shoes that are
+# still in play resolve their next hand together.
+import argparse
+import random
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only needed for batch runs
+    np = None
+
+from bj_core import CARD_HARD, CARD_IS_ACE, CARD_RANK, DEALER_STANDS_ON, FULL_DECK, Shoe, Strategy, shoe_cut
+from bj_rules import add_rule_arguments, rules_from_args
+from bj_sim import DEFAULT_RULES, SimResult, play_hand
+
+# Outcome codes, indexing into OUTCOMES
+OUTCOMES = ('bust', 'dealer_bust', 'blackjack', 'blackjack_push', 'win', 'loss', 'push', 'surrender')
+BUST, DEALER_BUST, BLACKJACK, BLACKJACK_PUSH, WIN, LOSS, PUSH, SURRENDER = range(len(OUTCOMES))
+# First action codes
+STAND, HIT, DOUBLE, SURRENDERED = range(4)
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError("The batch engine needs NumPy: pip install numpy")
+
+
+def build_action_tables(decks=1, rules=None, double=True):
+    """Return (first, later) decision arrays indexed [score, soft, dealer up rank].
+
+    `first` holds the action code for the first two cards (0 stand, 1 hit,
+    2 double, 3 surrender) and `later` is True where the player hits
+    afterwards. Both come straight from Strategy for the table's `rules`, so
+    the batch engine plays the same hints. With double=False they are the
+    hints for a player who can't afford to double.
+    """
+    require_numpy()
+    rules = rules or DEFAULT_RULES
+    codes = {'Stand': STAND, 'Hit': HIT, 'Double': DOUBLE, 'Surrender': SURRENDERED}
+    first = np.zeros((32, 2, 13), dtype=np.int8)
+    later = np.zeros((32, 2, 13), dtype=bool)
+    for score in range(4, 22):
+        for soft in (0, 1):
+            for rank in range(13):
+                can_double = double and rules.double_allowed(score - 10 if soft else score, soft)
+                first[score, soft, rank] = codes[Strategy.get_basic_strategy(score, rank, soft, can_double, decks,
+                                                                             rules.hit_soft_17, rules.surrender)]
+                later[score, soft, rank] = Strategy.get_basic_strategy(score, rank, soft, False, decks, rules.hit_soft_17) == 'Hit'
+    return first, later
+
+
+def shuffle_shoes(rng, count, decks=1):
+    """Return `count` independently shuffled shoes as a (count, 52 * decks) uint8 array."""
+    require_numpy()
+    cards = np.tile(np.frombuffer(FULL_DECK, dtype=np.uint8), decks)
+    return rng.permuted(np.broadcast_to(cards, (count, len(cards))), axis=1)
+
+
+def _score(hard, aces):
+    return np.where((aces > 0) & (hard <= 11), hard + 10, hard)
+
+
+def _soft(hard, aces):
+    return ((aces > 0) & (hard <= 11)).astype(np.intp)
+
+
+def _dealer_hits(score, hard, aces, hit_soft_17):
+    # Rules.dealer_hits for arrays
+    hits = score < DEALER_STANDS_ON
+    if hit_soft_17:
+        hits |= (score == DEALER_STANDS_ON) & (_soft(hard, aces) == 1)
+    return hits
+
+
+def resolve(shoes, rows, pos, bet, tables, columns=None, rules=None):
+    """Play the next hand in each of `rows` and return (outcome codes, amounts, naturals).
+
+    `pos` holds the next card position of every shoe and is advanced in place,
+    and `tables` comes from build_action_tables for the same `rules`. A
+    `columns` dict is filled with the per-hand record arrays that
+    bj_columns.HandSink stores.
+    """
+    require_numpy()
+    rules = rules or DEFAULT_RULES
+    first, later = tables
+    hard_table = np.frombuffer(CARD_HARD, dtype=np.uint8).astype(np.int16)
+    ace_table = np.frombuffer(CARD_IS_ACE, dtype=np.uint8).astype(np.int16)
+    rank_table = np.frombuffer(CARD_RANK, dtype=np.uint8)
+    size = shoes.shape[1]
+
+    count = len(rows)
+    local = np.arange(count)
+    at = pos[rows].astype(np.int64)
+
+    def draw(idx):
+        # A hand running past the last card wraps to the top of the same shoe.
+        # With SHOE_RESERVE cards behind the cut this practically never happens.
+        card = shoes[rows[idx], at[idx] % size]
+        at[idx] += 1
+        return card
+
+    # Initial deal: two cards to the player, then two to the dealer
+    p1, p2, d1, d2 = (draw(local) for _ in range(4))
+    p_hard = hard_table[p1] + hard_table[p2]
+    p_aces = ace_table[p1] + ace_table[p2]
+    d_hard = hard_table[d1] + hard_table[d2]
+    d_aces = ace_table[d1] + ace_table[d2]
+    up_rank = rank_table[d1]
+    p_cards = np.full(count, 2, dtype=np.int16)
+    d_cards = np.full(count, 2, dtype=np.int16)
+
+    # First decision: stand, hit or double
+    p_score = _score(p_hard, p_aces)
+    start_total = p_score.copy()
+    action = first[p_score, _soft(p_hard, p_aces), up_rank]
+    doubled = action == DOUBLE
+    surrendered = action == SURRENDERED
+    idx = local[doubled]
+    card = draw(idx)
+    p_hard[idx] += hard_table[card]
+    p_aces[idx] += ace_table[card]
+    p_cards[idx] += 1
+    p_score[idx] = _score(p_hard[idx], p_aces[idx])
+
+    # Then keep hitting while the strategy says so
+    active = action == HIT
+    while active.any():
+        idx = local[active]
+        card = draw(idx)
+        p_hard[idx] += hard_table[card]
+        p_aces[idx] += ace_table[card]
+        p_cards[idx] += 1
+        p_score[idx] = _score(p_hard[idx], p_aces[idx])
+        active[idx] = (p_score[idx] <= 21) & later[np.minimum(p_score[idx], 31), _soft(p_hard[idx], p_aces[idx]), up_rank[idx]]
+
+    # Dealer only plays when the player hasn't busted or surrendered
+    player_bust = p_score > 21
+    d_score = _score(d_hard, d_aces)
+    active = ~player_bust & ~surrendered & _dealer_hits(d_score, d_hard, d_aces, rules.hit_soft_17)
+    while active.any():
+        idx = local[active]
+        card = draw(idx)
+        d_hard[idx] += hard_table[card]
+        d_aces[idx] += ace_table[card]
+        d_cards[idx] += 1
+        d_score[idx] = _score(d_hard[idx], d_aces[idx])
+        active[idx] = _dealer_hits(d_score[idx], d_hard[idx], d_aces[idx], rules.hit_soft_17)
+    pos[rows] = at
+
+    # Same order of checks as settle_hand
+    win, stake = rules.natural_pays
+    natural_pay = bet * win // stake
+    stake = np.where(doubled, 2 * bet, bet).astype(np.int64)
+    player_natural = (p_cards == 2) & (p_score == 21)
+    dealer_natural = (d_cards == 2) & (d_score == 21)
+    dealer_bust = d_score > 21
+    outcome = np.select(
+        [surrendered, player_bust, dealer_bust, player_natural & dealer_natural, player_natural,
+         p_score > d_score, d_score > p_score],
+        [SURRENDER, BUST, DEALER_BUST, BLACKJACK_PUSH, BLACKJACK, WIN, LOSS],
+        default=PUSH,
+    ).astype(np.int8)
+    amount = np.select(
+        [outcome == SURRENDER, outcome == BUST, (outcome == DEALER_BUST) & player_natural, outcome == DEALER_BUST,
+         outcome == BLACKJACK, outcome == WIN, outcome == LOSS],
+        [-((bet + 1) // 2), -stake, natural_pay, stake, natural_pay, stake, -stake],
+        default=0,
+    ).astype(np.int64)
+    if columns is not None:
+        columns.update(player_card1=p1, player_card2=p2, dealer_up=d1, dealer_hole=d2,
+                       player_cards=p_cards, dealer_cards=d_cards, first_action=action,
+                       start_total=start_total, player_total=p_score, dealer_total=d_score, bet=np.full(count, bet),
+                       amount=amount, outcome=outcome)
+    return outcome, amount, player_natural
+
+
+def play_shoes(shoes, cut, bet, tables, limit=None, sink=None, rules=None):
+    """Play every shoe down to its cut card, a round of hands at a time.
+
+    Yields (rows, outcome, amount, natural) per round, stopping after `limit`
+    hands in total if given. Every hand is also appended to `sink` if given.
+    """
+    pos = np.zeros(len(shoes), dtype=np.int64)
+    rows = np.arange(len(shoes))
+    played = 0
+    while len(rows):
+        if limit is not None:
+            rows = rows[:limit - played]
+            if not len(rows):
+                break
+        columns = {} if sink is not None else None
+        resolved = resolve(shoes, rows, pos, bet, tables, columns, rules)
+        if sink is not None:
+            sink.append(columns)
+        yield (rows,) + resolved
+        played += len(rows)
+        # Same test as Shoe.start_hand: deal again only before the cut card
+        rows = rows[pos[rows] < cut]
+
+
+def summarize(outcome, amount, natural, bet, result=None):
+    """Fold resolved arrays into a SimResult."""
+    result = result or SimResult(bet)
+    counts = np.bincount(outcome, minlength=len(OUTCOMES))
+    result.hands += len(outcome)
+    result.net += int(amount.sum())
+    result.net_sq += int((amount * amount).sum())
+    result.wins += int(counts[WIN] + counts[DEALER_BUST] + counts[BLACKJACK])
+    result.losses += int(counts[LOSS] + counts[BUST] + counts[SURRENDER])
+    result.pushes += int(counts[PUSH] + counts[BLACKJACK_PUSH])
+    result.blackjacks += int(natural.sum())
+    return result
+
+
+def run_batch(hands, seed=None, bet=10, decks=1, penetration=0.75, batch_cards=20000000, sink=None, rules=None):
+    """Simulate hands in NumPy batches of shoes at a table with `rules` and return (SimResult, seed).
+
+    Every hand is also recorded in `sink` (a bj_columns.HandSink) if given.
+    """
+    require_numpy()
+    if seed is None:
+        seed = random.randrange(2**32)
+    rng = np.random.default_rng(seed)
+    tables = build_action_tables(decks, rules)
+    size = 52 * decks
+    cut = shoe_cut(size, penetration)
+    # A hand uses a little over five cards on average
+    hands_per_shoe = max(1, cut // 5)
+    result = SimResult(bet)
+    start = time.perf_counter()
+    while result.hands < hands:
+        remaining = hands - result.hands
+        count = max(1, min(batch_cards // size, remaining // hands_per_shoe + 1))
+        shoes = shuffle_shoes(rng, count, decks)
+        for _, outcome, amount, natural in play_shoes(shoes, cut, bet, tables, remaining, sink, rules):
+            summarize(outcome, amount, natural, bet, result)
+    result.elapsed = time.perf_counter() - start
+    return result, seed
+
+
+class RowFeeder:
+    """Shuffler stand-in that hands a Shoe the pre-shuffled rows one by one."""
+
+    def __init__(self, shoes):
+        self.shoes = shoes
+        self.index = 0
+
+    def shuffle(self, cards):
+        # Wraps around if out-of-step play reshuffles early in the last shoe
+        cards[:] = self.shoes[self.index % len(self.shoes)].tobytes()
+        self.index += 1
+
+
+def cross_validate(shoes=2000, seed=0, bet=10, decks=1, penetration=0.75, rules=None):
+    """Play the same seeded shoes with both engines and return the mismatching hands."""
+    require_numpy()
+    rows = shuffle_shoes(np.random.default_rng(seed), shoes, decks)
+    cut = shoe_cut(rows.shape[1], penetration)
+
+    # Batch results come out round by round; put them back in shoe order
+    batch = []
+    for round_index, (played, outcome, amount, natural) in enumerate(play_shoes(rows, cut, bet, build_action_tables(decks, rules), rules=rules)):
+        for row, o, a, n in zip(played.tolist(), outcome.tolist(), amount.tolist(), natural.tolist()):
+            batch.append((row, round_index, OUTCOMES[o], a, n))
+    batch.sort()
+
+    shoe = Shoe(decks, penetration, rng=RowFeeder(rows))
+    mismatches = []
+    for row, round_index, outcome, amount, natural in batch:
+        if round_index == 0 and row:
+            # Deal every shoe from its start, so a hand that goes out of step
+            # doesn't throw all the later shoes off too
+            shoe.rng.index = row
+            shoe.shuffle()
+        if play_hand(shoe, bet, rules) != (outcome, amount, natural):
+            mismatches.append((row, round_index))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cross-check the NumPy batch engine against the scalar game rules')
+    parser.add_argument('--shoes', type=int, default=2000, help='Shoes to play through (default: 2000)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the shuffled shoes')
+    parser.add_argument('--bet', type=int, default=10, help='Bet per hand (default: 10)')
+    parser.add_argument('--decks', type=int, default=1, help='Decks per shoe (default: 1)')
+    parser.add_argument('--penetration', type=float, default=0.75, help='Fraction of the shoe dealt before reshuffling (default: 0.75)')
+    add_rule_arguments(parser)
+    args = parser.parse_args()
+
+    rules = rules_from_args(args)
+    mismatches = cross_validate(args.shoes, args.seed, args.bet, args.decks, args.penetration, rules)
+    if mismatches:
+        print(f"FAIL: {len(mismatches)} hands differ, first (shoe, hand): {mismatches[:10]}")
+        raise SystemExit(1)
+    print(f"OK: {args.shoes} shoes match the scalar engine (seed {args.seed}, {rules.describe()})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# Microbenchmarks for the hot paths: scoring, dealing, strategy lookups,
+# dealer odds, card art and whole display_hands frames.
+#
+# Every benchmark is timed with timeit's autorange and the best of several
+# repeats is kept. Allocations are measured in a separate tracemalloc pass,
+# so tracing doesn't skew the timings. Frame benchmarks also report the
+# bytes each frame sends to the terminal, which is what the diffing renderer
+# saves at the cost of some time. Results can be written as JSON and
+# compared with a stored baseline. Anything slower than the baseline by more
+# than the threshold is flagged and makes the run exit with status 1.
+import argparse
+import fnmatch
+import io
+import json
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+
+from bj_core import Deck, Hand, Shoe, Strategy, calculate_score, card_dict
+from bj_count import CardCounter
+from bj_index import BUCKETS, Deviations
+from bj_odds import DealerOdds
+from bj_render import FrameRenderer
+from bj_rng import available_backends, make_rng
+from bj_rules import Rules
+from bj_strategy import TABLE_SIZE
+from bj_view import CARD_GLYPHS, HIDDEN_GLYPH, print_cards, print_table, reg_card_visual
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.bj_cache', 'bench_baseline.json')
+# Slowdown against the baseline that counts as a regression
+THRESHOLD = 0.20
+# Operations run under tracemalloc for the allocation figures
+ALLOC_OPS = 1000
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a setup function that returns the operation to time."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+class _NullWriter:
+    """Swallows output, so printing benchmarks measure building the text and not the terminal."""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+@benchmark('core.calculate_score.hand')
+def _score_hand():
+    hand = Hand((12, 5, 20))
+    return lambda: calculate_score(hand)
+
+
+@benchmark('core.calculate_score.cards')
+def _score_cards():
+    cards = [12, 5, 20]
+    return lambda: calculate_score(cards)
+
+
+@benchmark('core.hand.build')
+def _hand_build():
+    def op():
+        hand = Hand((12, 5))
+        hand.add(20)
+        return hand
+    return op
+
+
+@benchmark('core.deck.reset')
+def _deck_reset():
+    return Deck().reset
+
+
+@benchmark('core.deck.deal')
+def _deck_deal():
+    return Deck().deal  # Includes the reshuffles, amortized
+
+
+@benchmark('core.shoe.deal')
+def _shoe_deal():
+    shoe = Shoe(6)
+
+    def op():
+        shoe.start_hand()
+        return shoe.deal()
+    return op
+
+
+@benchmark('rng.shuffle6.mt')
+def _shuffle_mt():
+    return Shoe(6, rng=make_rng('mt', 0)).shuffle
+
+
+@benchmark('rng.shuffle6.secrets')
+def _shuffle_secrets():
+    return Shoe(6, rng=make_rng('secrets')).shuffle
+
+
+if 'pcg64' in available_backends():
+    @benchmark('rng.shuffle6.pcg64')
+    def _shuffle_pcg64():
+        return Shoe(6, rng=make_rng('pcg64', 0)).shuffle  # Includes the bulk generation, amortized
+
+
+@benchmark('core.strategy.lookup')
+def _strategy():
+    Strategy.table(1)
+    return lambda: Strategy.get_basic_strategy(16, 9, False, True, 1)
+
+
+@benchmark('odds.outcomes')
+def _odds():
+    odds = DealerOdds()
+    odds.remove(10)
+
+    def op():
+        # Change the composition so nothing is served from the cache
+        odds.remove(5)
+        odds.restore(5)
+        return odds.outcomes(10)
+    return op
+
+
+@benchmark('count.card_seen')
+def _count():
+    counter = CardCounter('hilo', 6)
+    return lambda: counter.card_seen(4)
+
+
+@benchmark('view.reg_card_visual')
+def _card_visual():
+    card = card_dict(38)
+    return lambda: reg_card_visual(card)
+
+
+@benchmark('view.print_cards')
+def _print_cards():
+    cards = [CARD_GLYPHS[12], CARD_GLYPHS[30], HIDDEN_GLYPH]
+    return lambda: print_cards(cards, padding="    ")
+
+
+def _frame_states():
+    shoe = Shoe(6)
+    rules = Rules(decks=6)
+    Strategy.table(rules.decks, rules.hit_soft_17)
+    counter = CardCounter.for_shoe(shoe)
+    odds = DealerOdds.for_shoe(shoe)
+    # A made-up deviation table that always says stand, so the index play line is drawn too
+    deviations = Deviations({'first': [['Stand'] * BUCKETS] * TABLE_SIZE, 'later': [['Stand'] * BUCKETS] * TABLE_SIZE})
+    states = []
+    for _ in range(2):
+        player = Hand((shoe.deal(), shoe.deal()))
+        dealer = Hand((shoe.deal(), shoe.deal(seen=False)))
+        states.append((player, dealer))
+    hit = Hand(states[0][0])
+    hit.add(shoe.deal())
+    return states, hit, (rules, counter, odds, deviations)
+
+
+def _frame_op(renderer, frames, hints):
+    """Draw `frames` in turn, exactly as the game's display_hands does during the player's turn with hints on."""
+    turn = [0]
+
+    def op():
+        turn[0] = (turn[0] + 1) % len(frames)
+        renderer.stream.seek(0)
+        renderer.stream.truncate()
+        with renderer.frame():
+            print_table(*frames[turn[0]], True, 100, None, 0, *hints)
+    op.renderer = renderer
+    return op
+
+
+@benchmark('view.display_hands.diff')
+def _frame_diff():
+    states, _, hints = _frame_states()
+    # Alternate between two tables, the worst case: most of the frame changes
+    return _frame_op(FrameRenderer(io.StringIO(), size=(120, 80)), states, hints)
+
+
+@benchmark('view.display_hands.diff_hit')
+def _frame_diff_hit():
+    states, hit, hints = _frame_states()
+    # Alternate between a hand and the same hand after a hit, the common case
+    return _frame_op(FrameRenderer(io.StringIO(), size=(120, 80)), [states[0], (hit, states[0][1])], hints)
+
+
+@benchmark('view.display_hands.full')
+def _frame_full():
+    states, _, hints = _frame_states()
+    # No terminal size: always a full repaint
+    return _frame_op(FrameRenderer(io.StringIO()), states[:1], hints)
+
+
+@benchmark('sim.play_hand')
+def _play_hand():
+    from bj_sim import play_hand
+    Strategy.table(6)
+    shoe = Shoe(6)
+    return lambda: play_hand(shoe, 10)
+
+
+def measure(op, min_time=0.2, repeat=5):
+    """Return the best time per call of `op`, in nanoseconds."""
+    timer = timeit.Timer(op)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat, number)) / number * 1e9
+
+
+def measure_allocations(op, ops=ALLOC_OPS):
+    """Return (peak bytes over one run of `ops` calls, bytes still held per call afterwards)."""
+    op()  # Warm any caches first so they don't count
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for _ in range(ops):
+            op()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - start, max(0.0, (current - start) / ops)
+
+
+def run(names, min_time=0.2, repeat=5):
+    results = {}
+    real_stdout = sys.stdout
+    for name in names:
+        op = BENCHMARKS[name]()
+        sys.stdout = _NullWriter()
+        try:
+            ns = measure(op, min_time, repeat)
+            peak, retained = measure_allocations(op)
+        finally:
+            sys.stdout = real_stdout
+        results[name] = {
+            'ns_per_op': round(ns, 1),
+            'ops_per_sec': round(1e9 / ns),
+            'alloc_peak_bytes': peak,
+            'alloc_retained_bytes_per_op': round(retained, 1),
+        }
+        line = f"  {name:<30} {ns:>12,.1f} ns/op {1e9 / ns:>14,.0f} ops/s {peak:>10,} B peak"
+        renderer = getattr(op, 'renderer', None)
+        if renderer is not None:
+            # Every call draws one frame, so this is the average over all of them
+            results[name]['bytes_per_frame'] = round(renderer.total_bytes / renderer.frames)
+            line += f" {results[name]['bytes_per_frame']:>8,} B/frame"
+        print(line, flush=True)
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Return [(name, baseline ns, current ns, change)] for benchmarks past the threshold."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        change = result['ns_per_op'] / before['ns_per_op'] - 1
+        if change > threshold:
+            regressions.append((name, before['ns_per_op'], result['ns_per_op'], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the hot paths and compare them with a stored baseline')
+    parser.add_argument('-k', '--filter', default='*', help='Only run benchmarks matching this glob (default: all)')
+    parser.add_argument('--list', action='store_true', help='List the benchmarks and exit')
+    parser.add_argument('--json', metavar='FILE', help='Write the results to FILE as JSON')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='Baseline file to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help=f'Slowdown that counts as a regression (default: {THRESHOLD})')
+    parser.add_argument('--quick', action='store_true', help='Shorter timing runs, for a rough check')
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if fnmatch.fnmatch(name, args.filter)]
+    if args.list:
+        print("\n".join(names))
+        return
+    if not names:
+        parser.error(f"no benchmarks match {args.filter!r}")
+
+    print(f"Benchmarks (Python {platform.python_version()}, {platform.machine()}):")
+    results = run(names, min_time=0.05 if args.quick else 0.2, repeat=3 if args.quick else 5)
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    status = 0
+    try:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        baseline = None
+    if baseline and not args.save_baseline:
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {before:,.1f} -> {after:,.1f} ns/op ({change:+.0%})")
+        if regressions:
+            status = 1
+        else:
+            print(f"No regressions past {args.threshold:.0%} against {args.baseline}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    raise SystemExit(status)
+
+
+if __name__ == "__main__":
+    main()
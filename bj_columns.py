@@ -0,0 +1,226 @@
+# Columnar per-hand records for long headless runs.
+#
+# HandSink stores every hand as a fixed-width record split into columns,
+# one .npy file per column per chunk of CHUNK_ROWS hands. Each chunk is
+# written straight into memory-mapped files, so the process only ever holds
+# the pages it is filling, however many hands are logged. manifest.json
+# lists the columns and the finished chunks and is rewritten (atomically)
+# after each chunk, so an interrupted run leaves every finished chunk
+# readable.
+#
+# HandColumns reads a directory back one chunk at a time, memory-mapped, and
+# aggregates results by dealer up card, player total (the two-card total the
+# hand started with, or the total it finished on) or bet size without
+# loading more than a chunk of one column at once.
+import argparse
+import json
+import math
+import os
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only needed for columnar logs
+    np = None
+
+from bj_core import CARD_HARD
+from bj_journal import write_atomic
+
+FORMAT_VERSION = 2
+MANIFEST = 'manifest.json'
+# Hands per chunk file: 1M hands is 20 MB across all columns
+CHUNK_ROWS = 1 << 20
+
+# The record: column name -> dtype. Cards are ints (suit * 13 + rank), the
+# first action is 0 stand, 1 hit, 2 double, 3 surrender, and the outcome is
+# an index into bj_batch.OUTCOMES. start_total is the total of the first two
+# cards and player_total the total the hand finished on. bet is the stake
+# before any double; amount is the payout.
+COLUMNS = {
+    'player_card1': 'u1',
+    'player_card2': 'u1',
+    'dealer_up': 'u1',
+    'dealer_hole': 'u1',
+    'player_cards': 'u1',
+    'dealer_cards': 'u1',
+    'first_action': 'u1',
+    'start_total': 'u1',
+    'player_total': 'u1',
+    'dealer_total': 'u1',
+    'bet': '<i4',
+    'amount': '<i4',
+    'outcome': 'u1',
+}
+
+GROUPINGS = ('dealer_up', 'start_total', 'player_total', 'bet')
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError("Columnar hand logs need NumPy: pip install numpy")
+
+
+def _chunk_file(path, column, index):
+    return os.path.join(path, f"{column}.{index:05d}.npy")
+
+
+class HandSink:
+    """Appends per-hand records to chunked, memory-mapped column files under `path`."""
+
+    def __init__(self, path, chunk_rows=CHUNK_ROWS, meta=None):
+        require_numpy()
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, MANIFEST)):
+            raise FileExistsError(f"{path} already holds a hand log")
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.meta = meta or {}
+        self.chunks = []  # Rows in each finished chunk
+        self.maps = None
+        self.filled = 0
+        self._write_manifest()
+
+    @property
+    def rows(self):
+        return sum(self.chunks) + self.filled
+
+    def _write_manifest(self):
+        write_atomic(os.path.join(self.path, MANIFEST), {
+            'version': FORMAT_VERSION, 'columns': COLUMNS, 'chunk_rows': self.chunk_rows,
+            'chunks': self.chunks, 'rows': sum(self.chunks), 'meta': self.meta,
+        })
+
+    def _open_chunk(self):
+        index = len(self.chunks)
+        self.maps = {name: np.lib.format.open_memmap(_chunk_file(self.path, name, index), mode='w+',
+                                                     dtype=dtype, shape=(self.chunk_rows,))
+                     for name, dtype in COLUMNS.items()}
+        self.filled = 0
+
+    def _finish_chunk(self):
+        index = len(self.chunks)
+        for mapped in self.maps.values():
+            mapped.flush()
+        if self.filled < self.chunk_rows:
+            # Trim a short last chunk to its real length
+            trimmed = {name: np.array(mapped[:self.filled]) for name, mapped in self.maps.items()}
+            self.maps = None
+            for name, values in trimmed.items():
+                np.save(_chunk_file(self.path, name, index), values)
+        self.maps = None
+        self.chunks.append(self.filled)
+        self.filled = 0
+        self._write_manifest()
+
+    def append(self, columns):
+        """Add a batch of hands: a dict of equal-length arrays, one per column in COLUMNS."""
+        count = len(columns['amount'])
+        start = 0
+        while start < count:
+            if self.maps is None:
+                self._open_chunk()
+            take = min(count - start, self.chunk_rows - self.filled)
+            for name, mapped in self.maps.items():
+                mapped[self.filled:self.filled + take] = columns[name][start:start + take]
+            self.filled += take
+            start += take
+            if self.filled == self.chunk_rows:
+                self._finish_chunk()
+
+    def close(self):
+        if self.maps is not None and self.filled:
+            self._finish_chunk()
+        elif self.maps is not None:
+            # Opened but never written to
+            for name in self.maps:
+                os.remove(_chunk_file(self.path, name, len(self.chunks)))
+            self.maps = None
+        # Always, so changes to meta after the last chunk are kept
+        self._write_manifest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class HandColumns:
+    """Reads a HandSink directory back, one memory-mapped chunk at a time."""
+
+    def __init__(self, path):
+        require_numpy()
+        with open(os.path.join(path, MANIFEST), 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported hand log version {manifest.get('version')}")
+        self.path = path
+        self.columns = manifest['columns']
+        self.chunk_sizes = manifest['chunks']
+        self.rows = manifest['rows']
+        self.meta = manifest['meta']
+
+    def chunks(self, names):
+        """Yield a dict of the `names` columns for each chunk."""
+        for index, rows in enumerate(self.chunk_sizes):
+            yield {name: np.load(_chunk_file(self.path, name, index), mmap_mode='r')[:rows] for name in names}
+
+    def group_keys(self, by, chunk):
+        if by == 'dealer_up':
+            return np.frombuffer(CARD_HARD, dtype=np.uint8)[chunk['dealer_up']]  # 1 is an ace
+        return chunk[by]
+
+    def aggregate(self, by):
+        """Per-group totals as {key: [hands, net, net squared, wagered, wins, losses]}.
+
+        Wagered counts doubled stakes. Only the key, amount, bet and first
+        action columns are read, a chunk at a time.
+        """
+        if by not in GROUPINGS:
+            raise ValueError(f"can't group by {by!r}, choose from {', '.join(GROUPINGS)}")
+        groups = {}
+        for chunk in self.chunks({by, 'amount', 'bet', 'first_action'}):
+            keys, inverse = np.unique(self.group_keys(by, chunk), return_inverse=True)
+            amount = chunk['amount'].astype(np.int64)
+            wagered = chunk['bet'].astype(np.int64) * np.where(chunk['first_action'] == 2, 2, 1)
+            sums = (
+                np.bincount(inverse, minlength=len(keys)),
+                np.bincount(inverse, amount, len(keys)),
+                np.bincount(inverse, (amount * amount).astype(np.float64), len(keys)),
+                np.bincount(inverse, wagered, len(keys)),
+                np.bincount(inverse, amount > 0, len(keys)),
+                np.bincount(inverse, amount < 0, len(keys)),
+            )
+            for i, key in enumerate(keys.tolist()):
+                totals = groups.setdefault(key, [0] * len(sums))
+                for j, column in enumerate(sums):
+                    totals[j] += int(column[i])
+        return dict(sorted(groups.items()))
+
+
+def format_groups(groups, by):
+    label = {'dealer_up': 'up card', 'start_total': 'start', 'player_total': 'final', 'bet': 'bet'}[by]
+    lines = [f"  {label:>8} {'hands':>12} {'EV/hand':>9} {'std err':>8} {'% wagered':>10} {'win':>7} {'loss':>7}"]
+    for key, (hands, net, net_sq, wagered, wins, losses) in groups.items():
+        mean = net / hands
+        variance = max(net_sq / hands - mean * mean, 0.0)
+        name = 'A' if by == 'dealer_up' and key == 1 else key
+        lines.append(f"  {name:>8} {hands:>12,} {mean:>+9.4f} {math.sqrt(variance / hands):>8.4f} "
+                     f"{net / wagered:>+10.3%} {wins / hands:>7.2%} {losses / hands:>7.2%}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarise a columnar hand log written by bj-term.py --simulate N --engine numpy --columns DIR')
+    parser.add_argument('path', help='Hand log directory')
+    parser.add_argument('--by', choices=GROUPINGS, default='dealer_up', help='Group hands by (default: dealer_up)')
+    args = parser.parse_args()
+
+    columns = HandColumns(args.path)
+    groups = columns.aggregate(args.by)
+    print(f"HAND LOG: {columns.rows:,} hands in {len(columns.chunk_sizes)} chunks, {columns.meta}")
+    print(format_groups(groups, args.by))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# Core blackjack rules shared by the terminal game and the headless simulator.
+# Nothing in here touches the screen, sound or keyboard.
+import random
+from array import array
+
+SUITS = ["Spades", "Diamonds", "Hearts", "Clubs"]
+VALUES = ["2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A"]
+
+# Dealer must hit on 16 and below, stand on 17 and above
+DEALER_STANDS_ON = 17
+# What surrendering is worth: half the bet lost
+SURRENDER_EV = -0.5
+
+# Shoe limits. Deck and Shoe both keep at least SHOE_RESERVE cards behind
+# the point where they reshuffle so a hand rarely runs out of cards.
+MIN_DECKS = 1
+MAX_DECKS = 8
+SHOE_RESERVE = 10
+
+# Cards are small ints: card = suit * 13 + rank, with rank indexing VALUES
+# (0 is a "2", 12 is an ace). Everything the rules need about a card is a
+# single lookup in one of these tables.
+ACE = 12
+RANK_HARD = bytes([2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 1])
+CARD_RANK = bytes(c % 13 for c in range(52))
+CARD_SUIT = bytes(c // 13 for c in range(52))
+CARD_HARD = bytes(RANK_HARD[r] for r in CARD_RANK)  # Aces count 1
+CARD_POINTS = bytes(11 if r == ACE else RANK_HARD[r] for r in CARD_RANK)  # Aces count 11
+CARD_IS_ACE = bytes(1 if r == ACE else 0 for r in CARD_RANK)
+FULL_DECK = bytes(range(52))
+
+# Thin adapter for the rendering code, which still works on suit/value dicts
+CARD_DICTS = tuple({"suit": SUITS[CARD_SUIT[c]], "value": VALUES[CARD_RANK[c]]} for c in range(52))
+# Short text codes ("AS", "10H", ...) for logs and the table server
+CARD_CODES = tuple(f"{VALUES[CARD_RANK[c]]}{SUITS[CARD_SUIT[c]][0]}" for c in range(52))
+_CARD_BY_CODE = {code: card for card, code in enumerate(CARD_CODES)}
+
+
+def parse_card(card):
+    """Return the int card for an int or a code like 'AS', '10H' or 'qd'."""
+    if isinstance(card, int):
+        if not 0 <= card < 52:
+            raise ValueError(f"card out of range: {card}")
+        return card
+    try:
+        return _CARD_BY_CODE[card.strip().upper()]
+    except KeyError:
+        raise ValueError(f"unknown card: {card!r}") from None
+
+
+def card_dict(card):
+    """Return the {"suit", "value"} dict for an int card."""
+    return CARD_DICTS[card]
+
+
+def card_value(card):
+    """Return the display value ("2".."10", "J", "Q", "K", "A") of an int card."""
+    return VALUES[CARD_RANK[card]]
+
+
+class Hand:
+    """A hand of int cards that keeps its score up to date as cards arrive."""
+    __slots__ = ('cards', 'hard', 'aces', 'score', 'soft', 'blackjack', 'bust')
+
+    def __init__(self, cards=()):
+        self.cards = array('B')
+        self.hard = 0
+        self.aces = 0
+        self.score = 0
+        self.soft = False
+        self.blackjack = False
+        self.bust = False
+        for card in cards:
+            self.add(card)
+
+    def add(self, card):
+        self.cards.append(card)
+        hard = self.hard + CARD_HARD[card]
+        self.hard = hard
+        self.aces += CARD_IS_ACE[card]
+        # At most one ace can ever count as 11
+        if self.aces and hard <= 11:
+            self.score = hard + 10
+            self.soft = True
+        else:
+            self.score = hard
+            self.soft = False
+        self.blackjack = self.score == 21 and len(self.cards) == 2
+        self.bust = self.score > 21
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __getitem__(self, index):
+        return self.cards[index]
+
+    def __repr__(self):
+        return f"Hand([{', '.join(card_value(c) for c in self.cards)}], score={self.score})"
+
+
+class Deck:
+    decks = 1
+
+    def __init__(self, rng=None):
+        # Any object with a shuffle() method works, e.g. a seeded random.Random
+        self.rng = rng or random
+        self.reset()
+
+    def reset(self):
+        # Shuffling a list of small ints is quicker than swapping array items
+        cards = list(FULL_DECK)
+        self.rng.shuffle(cards)
+        self.cards = bytearray(cards)
+
+    def start_hand(self):
+        # Every hand gets a fresh deck
+        self.reset()
+
+    def deal(self):
+        if len(self.cards) < SHOE_RESERVE:  # Reshuffle when deck gets low
+            self.reset()
+        return self.cards.pop()
+
+
+def shoe_cut(size, penetration):
+    """Return the position of the cut card in a shoe of `size` cards."""
+    if not 0 < penetration <= 1:
+        raise ValueError("penetration must be between 0 and 1")
+    return max(1, min(int(size * penetration), size - SHOE_RESERVE))
+
+
+class Shoe:
+    """A multi-deck shoe that lasts across hands and reshuffles at the cut card.
+
+    The cards live in one preallocated buffer that is shuffled in place, and
+    rank_counts tracks how many of each rank are still to come. Watchers get
+    card_seen(card) for every card dealt face up or revealed later, and
+    shuffled(shoe) after every reshuffle.
+    """
+
+    def __init__(self, decks=1, penetration=0.75, rng=None):
+        if not MIN_DECKS <= decks <= MAX_DECKS:
+            raise ValueError(f"decks must be between {MIN_DECKS} and {MAX_DECKS}")
+        self.decks = decks
+        self.penetration = penetration
+        self.rng = rng or random
+        self.cards = bytearray(FULL_DECK * decks)
+        self.size = len(self.cards)
+        self.cut = shoe_cut(self.size, penetration)
+        self.rank_counts = [0] * 13
+        self.watchers = []
+        self.shuffles = 0
+        self.shuffle()
+
+    def shuffle(self):
+        self.rng.shuffle(self.cards)
+        self.shuffles += 1
+        self.pos = 0
+        self.rank_counts[:] = [4 * self.decks] * 13
+        for watcher in self.watchers:
+            watcher.shuffled(self)
+
+    def start_hand(self):
+        # Reshuffle between hands once the cut card has come out
+        if self.pos >= self.cut:
+            self.shuffle()
+
+    def deal(self, seen=True):
+        """Deal the next card. Pass seen=False for a face-down card and reveal() it later."""
+        if self.pos >= self.size:  # Only with very deep penetration
+            self.shuffle()
+        card = self.cards[self.pos]
+        self.pos += 1
+        self.rank_counts[CARD_RANK[card]] -= 1
+        if seen:
+            for watcher in self.watchers:
+                watcher.card_seen(card)
+        return card
+
+    def reveal(self, card):
+        """Turn over a card that was dealt face down."""
+        for watcher in self.watchers:
+            watcher.card_seen(card)
+
+    @property
+    def remaining(self):
+        return self.size - self.pos
+
+
+class Strategy:
+    # Strategy tables per (deck count, dealer hits soft 17), loaded from bj_strategy's cache on first use
+    tables = {}
+
+    @staticmethod
+    def table(decks=1, hit_soft_17=False):
+        table = Strategy.tables.get((decks, hit_soft_17))
+        if table is None:
+            from bj_strategy import load_strategy
+            table = Strategy.tables[decks, hit_soft_17] = load_strategy(decks, hit_soft_17)
+        return table
+
+    @staticmethod
+    def get_basic_strategy(player_score, dealer_up_card, soft, can_double=False, decks=1, hit_soft_17=False,
+                           can_surrender=False):
+        """Return 'Hit', 'Stand' or 'Double' for a hand against the dealer's up card.
+
+        With `can_surrender`, 'Surrender' when losing half the bet beats the best of those.
+        """
+        if player_score > 21:
+            return 'Stand'
+        table = Strategy.tables.get((decks, hit_soft_17)) or Strategy.table(decks, hit_soft_17)
+        index = (soft * 22 + player_score) * 12 + CARD_POINTS[dealer_up_card]
+        if can_surrender:
+            ev = table['ev'][index]  # None for totals a hand can't have
+            if ev and max(ev[:3 if can_double else 2]) < SURRENDER_EV:
+                return 'Surrender'
+        return table['first' if can_double else 'later'][index]
+
+
+# Function to calculate the score of a hand
+def calculate_score(hand):
+    if isinstance(hand, Hand):
+        return hand.score
+    total = 0
+    aces = 0
+    for card in hand:
+        total += CARD_HARD[card]
+        aces += CARD_IS_ACE[card]
+    if aces and total <= 11:
+        total += 10
+    return total
+
+
+def settle_hand(player_hand, dealer_hand, bet, natural_pays=(3, 2)):
+    """Apply the payout rules and return (outcome, amount won or lost).
+
+    Outcomes are 'bust', 'dealer_bust', 'blackjack', 'blackjack_push',
+    'win', 'loss' and 'push'. Naturals pay `natural_pays` as (win, stake),
+    3:2 by default, rounded down to whole dollars, and a natural against a
+    dealer natural is a push.
+    """
+    player_score = player_hand.score
+    dealer_score = dealer_hand.score
+
+    # Handle player bust
+    if player_hand.bust:
+        return 'bust', -bet
+
+    # Handle dealer bust, only pay 3:2 for natural blackjack
+    if dealer_hand.bust:
+        if player_hand.blackjack:
+            return 'dealer_bust', bet * natural_pays[0] // natural_pays[1]
+        return 'dealer_bust', bet
+
+    # Handle blackjack (but not on doubled hands)
+    if player_hand.blackjack:
+        if dealer_hand.blackjack:
+            return 'blackjack_push', 0
+        return 'blackjack', bet * natural_pays[0] // natural_pays[1]
+
+    # Compare scores
+    if player_score > dealer_score:
+        return 'win', bet
+    elif dealer_score > player_score:
+        return 'loss', -bet
+    return 'push', 0
@@ -0,0 +1,78 @@
+# Card counting: running count, decks remaining and true count, kept up to
+# date in constant time per card.
+from bj_core import CARD_RANK
+
+# Tag per rank, in rank order 2, 3, 4, 5, 6, 7, 8, 9, 10, J, Q, K, A
+SYSTEMS = {
+    'hilo': {'name': 'Hi-Lo', 'tags': (1, 1, 1, 1, 1, 0, 0, 0, -1, -1, -1, -1, -1), 'balanced': True},
+    'ko': {'name': 'KO', 'tags': (1, 1, 1, 1, 1, 1, 0, 0, -1, -1, -1, -1, -1), 'balanced': False},
+    'omega2': {'name': 'Omega II', 'tags': (1, 1, 2, 2, 2, 1, 0, -1, -2, -2, -2, -2, 0), 'balanced': True},
+}
+
+
+def card_tags(system):
+    """Return the tag of every int card (0-51) for a counting system."""
+    tags = SYSTEMS[system]['tags']
+    return tuple(tags[rank] for rank in CARD_RANK)
+
+
+class CardCounter:
+    """Running and true count for one shoe.
+
+    Use it as a Shoe watcher (the game does, so the dealer's hole card is
+    only counted once it's turned over), or skip the per-card hook entirely
+    and call sync(shoe) whenever the count is needed, which counts every card
+    dealt since the last call in one pass.
+    """
+    __slots__ = ('system', 'name', 'tags', 'decks', 'initial', 'running', 'seen', 'synced', 'shuffles')
+
+    def __init__(self, system='hilo', decks=1):
+        self.system = system
+        self.name = SYSTEMS[system]['name']
+        self.tags = card_tags(system)
+        self.decks = decks
+        # Unbalanced counts start below zero so their pivot lands near zero
+        self.initial = 0 if SYSTEMS[system]['balanced'] else 4 - 4 * decks
+        self.reset()
+
+    @classmethod
+    def for_shoe(cls, shoe, system='hilo'):
+        counter = cls(system, shoe.decks)
+        shoe.watchers.append(counter)
+        return counter
+
+    def reset(self):
+        self.running = self.initial
+        self.seen = 0
+        self.synced = 0
+        self.shuffles = None
+
+    # Shoe watcher interface
+    def card_seen(self, card):
+        self.running += self.tags[card]
+        self.seen += 1
+
+    def shuffled(self, shoe):
+        self.reset()
+
+    def sync(self, shoe):
+        """Count every card dealt from `shoe` since the last sync."""
+        if shoe.shuffles != self.shuffles:  # Reshuffled since last time
+            self.reset()
+            self.shuffles = shoe.shuffles
+        if shoe.pos > self.synced:
+            self.running += sum(map(self.tags.__getitem__, shoe.cards[self.synced:shoe.pos]))
+            self.seen += shoe.pos - self.synced
+            self.synced = shoe.pos
+        return self.running
+
+    @property
+    def decks_remaining(self):
+        return max(52 * self.decks - self.seen, 1) / 52
+
+    @property
+    def true_count(self):
+        return self.running / self.decks_remaining
+
+    def describe(self):
+        return f"{self.name} Count: {self.running:+d}  Decks Left: {self.decks_remaining:.1f}  True: {self.true_count:+.1f}"
@@ -0,0 +1,219 @@
+# House edge for any table rules, worked out from the expected-value model
+# behind the strategy hints (bj_strategy) rather than by simulation, so every
+# figure is repeatable to the last digit.
+#
+# Every starting pair against every dealer up card is valued with the shoe
+# less those three cards, which matters most for single deck: stand, hit,
+# double where the rules allow it, surrender and splits. Split hands are
+# valued as if each drew from that same shoe, and resplits recursively up to
+# the rules' limit. The edge is the player's expected loss per initial bet.
+#
+# A matrix of rule sets is spread across a process pool. Each result is
+# cached under its Rules.key(), so reruns only compute combinations they
+# haven't seen, and the game reads the edge of its own table from the cache.
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from bj_journal import write_atomic
+from bj_rules import DOUBLE_ON, MAX_SPLITS, PAYOUTS, Rules
+from bj_strategy import UpCardAnalysis, shoe_counts
+
+# Bump whenever the edge model changes so stale cache entries get recomputed
+CACHE_VERSION = 2
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.bj_cache', 'house_edge.json')
+
+
+class RulesAnalysis(UpCardAnalysis):
+    """Player EVs against one dealer up card, with every option `rules` allows."""
+
+    def __init__(self, counts, up_value, rules):
+        super().__init__(counts, up_value, rules.hit_soft_17)
+        self.rules = rules
+        self.split_hand = lru_cache(maxsize=None)(self._split_hand)
+
+    def two_cards(self, hard, has_ace, after_split=False):
+        """Best of stand, hit and (where allowed) double for a two-card total."""
+        rules = self.rules
+        ev = max(self.stand(hard, has_ace), self.hit(hard, has_ace))
+        soft = has_ace and hard <= 11
+        if (not after_split or rules.double_after_split) and rules.double_allowed(hard, soft):
+            ev = max(ev, self.double(hard, has_ace))
+        return ev
+
+    def first(self, first_card, second_card):
+        """EV of the best play of a starting pair that isn't a natural."""
+        rules = self.rules
+        ev = self.two_cards(first_card + second_card, first_card == 1 or second_card == 1)
+        if rules.surrender:
+            ev = max(ev, -0.5)
+        if first_card == second_card and rules.max_splits:
+            ev = max(ev, 2 * self.split_hand(first_card, rules.max_splits - 1))
+        return ev
+
+    def _split_hand(self, card, splits_left):
+        # One of the hands after a split: `card` plus whatever comes next
+        rules = self.rules
+        can_resplit = splits_left > 0 and (card != 1 or rules.resplit_aces)
+        ev = 0.0
+        for value, p in self.draw:
+            hard = card + value
+            has_ace = card == 1 or value == 1
+            if card == 1 and not rules.hit_split_aces:
+                hand_ev = self.stand(hard, has_ace)  # One card only on split aces
+            else:
+                hand_ev = self.two_cards(hard, has_ace, after_split=True)
+            if can_resplit and value == card:
+                hand_ev = max(hand_ev, 2 * self.split_hand(card, splits_left - 1))
+            ev += p * hand_ev
+        return ev
+
+
+def house_edge(rules):
+    """The house edge under `rules`, as a fraction of the initial bet."""
+    counts = shoe_counts(rules.decks)
+    total = sum(counts)
+    win, stake = rules.natural_pays
+    ev = 0.0
+    for up_value in range(1, 11):
+        rest = list(counts)
+        rest[up_value - 1] -= 1
+        n = total - 1
+        pairs = n * (n - 1)
+        # A natural only pushes against a dealer natural, which needs the
+        # right hole card from what's left after the player's two cards
+        hole = 10 if up_value == 1 else 1 if up_value == 10 else None
+        dealer_natural = (rest[hole - 1] - 1) / (n - 2) if hole else 0.0
+        up_ev = 0.0
+        for first_card in range(1, 11):
+            for second_card in range(first_card, 11):
+                if first_card == second_card:
+                    p = rest[first_card - 1] * (rest[first_card - 1] - 1) / pairs
+                else:
+                    p = 2 * rest[first_card - 1] * rest[second_card - 1] / pairs
+                if not p:
+                    continue
+                if first_card == 1 and second_card == 10:
+                    up_ev += p * win / stake * (1 - dealer_natural)
+                else:
+                    shoe = list(counts)
+                    shoe[first_card - 1] -= 1
+                    shoe[second_card - 1] -= 1
+                    up_ev += p * RulesAnalysis(tuple(shoe), up_value, rules).first(first_card, second_card)
+        ev += counts[up_value - 1] / total * up_ev
+    return -ev
+
+
+def rules_matrix(decks=(1, 2, 6, 8), payouts=('3:2', '6:5'), double_on=DOUBLE_ON, splits=(0, 1, 3)):
+    """Every combination of the given settings, with and without H17 and surrender.
+
+    Doubling after a split is only varied where splits are allowed.
+    """
+    matrix = []
+    for deck_count, h17, pays, double, surrender, max_splits in itertools.product(
+            decks, (False, True), payouts, double_on, (False, True), splits):
+        for das in ((True, False) if max_splits else (True,)):
+            matrix.append(Rules(decks=deck_count, hit_soft_17=h17, blackjack_pays=pays, double_on=double,
+                                double_after_split=das, surrender=surrender, max_splits=max_splits))
+    return matrix
+
+
+def read_cache(path=CACHE_FILE):
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {'version': CACHE_VERSION, 'edges': {}}
+    if data.get('version') != CACHE_VERSION:
+        return {'version': CACHE_VERSION, 'edges': {}}
+    return data
+
+
+def write_cache(data, path=CACHE_FILE):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_atomic(path, data)
+    except OSError:
+        pass  # A read-only install just recomputes next time
+
+
+def edge_matrix(matrix, workers=None, path=CACHE_FILE):
+    """Return ({rules: edge}, number computed) for every rule set in `matrix`.
+
+    Only the rule sets missing from the cache are computed, across a process
+    pool, and then added to it.
+    """
+    data = read_cache(path)
+    edges = {}
+    missing = []
+    for rules in matrix:
+        entry = data['edges'].get(rules.key())
+        if entry is not None:
+            edges[rules] = entry['edge']
+        else:
+            missing.append(rules)
+    if not missing:
+        return edges, 0
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(missing) == 1:
+        results = map(house_edge, missing)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(missing)))
+        results = pool.map(house_edge, missing, chunksize=max(1, len(missing) // (workers * 4)))
+    try:
+        for rules, edge in zip(missing, results):
+            edges[rules] = edge
+            data['edges'][rules.key()] = {'rules': rules._asdict(), 'edge': edge}
+    finally:
+        if pool:
+            pool.shutdown()
+    write_cache(data, path)
+    return edges, len(missing)
+
+
+def cached_edge(rules, path=CACHE_FILE):
+    """The house edge for one table, from the cache when it's there."""
+    edges, _ = edge_matrix([rules], workers=1, path=path)
+    return edges[rules]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Work out the house edge for a matrix of table rules')
+    parser.add_argument('--decks', type=int, nargs='+', default=[1, 2, 6, 8], help='Deck counts (default: 1 2 6 8)')
+    parser.add_argument('--payouts', nargs='+', choices=sorted(PAYOUTS), default=['3:2', '6:5'], help='Natural payouts (default: 3:2 6:5)')
+    parser.add_argument('--double-on', nargs='+', choices=DOUBLE_ON, default=list(DOUBLE_ON), help='Doubling restrictions (default: all)')
+    parser.add_argument('--splits', type=int, nargs='+', choices=range(MAX_SPLITS + 1), default=[0, 1, 3], help='Most splits allowed (default: 0 1 3)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--cache', default=CACHE_FILE, help='Cache file for computed edges')
+    parser.add_argument('--top', type=int, help='Only list the N best and N worst tables for the player')
+    args = parser.parse_args()
+
+    try:
+        matrix = rules_matrix(args.decks, args.payouts, args.double_on, args.splits)
+    except ValueError as e:
+        parser.error(str(e))
+    start = time.perf_counter()
+    edges, computed = edge_matrix(matrix, args.workers, args.cache)
+    elapsed = time.perf_counter() - start
+
+    ranked = sorted(edges.items(), key=lambda item: item[1])
+    if args.top and len(ranked) > 2 * args.top:
+        ranked = ranked[:args.top] + [None] + ranked[-args.top:]
+    print(f"{'house edge':>10}  rules")
+    for item in ranked:
+        if item is None:
+            print(f"{'...':>10}")
+            continue
+        rules, edge = item
+        print(f"{edge:>10.3%}  {rules.describe()}")
+    print(f"{len(matrix)} rule sets: {computed} computed, {len(matrix) - computed} from the cache, in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# Hand history in SQLite: every hand's cards, actions, bet, payout and time,
+# for questions the running counters in Stats can't answer, like the win
+# rate on hard 16 against a dealer 10 or last week's results by bet size.
+#
+# The game queues hands and inserts them in batches. The database runs in
+# WAL mode, and the indexes cover the columns each report reads, so the
+# aggregates are answered from the index alone and stay fast at millions of
+# rows. Large externally generated logs go through import_log, which loads
+# in big transactions and rebuilds the indexes once at the end.
+import argparse
+import atexit
+import csv
+import json
+import sqlite3
+import time
+from datetime import datetime
+
+from bj_core import CARD_HARD, CARD_IS_ACE, CARD_POINTS, parse_card
+
+HISTORY_FILE = 'blackjack_history.db'
+# Hands queued by the game before they are inserted
+BATCH_SIZE = 50
+# Rows per executemany call during a bulk import
+IMPORT_CHUNK = 50000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hands (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,        -- Unix time
+    bet INTEGER NOT NULL,
+    payout INTEGER NOT NULL,        -- Net win or loss, as settle_hand returns it
+    outcome TEXT NOT NULL,
+    player_cards BLOB NOT NULL,     -- Int cards, one byte each
+    dealer_cards BLOB NOT NULL,
+    actions TEXT NOT NULL,          -- One letter per decision: H, S, D or R
+    start_score INTEGER NOT NULL,   -- Player total on the first two cards
+    start_soft INTEGER NOT NULL,
+    dealer_up INTEGER NOT NULL      -- Up card points, 2-11
+)
+"""
+INDEXES = {
+    'hands_by_start': 'hands (start_score, start_soft, dealer_up, payout)',
+    'hands_by_time': 'hands (played_at, bet, payout)',
+}
+COLUMNS = ('played_at', 'bet', 'payout', 'outcome', 'player_cards', 'dealer_cards',
+           'actions', 'start_score', 'start_soft', 'dealer_up')
+INSERT = f"INSERT INTO hands ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+def start_state(cards):
+    """Return (score, soft) for the first two cards."""
+    hard = CARD_HARD[cards[0]] + CARD_HARD[cards[1]]
+    soft = bool(CARD_IS_ACE[cards[0]] or CARD_IS_ACE[cards[1]]) and hard <= 11
+    return (hard + 10 if soft else hard), soft
+
+
+def hand_row(played_at, bet, payout, outcome, player_cards, dealer_cards, actions):
+    player_cards = bytes(player_cards)
+    dealer_cards = bytes(dealer_cards)
+    score, soft = start_state(player_cards)
+    return (played_at, bet, payout, outcome, player_cards, dealer_cards, actions,
+            score, int(soft), CARD_POINTS[dealer_cards[0]])
+
+
+class HandHistory:
+    """SQLite store of played hands."""
+
+    def __init__(self, path=HISTORY_FILE, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.pending = []
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')  # WAL stays consistent; a crash can only lose the last commits
+        self.db.execute(SCHEMA)
+        self.create_indexes()
+        atexit.register(self.close)  # Don't lose a queued batch when the game exits
+
+    def create_indexes(self):
+        with self.db:
+            for name, definition in INDEXES.items():
+                self.db.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+
+    def drop_indexes(self):
+        with self.db:
+            for name in INDEXES:
+                self.db.execute(f"DROP INDEX IF EXISTS {name}")
+
+    def add(self, bet, payout, outcome, player_cards, dealer_cards, actions, played_at=None):
+        """Queue one hand, inserting the queue once it reaches the batch size."""
+        self.pending.append(hand_row(played_at or time.time(), bet, payout, outcome,
+                                     player_cards, dealer_cards, actions))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            with self.db:
+                self.db.executemany(INSERT, self.pending)
+            self.pending = []
+
+    def close(self):
+        self.flush()
+        self.db.close()
+        atexit.unregister(self.close)
+
+    def count(self):
+        self.flush()
+        return self.db.execute('SELECT COUNT(*) FROM hands').fetchone()[0]
+
+    def start_results(self, score, soft, dealer_up):
+        """Return (hands, wins, net) for one starting total against one dealer up card (2-11)."""
+        self.flush()
+        return self.db.execute(
+            """SELECT COUNT(*), COALESCE(SUM(payout > 0), 0), COALESCE(SUM(payout), 0) FROM hands
+               WHERE start_score = ? AND start_soft = ? AND dealer_up = ?""",
+            (score, int(soft), dealer_up)).fetchone()
+
+    def results_by_start(self, scores, soft, dealer_ups):
+        """Return (score, hands, wins, net) per starting total, against any of `dealer_ups`."""
+        self.flush()
+        low, high = min(dealer_ups), max(dealer_ups)
+        return self.db.execute(
+            f"""SELECT start_score, COUNT(*), SUM(payout > 0), SUM(payout) FROM hands
+                WHERE start_score IN ({', '.join('?' * len(scores))}) AND start_soft = ?
+                  AND dealer_up BETWEEN ? AND ?
+                GROUP BY start_score ORDER BY start_score""",
+            (*scores, int(soft), low, high)).fetchall()
+
+    def results_by_bet(self, since=None, until=None):
+        """Return (bet, hands, wins, net) for hands played between `since` and `until` (Unix times)."""
+        self.flush()
+        return self.db.execute(
+            """SELECT bet, COUNT(*), SUM(payout > 0), SUM(payout) FROM hands
+               WHERE played_at >= ? AND played_at < ?
+               GROUP BY bet ORDER BY bet""",
+            (since or 0, until or float('inf'))).fetchall()
+
+    def import_rows(self, rows):
+        """Bulk insert prepared rows (see hand_row) and return how many went in.
+
+        When the import is bigger than the table, the indexes are dropped and
+        rebuilt once afterwards, which is much cheaper than updating them row
+        by row.
+        """
+        self.flush()
+        rebuild = False
+        imported = 0
+        chunk = []
+        existing = self.db.execute('SELECT COUNT(*) FROM hands').fetchone()[0]
+        try:
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= IMPORT_CHUNK:
+                    if not rebuild and imported + len(chunk) > existing:
+                        self.drop_indexes()
+                        rebuild = True
+                    with self.db:
+                        self.db.executemany(INSERT, chunk)
+                    imported += len(chunk)
+                    chunk = []
+            if chunk:
+                with self.db:
+                    self.db.executemany(INSERT, chunk)
+                imported += len(chunk)
+        finally:
+            if rebuild:
+                self.create_indexes()
+        self.db.execute('PRAGMA optimize')  # Refresh planner statistics where they've gone stale
+        return imported
+
+    def import_log(self, path):
+        """Import a hand log: JSON lines, or CSV with a header row (by file extension)."""
+        with open(path, 'r', newline='') as f:
+            records = csv.DictReader(f) if path.endswith('.csv') else map(json.loads, filter(str.strip, f))
+            return self.import_rows(_log_row(record, number) for number, record in enumerate(records, 1))
+
+
+def _timestamp(value):
+    """Unix time from a number or an ISO date string."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def _cards(value):
+    # A list of ints or codes, or the same as one space-separated string (CSV)
+    if isinstance(value, str):
+        value = value.split()
+    try:
+        cards = bytes(value)  # Fast path: already int cards
+    except TypeError:
+        return bytes(parse_card(int(card) if card.isdigit() else card) for card in value)
+    if cards and max(cards) >= 52:
+        raise ValueError(f"card out of range: {max(cards)}")
+    return cards
+
+
+def _log_row(record, number):
+    """Turn one log record into a row. Fields: time, bet, payout, outcome, player, dealer, actions."""
+    try:
+        return hand_row(_timestamp(record['time']), int(record['bet']), int(record['payout']),
+                        record['outcome'], _cards(record['player']), _cards(record['dealer']),
+                        record.get('actions') or '')
+    except (KeyError, ValueError, IndexError) as e:
+        raise ValueError(f"record {number}: {e}") from None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import hand logs into the hand history database')
+    parser.add_argument('logs', nargs='+', help='JSON-lines or CSV hand logs to import')
+    parser.add_argument('--db', default=HISTORY_FILE, help=f'History database (default: {HISTORY_FILE})')
+    args = parser.parse_args()
+
+    history = HandHistory(args.db)
+    for path in args.logs:
+        start = time.perf_counter()
+        imported = history.import_log(path)
+        elapsed = time.perf_counter() - start
+        print(f"{path}: {imported:,} hands in {elapsed:.1f}s ({imported / max(elapsed, 1e-9):,.0f} hands/s)")
+    print(f"{args.db}: {history.count():,} hands")
+    history.close()
+
+
+if __name__ == "__main__":
+    main()
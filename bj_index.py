@@ -0,0 +1,345 @@
+# Count-based strategy deviations ("index plays") for the Hi-Lo count.
+#
+# Basic strategy is exact for a full shoe, but the best play depends on the
+# cards that are left: 16 against a 10 is a hit off the top and a stand once
+# the shoe is rich in tens. This module finds, for every player total and
+# dealer up card, the best play at each Hi-Lo true count.
+#
+# For one up card at a time it deals random shoes to a random depth (within
+# the penetration) until that up card turns up, then computes the exact EV of
+# standing, hitting and doubling every total from the cards left
+# (bj_strategy.UpCardAnalysis). Each sample goes into the bucket of the true
+# count the player sees, truncated like an index number and clipped to
+# MIN_TC..MAX_TC. Batches of samples run across a process pool and the parent
+# adds them to the buckets as they come back; an up card stops as soon as, in
+# every bucket, the best play's EV is clear of the others' by a 95%
+# confidence interval (or the difference is too small to matter). Every batch
+# has its own seeded stream, so the table doesn't depend on the number of
+# workers.
+#
+# The result is cached in .bj_cache/deviations.json: the best play per
+# table_index per bucket, so the hint line finds it with two list lookups.
+import argparse
+import math
+import os
+import time
+from collections import Counter
+
+from bj_core import MAX_DECKS, MIN_DECKS
+from bj_journal import read_snapshot, write_atomic
+from bj_rng import make_rng
+from bj_stats import Z_95
+from bj_strategy import ACTIONS, TABLE_SIZE, UpCardAnalysis, load_strategy, shoe_counts, table_index
+
+# Bump whenever the sampling or the EV model changes so stale tables get rebuilt
+CACHE_VERSION = 2
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.bj_cache', 'deviations.json')
+
+# True counts beyond these share the end buckets
+MIN_TC = -6
+MAX_TC = 6
+BUCKETS = MAX_TC - MIN_TC + 1
+# Hi-Lo tag per card value 1-10 (ace is 1)
+HILO_TAGS = (-1, 1, 1, 1, 1, 1, 0, 0, 0, -1)
+# Hard totals 4-21 and soft totals 12-21, as (score, soft, hard part)
+STATES = [(score, False, score) for score in range(4, 22)] + [(score, True, score - 10) for score in range(12, 22)]
+# Action pairs whose EV difference is tracked: stand/hit, stand/double, hit/double
+PAIRS = ((0, 1), (0, 2), (1, 2))
+
+# Samples per task, and tasks per up card per round
+BATCH = 200
+ROUND_TASKS = 4
+# Samples a bucket needs before its confidence interval means anything
+MIN_SAMPLES = 50
+# EV differences (per unit bet) too small to be worth a deviation
+TOLERANCE = 0.005
+# Samples per up card before giving up on separating the rest
+MAX_SAMPLES = 40000
+
+
+def tc_bucket(true_count):
+    """Bucket of a true count: truncated toward zero, like an index number, and clipped."""
+    return min(max(int(true_count), MIN_TC), MAX_TC) - MIN_TC
+
+
+def cards_dealt(decks, penetration):
+    """Cards dealt from the shoe before the reshuffle."""
+    return int(52 * decks * penetration)
+
+
+def _empty():
+    # Per state per bucket: [samples, EV sums (stand, hit, double), sums of squared EV differences per PAIR]
+    return [[[0] + [0.0] * 6 for _ in range(BUCKETS)] for _ in STATES]
+
+
+def sample_up_card(task):
+    """Worker entry point: `samples` situations with one dealer up card. Returns (up_value, bucket sums)."""
+    up_value, decks, hit_soft_17, penetration, seed, stream, samples = task
+    rng = make_rng('mt', seed, stream)
+    cards = [value for value, count in enumerate(shoe_counts(decks), 1) for _ in range(count)]
+    dealt = cards_dealt(decks, penetration)
+    sums = _empty()
+    done = 0
+    while done < samples:
+        rng.shuffle(cards)
+        depth = rng.randrange(dealt)
+        try:
+            # Deal to a random depth, then on until the up card comes out
+            position = cards.index(up_value, depth)
+        except ValueError:
+            continue
+        if position >= dealt:
+            continue
+        running = sum(HILO_TAGS[value - 1] for value in cards[:position + 1])
+        bucket = tc_bucket(running * 52 / (len(cards) - position - 1))
+        left = Counter(cards[position:])  # Still holds the up card, which UpCardAnalysis removes
+        analysis = UpCardAnalysis(tuple(left[value] for value in range(1, 11)), up_value, hit_soft_17)
+        for i, (score, soft, hard) in enumerate(STATES):
+            evs = (analysis.stand(hard, soft), analysis.hit(hard, soft), analysis.double(hard, soft))
+            totals = sums[i][bucket]
+            totals[0] += 1
+            for a in range(3):
+                totals[1 + a] += evs[a]
+            for p, (a, b) in enumerate(PAIRS):
+                totals[4 + p] += (evs[a] - evs[b]) ** 2
+        done += 1
+    return up_value, sums
+
+
+def _merge(into, sums):
+    for state_into, state in zip(into, sums):
+        for totals_into, totals in zip(state_into, state):
+            for j, value in enumerate(totals):
+                totals_into[j] += value
+
+
+def _pair_sq(totals, a, b):
+    return totals[4 + PAIRS.index((min(a, b), max(a, b)))]
+
+
+def best_play(totals, actions=3):
+    """(best action index, settled) for one bucket, choosing among the first `actions` of ACTIONS."""
+    n = totals[0]
+    if not n:
+        return None, False
+    means = [totals[1 + a] / n for a in range(actions)]
+    best = max(range(actions), key=lambda a: (means[a], -a))
+    if n < MIN_SAMPLES:
+        return best, False
+    for other in range(actions):
+        if other == best:
+            continue
+        diff = means[best] - means[other]
+        variance = max(_pair_sq(totals, best, other) / n - diff * diff, 0.0) * n / (n - 1)
+        margin = Z_95 * math.sqrt(variance / n)
+        if diff - margin <= 0 and margin >= TOLERANCE:
+            return best, False
+    return best, True
+
+
+def settled(sums):
+    """Whether every bucket reached so far, in every state, has a clear best play, with and without doubling."""
+    return all(best_play(totals, actions)[1] for state in sums for totals in state if totals[0] for actions in (3, 2))
+
+
+def generate(decks, hit_soft_17=False, penetration=0.75, workers=None, seed=0, max_samples=MAX_SAMPLES, progress=None):
+    """Sample until every up card settles or reaches `max_samples`. Returns ({up_value: bucket sums}, {up_value: samples})."""
+    from concurrent.futures import ProcessPoolExecutor  # Only the generator needs a pool, not the game loading a table
+    if cards_dealt(decks, penetration) < 1:
+        raise ValueError(f"penetration {penetration} deals no cards from {decks} deck(s)")
+    workers = workers or os.cpu_count() or 1
+    sums = {up_value: _empty() for up_value in range(1, 11)}
+    samples = dict.fromkeys(sums, 0)
+    pending = list(sums)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        rounds = 0
+        while pending:
+            tasks = [(up_value, decks, hit_soft_17, penetration, seed, f"{up_value}:{rounds}:{i}", BATCH)
+                     for up_value in pending for i in range(ROUND_TASKS)]
+            results = pool.map(sample_up_card, tasks) if pool else map(sample_up_card, tasks)
+            for up_value, batch in results:  # In task order, so the sums are too
+                _merge(sums[up_value], batch)
+                samples[up_value] += BATCH
+            rounds += 1
+            pending = [up for up in pending if samples[up] < max_samples and not settled(sums[up])]
+            if progress:
+                progress(samples, pending)
+    finally:
+        if pool:
+            pool.shutdown()
+    return sums, samples
+
+
+def _fill(row):
+    # Buckets nobody reached take the play of the nearest reached bucket toward zero
+    zero = -MIN_TC
+    for start, stop, step in ((zero - 1, -1, -1), (zero + 1, BUCKETS, 1)):
+        for bucket in range(start, stop, step):
+            if row[bucket] is None:
+                row[bucket] = row[bucket - step]
+    return row
+
+
+def build_table(sums, samples, decks, hit_soft_17=False):
+    """Turn sampled sums into the deviation table.
+
+    'first' (with doubling) and 'later' (stand or hit) hold, per table_index,
+    the best play in each bucket, or None for totals that aren't tracked. The
+    true count 0 bucket is the basic strategy play, so it always agrees with
+    the hint, and a play only replaces it in another bucket when it's better
+    by at least TOLERANCE, so near-ties don't show up as deviations.
+    """
+    strategy = load_strategy(decks, hit_soft_17)
+    first = [None] * TABLE_SIZE
+    later = [None] * TABLE_SIZE
+    unsettled = 0
+    for up_value, state_sums in sums.items():
+        up_points = 11 if up_value == 1 else up_value
+        for (score, soft, hard), buckets in zip(STATES, state_sums):
+            index = table_index(score, soft, up_points)
+            for table, kind, actions in ((first, 'first', 3), (later, 'later', 2)):
+                plays = [best_play(totals, actions) for totals in buckets]
+                unsettled += sum(1 for totals, (_, ok) in zip(buckets, plays) if totals[0] and not ok)
+                base = ACTIONS.index(strategy[kind][index])
+                row = []
+                for bucket, (totals, (play, _)) in enumerate(zip(buckets, plays)):
+                    if bucket == -MIN_TC or (play is not None and (totals[1 + play] - totals[1 + base]) / totals[0] < TOLERANCE):
+                        play = base
+                    row.append(None if play is None else ACTIONS[play])
+                table[index] = _fill(row)
+    return {'decks': decks, 'hit_soft_17': hit_soft_17, 'min_tc': MIN_TC, 'max_tc': MAX_TC,
+            'samples': {str(up): count for up, count in samples.items()}, 'unsettled': unsettled,
+            'first': first, 'later': later}
+
+
+def cache_key(decks, hit_soft_17=False):
+    return f"{decks}{'h17' if hit_soft_17 else 's17'}"
+
+
+def _read_cache(path):
+    try:
+        return read_snapshot(path)
+    except ValueError:
+        return None
+
+
+def save_table(table, path=CACHE_FILE):
+    data = _read_cache(path)
+    if not data or data.get('version') != CACHE_VERSION:
+        data = {'version': CACHE_VERSION, 'tables': {}}
+    data['tables'][cache_key(table['decks'], table['hit_soft_17'])] = table
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_atomic(path, data)
+
+
+class Deviations:
+    """A deviation table: the best play for a total, up card and Hi-Lo true count, in O(1)."""
+
+    __slots__ = ('first', 'later')
+
+    def __init__(self, table):
+        self.first = table['first']
+        self.later = table['later']
+
+    def play(self, score, soft, up_points, can_double, true_count):
+        """'Stand', 'Hit' or 'Double', or None for a total the table doesn't cover."""
+        if score > 21:
+            return None
+        row = (self.first if can_double else self.later)[table_index(score, soft, up_points)]
+        return row[tc_bucket(true_count)] if row else None
+
+
+def load_deviations(decks, hit_soft_17=False, path=CACHE_FILE):
+    """The cached table for these rules, or None if it hasn't been generated.
+
+    Generating one takes minutes, so unlike the strategy table this never
+    builds it on the fly: run `python bj_index.py --decks N` first.
+    """
+    data = _read_cache(path)
+    if not data or data.get('version') != CACHE_VERSION:
+        return None
+    table = data['tables'].get(cache_key(decks, hit_soft_17))
+    if table is None or len(table.get('first', ())) != TABLE_SIZE:
+        return None
+    return Deviations(table)
+
+
+def index_plays(table, kind='first'):
+    """Yield (score, soft, up_points, [(first bucket's true count, play)]) for every row whose play changes with the count."""
+    for soft, scores in ((False, range(5, 21)), (True, range(13, 21))):
+        for score in scores:
+            for up_points in range(2, 12):
+                row = table[kind][table_index(score, soft, up_points)]
+                if row is None or len(set(row)) == 1:
+                    continue
+                runs = [(MIN_TC, row[0])]
+                for bucket, play in enumerate(row):
+                    if play != runs[-1][1]:
+                        runs.append((MIN_TC + bucket, play))
+                yield score, soft, up_points, runs
+
+
+def format_runs(runs):
+    """'Hit ≤ -1, Stand ≥ +0' style description of a row's plays."""
+    parts = []
+    for i, (low, play) in enumerate(runs):
+        high = runs[i + 1][0] - 1 if i + 1 < len(runs) else MAX_TC
+        if i == 0:
+            parts.append(f"{play} ≤ {high:+d}")
+        elif i == len(runs) - 1:
+            parts.append(f"{play} ≥ {low:+d}")
+        else:
+            parts.append(f"{play} {low:+d}..{high:+d}")
+    return ", ".join(parts)
+
+
+def print_indices(table, kind='first'):
+    print(f"HI-LO INDEX PLAYS ({table['decks']} deck{'s' if table['decks'] != 1 else ''}, "
+          f"dealer {'hits' if table['hit_soft_17'] else 'stands on'} soft 17, "
+          f"{'first two cards' if kind == 'first' else 'after the first hit'})")
+    for score, soft, up_points, runs in index_plays(table, kind):
+        up = 'A' if up_points == 11 else up_points
+        print(f"  {'soft' if soft else 'hard'} {score:>2} v {up:<2}  {format_runs(runs)}")
+    samples = sum(table['samples'].values())
+    print(f"  True counts truncated; {samples:,} samples, {table['unsettled']} bucket(s) left unseparated")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate Hi-Lo strategy deviations (index plays) for the hint line')
+    parser.add_argument('--decks', type=int, default=1, choices=range(MIN_DECKS, MAX_DECKS + 1), metavar=f'{MIN_DECKS}-{MAX_DECKS}', help='Decks in the shoe (default: 1)')
+    parser.add_argument('--h17', action='store_true', help='Dealer hits soft 17')
+    parser.add_argument('--penetration', type=float, default=0.75, help='Fraction of the shoe dealt before the reshuffle (default: 0.75)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the sampled shoes (default: 0)')
+    parser.add_argument('--max-samples', type=int, default=MAX_SAMPLES, help=f'Samples per up card at most (default: {MAX_SAMPLES})')
+    parser.add_argument('--show', action='store_true', help="Print the cached table instead of generating one")
+    args = parser.parse_args()
+    if not 0 < args.penetration <= 1:
+        parser.error('--penetration must be between 0 and 1')
+    if cards_dealt(args.decks, args.penetration) < 1:
+        parser.error(f"--penetration {args.penetration} deals no cards from {args.decks} deck(s)")
+
+    if args.show:
+        data = _read_cache(CACHE_FILE) or {}
+        table = data.get('tables', {}).get(cache_key(args.decks, args.h17)) if data.get('version') == CACHE_VERSION else None
+        if table is None:
+            raise SystemExit(f"No deviation table for {args.decks} deck(s) yet: run without --show to generate one")
+        print_indices(table)
+        return
+
+    def progress(samples, pending):
+        done = sum(samples.values())
+        print(f"\r  {done:,} samples, {len(pending)} up card(s) still separating  ", end='', flush=True)
+
+    start = time.perf_counter()
+    sums, samples = generate(args.decks, args.h17, args.penetration, args.workers, args.seed, args.max_samples, progress)
+    print()
+    table = build_table(sums, samples, args.decks, args.h17)
+    save_table(table)
+    print_indices(table)
+    print(f"  Generated in {time.perf_counter() - start:.1f}s and saved to {CACHE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
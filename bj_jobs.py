@@ -0,0 +1,339 @@
+# Sharded batch jobs: long headless simulations split into shards that any
+# number of workers, on any number of hosts, pick up through a shared
+# directory, and that survive crashes.
+#
+# A job is the same run as bj_sim.run_simulation: the hands are split into
+# CHUNK_SIZE chunks, chunk i played from stream i of the job's seed. A shard
+# is a fixed range of those chunks, so the shards, and every number in the
+# report, are decided when the job is created, not by who plays what.
+#
+# The job directory holds:
+#
+#   job.json                    the parameters, written once by `init`
+#   shards/NNNNN.lock           a worker's claim on shard NNNNN, created with
+#                               O_EXCL so only one worker gets it. The worker
+#                               touches it after every chunk; a lock that
+#                               hasn't been touched for `stale` seconds belongs
+#                               to a dead worker and may be taken over
+#   shards/NNNNN.checkpoint     the chunks finished so far and their totals,
+#                               rewritten every CHECKPOINT_EVERY seconds. A
+#                               worker taking over a shard resumes from here
+#   shards/NNNNN.done           the shard's totals
+#   report.json                 the merged totals, once every shard is done
+#
+# Every file is written through a temporary file and a rename, which is
+# atomic on local disks and on NFS. The totals are integer sums, so merging
+# the shards is exact, and the report equals a single run of the same job.
+import argparse
+import json
+import os
+import random
+import socket
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from bj_core import MAX_DECKS, MIN_DECKS, Strategy
+from bj_journal import read_snapshot, write_atomic
+from bj_rng import add_rng_argument
+from bj_sim import CHUNK_SIZE, SimResult, format_report, make_tasks, run_chunk
+
+FORMAT_VERSION = 1
+# Chunks per shard: 50 chunks is a million hands, about 15 seconds of one core
+SHARD_CHUNKS = 50
+# Seconds between checkpoints of a shard in progress
+CHECKPOINT_EVERY = 10.0
+# Seconds without a heartbeat after which a lock is considered abandoned
+STALE_AFTER = 120.0
+
+
+class JobError(Exception):
+    pass
+
+
+def _shard_file(path, shard, kind):
+    return os.path.join(path, 'shards', f"{shard:05d}.{kind}")
+
+
+def create_job(path, hands, seed=None, bet=10, decks=1, penetration=0.75, rng='mt', shard_chunks=SHARD_CHUNKS):
+    """Write job.json for a new job in `path` and return the job."""
+    if rng == 'secrets':
+        raise JobError("a sharded job needs a seeded generator, not secrets")
+    if seed is None:
+        seed = random.randrange(2**32)
+    chunks = len(make_tasks(hands, seed, bet, decks, penetration, rng))
+    job = {
+        'version': FORMAT_VERSION, 'hands': hands, 'seed': seed, 'bet': bet, 'decks': decks,
+        'penetration': penetration, 'rng': rng, 'chunk_size': CHUNK_SIZE, 'shard_chunks': shard_chunks,
+        'shards': -(-chunks // shard_chunks),
+    }
+    os.makedirs(os.path.join(path, 'shards'), exist_ok=True)
+    if os.path.exists(os.path.join(path, 'job.json')):
+        raise JobError(f"{path} already holds a job")
+    write_atomic(os.path.join(path, 'job.json'), job)
+    return job
+
+
+def load_job(path):
+    job = read_snapshot(os.path.join(path, 'job.json'))
+    if job is None:
+        raise JobError(f"{path} holds no job: create one with init")
+    if job.get('version') != FORMAT_VERSION:
+        raise JobError(f"{path}: unsupported job version {job.get('version')}")
+    if job['chunk_size'] != CHUNK_SIZE:
+        raise JobError(f"{path} was created with {job['chunk_size']}-hand chunks, this version plays {CHUNK_SIZE}")
+    return job
+
+
+def shard_tasks(job, shard):
+    """The bj_sim chunk tasks that make up one shard."""
+    tasks = make_tasks(job['hands'], job['seed'], job['bet'], job['decks'], job['penetration'], job['rng'])
+    first = shard * job['shard_chunks']
+    return tasks[first:first + job['shard_chunks']]
+
+
+def make_owner():
+    """A name for one worker, unique across hosts."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _read(path):
+    # A JSON file another worker may be replacing or removing right now, {} if it's gone
+    try:
+        return read_snapshot(path) or {}
+    except ValueError:
+        return {}
+
+
+class ShardLock:
+    """A worker's claim on one shard, held as a lock file in the job directory."""
+
+    def __init__(self, path, shard, owner):
+        self.path = _shard_file(path, shard, 'lock')
+        self.shard = shard
+        self.owner = owner
+
+    def acquire(self, stale=STALE_AFTER):
+        """Create the lock, taking it over first if its holder stopped beating. Returns True if it's ours."""
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not self._break_stale(stale):
+                    return False
+                continue
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'owner': self.owner, 'claimed': time.time()}, f)
+            return True
+        return False
+
+    def _break_stale(self, stale):
+        try:
+            age = time.time() - os.stat(self.path).st_mtime
+            holder = _read(self.path)
+        except FileNotFoundError:
+            return True  # Released since
+        if age < stale:
+            return False
+        # Move the lock aside: of several workers breaking it, only one rename succeeds
+        moved = f"{self.path}.{self.owner.replace(':', '-')}.stale"
+        try:
+            os.rename(self.path, moved)
+        except FileNotFoundError:
+            return True
+        if _read(moved) != holder:
+            # A fresh claim replaced the stale lock after it was checked: put it back
+            try:
+                os.link(moved, self.path)
+            except FileExistsError:
+                pass
+            os.remove(moved)
+            return False
+        os.remove(moved)
+        return True
+
+    def held(self):
+        """Whether the lock is still ours (it isn't if another worker judged us dead)."""
+        return _read(self.path).get('owner') == self.owner
+
+    def beat(self):
+        os.utime(self.path)
+
+    def release(self):
+        if self.held():
+            os.remove(self.path)
+
+
+def _checkpoint(path, shard, done, result, elapsed, owner):
+    write_atomic(_shard_file(path, shard, 'checkpoint'), {
+        'shard': shard, 'chunks': done, 'result': result.to_dict(), 'elapsed': elapsed, 'owner': owner,
+    })
+
+
+def run_shard(path, job, lock, checkpoint_every=CHECKPOINT_EVERY):
+    """Play the rest of a claimed shard, checkpointing as it goes. Returns True once its totals are written."""
+    tasks = shard_tasks(job, lock.shard)
+    saved = _read(_shard_file(path, lock.shard, 'checkpoint'))
+    if saved:
+        done, result, elapsed = saved['chunks'], SimResult.from_dict(saved['result']), saved['elapsed']
+    else:
+        done, result, elapsed = 0, SimResult(job['bet']), 0.0
+    last_checkpoint = time.perf_counter()
+    while done < len(tasks):
+        start = time.perf_counter()
+        result.merge(run_chunk(tasks[done]))
+        done += 1
+        elapsed += time.perf_counter() - start
+        if not lock.held():
+            return False  # Taken over: the new holder redoes the chunks since the last checkpoint
+        lock.beat()
+        if done < len(tasks) and time.perf_counter() - last_checkpoint >= checkpoint_every:
+            _checkpoint(path, lock.shard, done, result, elapsed, lock.owner)
+            last_checkpoint = time.perf_counter()
+    write_atomic(_shard_file(path, lock.shard, 'done'), {
+        'shard': lock.shard, 'result': result.to_dict(), 'elapsed': elapsed, 'owner': lock.owner,
+        'finished': time.time(),
+    })
+    try:
+        os.remove(_shard_file(path, lock.shard, 'checkpoint'))
+    except FileNotFoundError:
+        pass
+    lock.release()
+    return True
+
+
+def claim_shard(path, job, owner, stale=STALE_AFTER):
+    """Lock the first shard that isn't done or held by a live worker, or return None."""
+    names = set(os.listdir(os.path.join(path, 'shards')))
+    for shard in range(job['shards']):
+        if f"{shard:05d}.done" in names:
+            continue
+        lock = ShardLock(path, shard, owner)
+        if lock.acquire(stale):
+            if os.path.exists(_shard_file(path, shard, 'done')):
+                lock.release()  # Finished between the listing and the lock
+                continue
+            return lock
+    return None
+
+
+def work(path, stale=STALE_AFTER, checkpoint_every=CHECKPOINT_EVERY, owner=None):
+    """Worker entry point: claim and play shards until none are left. Returns the number of shards finished."""
+    job = load_job(path)
+    Strategy.table(job['decks'])
+    owner = owner or make_owner()
+    finished = 0
+    while True:
+        lock = claim_shard(path, job, owner, stale)
+        if lock is None:
+            return finished
+        finished += run_shard(path, job, lock, checkpoint_every)
+
+
+def run_workers(path, workers=None, stale=STALE_AFTER, checkpoint_every=CHECKPOINT_EVERY):
+    """Run `workers` worker processes on this host until the job has no shards left to claim."""
+    workers = workers or os.cpu_count() or 1
+    job = load_job(path)
+    Strategy.table(job['decks'])  # Build or load the strategy table once, before forking
+    if workers == 1:
+        return work(path, stale, checkpoint_every)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(work, path, stale, checkpoint_every) for _ in range(workers)]
+        return sum(future.result() for future in futures)
+
+
+def collect(path, job=None):
+    """Merge every shard's totals so far.
+
+    Returns (SimResult, shards done, shards in progress, owners). Finished
+    shards count in full and shards in progress up to their last
+    checkpoint. The merge is in shard order, though integer sums would come
+    out the same in any order.
+    """
+    job = job or load_job(path)
+    total = SimResult(job['bet'])
+    done = running = 0
+    owners = set()
+    for shard in range(job['shards']):
+        saved = _read(_shard_file(path, shard, 'done'))
+        if saved:
+            done += 1
+        else:
+            saved = _read(_shard_file(path, shard, 'checkpoint'))
+            if not saved:
+                continue
+            running += 1
+        total.merge(SimResult.from_dict(saved['result']))
+        total.elapsed += saved['elapsed']
+        owners.add(saved['owner'])
+    return total, done, running, owners
+
+
+def format_job_report(job, result, done, running, owners):
+    hosts = {owner.rsplit(':', 2)[0] for owner in owners}
+    lines = [format_report(result, job['seed'], len(owners), job['decks'], job['penetration']),
+             f"  Shards:       {done} of {job['shards']} done, {running} in progress, "
+             f"{job['shard_chunks'] * job['chunk_size']:,} hands each, on {len(hosts)} host{'s' if len(hosts) != 1 else ''}",
+             f"  Progress:     {result.hands:,} of {job['hands']:,} hands ({result.hands / job['hands']:.1%})",
+             f"  Worker time:  {result.elapsed:.2f}s summed over the shards, so the speed is per worker"]
+    if done < job['shards']:
+        lines.append("  Partial results: shards in progress count up to their last checkpoint")
+    return "\n".join(lines)
+
+
+def report(path):
+    """Merge the shards, write report.json once the job is complete, and return the report text."""
+    job = load_job(path)
+    result, done, running, owners = collect(path, job)
+    text = format_job_report(job, result, done, running, owners)
+    if done == job['shards']:
+        write_atomic(os.path.join(path, 'report.json'), {'job': job, 'result': result.to_dict(), 'report': text})
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sharded, checkpointed simulation jobs that any number of hosts can work on through a shared directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    init = commands.add_parser('init', help='Create a job')
+    init.add_argument('path', help='Job directory (shared between the hosts)')
+    init.add_argument('--hands', type=int, required=True, help='Hands to play')
+    init.add_argument('--seed', type=int, help='Root seed (default: random, recorded in the job)')
+    init.add_argument('--bet', type=int, default=10, help='Flat bet per hand (default: 10)')
+    init.add_argument('--decks', type=int, default=1, choices=range(MIN_DECKS, MAX_DECKS + 1), metavar=f'{MIN_DECKS}-{MAX_DECKS}', help='Decks in the shoe (default: 1)')
+    init.add_argument('--penetration', type=float, default=0.75, help='Fraction of the shoe dealt before the reshuffle (default: 0.75)')
+    init.add_argument('--shard-chunks', type=int, default=SHARD_CHUNKS, help=f'{CHUNK_SIZE:,}-hand chunks per shard (default: {SHARD_CHUNKS})')
+    add_rng_argument(init)
+
+    worker = commands.add_parser('work', help='Play shards until none are left, then report')
+    worker.add_argument('path', help='Job directory')
+    worker.add_argument('--workers', type=int, help='Worker processes on this host (default: all cores)')
+    worker.add_argument('--stale', type=float, default=STALE_AFTER, help=f'Seconds without a heartbeat before a shard is taken over (default: {STALE_AFTER:g})')
+    worker.add_argument('--checkpoint', type=float, default=CHECKPOINT_EVERY, help=f'Seconds between checkpoints (default: {CHECKPOINT_EVERY:g})')
+
+    status = commands.add_parser('report', help='Merge the results so far')
+    status.add_argument('path', help='Job directory')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'init':
+            if args.hands <= 0 or args.shard_chunks <= 0:
+                parser.error('--hands and --shard-chunks must be positive')
+            if not 0 < args.penetration <= 1:
+                parser.error('--penetration must be between 0 and 1')
+            job = create_job(args.path, args.hands, args.seed, args.bet, args.decks, args.penetration,
+                             args.rng, args.shard_chunks)
+            print(f"Job in {args.path}: {job['hands']:,} hands in {job['shards']} shards, seed {job['seed']}, "
+                  f"{job['rng']} shuffles")
+        elif args.command == 'work':
+            finished = run_workers(args.path, args.workers, args.stale, args.checkpoint)
+            print(f"Finished {finished} shard{'s' if finished != 1 else ''} here")
+            print(report(args.path))
+        else:
+            print(report(args.path))
+    except JobError as e:
+        raise SystemExit(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
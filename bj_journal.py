@@ -0,0 +1,169 @@
+# Save file as a snapshot plus an append-only journal.
+#
+# Every hand appends one JSON line to the journal. A background thread does
+# the writing and batches the fsyncs, so the game never waits on the disk.
+# Every so often (and on a clean quit) the current state is compacted into
+# the snapshot, which is written to a temporary file and renamed into place,
+# so a crash can never leave a half-written save. Records carry increasing
+# sequence numbers and the snapshot remembers the last one it includes, so
+# after an unclean exit the journal tail is simply replayed on top of it.
+import atexit
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+
+# Seconds a written record may wait for its fsync, so one fsync covers a burst
+FSYNC_INTERVAL = 0.5
+# Records appended before the state is compacted into the snapshot
+COMPACT_EVERY = 200
+
+_STOP = object()
+
+
+def journal_path(snapshot_path):
+    """Where the journal for a snapshot file lives."""
+    return os.path.splitext(snapshot_path)[0] + '.journal'
+
+
+def write_atomic(path, data):
+    """Write `data` as JSON to `path` through a temporary file and a rename."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        return None  # Only saves written before the snapshot was atomic can be torn
+
+
+def read_journal(path, after=0):
+    """Return (records with seq > `after`, byte offset of the end of the last good record).
+
+    Reading stops at the first incomplete or unreadable line, which is what an
+    interrupted append leaves behind.
+    """
+    records = []
+    good = 0
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return records, good
+    with f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            good += len(line)
+            if record.get('seq', 0) > after:
+                records.append(record)
+    return records, good
+
+
+class HandJournal:
+    """Durable game state: a snapshot file plus a journal of records written in the background."""
+
+    def __init__(self, snapshot_path, compact_every=COMPACT_EVERY, fsync_interval=FSYNC_INTERVAL):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path(snapshot_path)
+        self.compact_every = compact_every
+        self.fsync_interval = fsync_interval
+        self.seq = 0
+        self.since_compact = 0
+        self.queue = None
+        self.thread = None
+        self.error = None
+
+    def recover(self):
+        """Load the snapshot and the journal records written after it, then start the writer.
+
+        Returns (snapshot dict or None, records). A torn last record is cut off
+        so new records go after the last good one.
+        """
+        snapshot = read_snapshot(self.snapshot_path)
+        base = snapshot.get('seq', 0) if snapshot else 0
+        records, good = read_journal(self.journal_path, base)
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > good:
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(good)
+        self.seq = records[-1]['seq'] if records else base
+        self.since_compact = len(records)
+        self._start()
+        return snapshot, records
+
+    def _start(self):
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='hand-journal', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def append(self, record):
+        """Queue `record` (a dict) for the journal and return its sequence number."""
+        self.seq += 1
+        self.since_compact += 1
+        record = dict(record, seq=self.seq, time=datetime.now().isoformat())
+        self.queue.put(('append', record))
+        return self.seq
+
+    @property
+    def compaction_due(self):
+        return self.since_compact >= self.compact_every
+
+    def compact(self, state):
+        """Queue a snapshot of `state` covering every record appended so far."""
+        self.since_compact = 0
+        snapshot = dict(state, seq=self.seq, timestamp=datetime.now().isoformat())
+        self.queue.put(('compact', snapshot))
+
+    def close(self):
+        """Write out everything queued and stop the writer."""
+        if self.thread is None:
+            return
+        self.queue.put((_STOP, None))
+        self.thread.join()
+        self.thread = None
+        atexit.unregister(self.close)
+
+    def _run(self):
+        f = open(self.journal_path, 'ab')
+        unsynced = False
+        try:
+            while True:
+                try:
+                    kind, item = self.queue.get(timeout=self.fsync_interval if unsynced else None)
+                except queue.Empty:
+                    os.fsync(f.fileno())
+                    unsynced = False
+                    continue
+                if kind == 'append':
+                    f.write(json.dumps(item, separators=(',', ':')).encode() + b'\n')
+                    f.flush()
+                    unsynced = True
+                elif kind == 'compact':
+                    # The snapshot supersedes the journal, so the journal is
+                    # only emptied once the snapshot is safely in place
+                    write_atomic(self.snapshot_path, item)
+                    f.close()
+                    f = open(self.journal_path, 'wb')
+                    unsynced = False
+                else:
+                    break
+            if unsynced:
+                os.fsync(f.fileno())
+        except OSError as e:
+            self.error = e  # Keep the game running; the caller can report it
+        finally:
+            f.close()
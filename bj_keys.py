@@ -0,0 +1,155 @@
+# Keyboard input. On a terminal the game reads single keypresses, so a move
+# is one key with no Enter, and bets are edited on a line of their own. Keys
+# go through a queue: anything typed while the dealer is animating is kept
+# and answers the next prompts in order (type-ahead). When stdin isn't a
+# terminal (piped or scripted sessions) every prompt reads a whole line with
+# input() instead, exactly as before.
+import atexit
+import codecs
+import os
+import sys
+from collections import deque
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows
+    termios = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+ENTER = '\n'
+BACKSPACE = ('\x7f', '\b')
+EOF = '\x04'  # Ctrl+D
+# Keys that only cut an animation short and aren't kept as type-ahead, so
+# tapping space or Enter to hurry the dealer can't answer the next prompt
+SKIP_ONLY = (' ', '\r', '\n')
+
+
+class KeyInput:
+    """Prompts that take single keys on a terminal and whole lines otherwise."""
+
+    def __init__(self, stream=None, output=None, raw=True):
+        self.stream = stream or sys.stdin
+        self.output = output or sys.stdout
+        self.pending = deque()
+        self.saved = None
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        self.raw = raw and self._is_terminal() and (termios is not None or msvcrt is not None)
+
+    def _is_terminal(self):
+        try:
+            return self.stream.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    @property
+    def any_key(self):
+        """What to tell the player to press to carry on."""
+        return 'any key' if self.raw else 'Enter'
+
+    def start(self):
+        """Put the terminal in cbreak mode (no echo, no line buffering) until close()."""
+        if not self.raw or termios is None:
+            return
+        fd = self.stream.fileno()
+        try:
+            self.saved = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+        except termios.error:
+            self.saved = None
+            self.raw = False
+            return
+        atexit.register(self.close)
+
+    def close(self):
+        if self.saved is not None:
+            termios.tcsetattr(self.stream.fileno(), termios.TCSADRAIN, self.saved)
+            self.saved = None
+            atexit.unregister(self.close)
+
+    def feed(self, text):
+        """Queue keys for the next prompts."""
+        if text.startswith('\x1b'):
+            return  # Arrow and function keys
+        for key in text:
+            self.pending.append(ENTER if key == '\r' else key)
+
+    def typeahead(self, text):
+        """Queue keys pressed during an animation, leaving out the ones that only skip it."""
+        self.feed(''.join(key for key in text if key not in SKIP_ONLY))
+
+    def read_key(self):
+        """The next key, from the queue or else from the keyboard."""
+        while not self.pending:
+            self.feed(self._read())
+        return self.pending.popleft()
+
+    def _read(self):
+        if termios is not None:
+            data = os.read(self.stream.fileno(), 64)
+            if not data:
+                raise EOFError
+            return self.decoder.decode(data)
+        return msvcrt.getwch()
+
+    def _write(self, text):
+        self.output.write(text)
+        self.output.flush()
+
+    def choose(self, prompt, choices):
+        """Return the first key pressed that is one of `choices`, in lower case.
+
+        Without a terminal this returns the whole line typed, lowered and stripped.
+        """
+        if not self.raw:
+            return input(prompt).strip().lower()
+        self._write(prompt)
+        while True:
+            key = self.read_key()
+            if key == EOF:
+                raise EOFError
+            key = key.lower()
+            if key in choices:
+                self._write(key + '\n')  # Echo the choice
+                return key
+
+    def line(self, prompt, instant=''):
+        """Return a line typed with simple editing, lowered and stripped.
+
+        A key in `instant` pressed on an empty line is returned straight away.
+        """
+        if not self.raw:
+            return input(prompt).strip().lower()
+        self._write(prompt)
+        text = ''
+        while True:
+            key = self.read_key()
+            if key == ENTER:
+                break
+            if key in BACKSPACE:
+                if text:
+                    text = text[:-1]
+                    self._write('\b \b')
+            elif key == EOF:
+                if not text:
+                    raise EOFError
+            elif not text and key.lower() in instant:
+                text = key
+                self._write(key)
+                break
+            elif key.isprintable():
+                text += key
+                self._write(key)
+        self._write('\n')
+        return text.strip().lower()
+
+    def wait(self):
+        """Wait for any key (Enter without a terminal)."""
+        if not self.raw:
+            input()
+            return
+        if self.read_key() == EOF:
+            raise EOFError
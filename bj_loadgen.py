@@ -0,0 +1,121 @@
+# Load generator for bj_server.py.
+#
+# Opens many concurrent sessions, each a JOIN followed by hands played with
+# the basic strategy hints for the rules the server sends back, and reports
+# how many sessions the server held, hands and requests per second, and the
+# request latency percentiles the clients saw (from BET, HIT, STAND, DOUBLE
+# or SURRENDER to the reply).
+import argparse
+import asyncio
+import json
+import time
+
+from bj_core import Strategy, parse_card
+from bj_profile import PhaseStats
+from bj_rules import Rules
+from bj_server import HOST, PORT, raise_file_limit
+
+_COMMANDS = {'Hit': b'HIT\n', 'Stand': b'STAND\n', 'Double': b'DOUBLE\n', 'Surrender': b'SURRENDER\n'}
+
+
+class LoadResults:
+    def __init__(self):
+        self.latency = PhaseStats()
+        self.connected = 0
+        self.hands = 0
+        self.requests = 0
+        self.errors = 0
+
+
+async def player(number, host, port, duration, bet, results, prefix):
+    """One client: join as `prefix`-`number` and play until `duration` seconds have passed."""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        results.errors += 1
+        return
+    clock = time.perf_counter_ns
+    latency = results.latency
+
+    async def request(line):
+        start = clock()
+        writer.write(line)
+        reply = await reader.readline()
+        latency.add(clock() - start)
+        results.requests += 1
+        if not reply:
+            raise ConnectionError("server closed the connection")
+        state = json.loads(reply)
+        if 'error' in state:
+            results.errors += 1
+        return state
+
+    try:
+        state = await request(f"JOIN {prefix}-{number}\n".encode())
+        if 'error' in state:
+            return
+        results.connected += 1
+        rules = Rules(**state['rules'])
+        Strategy.table(rules.decks, rules.hit_soft_17)  # Loaded by the first session to sit down, cached for the rest
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            if state['state'] == 'broke':
+                state = await request(b'REBUY\n')
+            state = await request(f"BET {min(bet, state['balance'])}\n".encode())
+            while state.get('state') == 'player_turn':
+                up_card = parse_card(state['dealer'][0])
+                move = Strategy.get_basic_strategy(state['score'], up_card, state['soft'], state['can_double'], rules.decks,
+                                                   rules.hit_soft_17, state['can_surrender'])
+                state = await request(_COMMANDS[move])
+            results.hands += 1
+        writer.write(b'QUIT\n')
+    except (OSError, ValueError, KeyError):
+        results.errors += 1
+    finally:
+        writer.close()
+
+
+async def run_load(sessions, duration, host=HOST, port=PORT, bet=10, ramp=1.0, prefix='load'):
+    """Run `sessions` clients for `duration` seconds. Returns (LoadResults, elapsed seconds)."""
+    results = LoadResults()
+    start = time.perf_counter()
+    tasks = []
+    for number in range(sessions):
+        tasks.append(asyncio.create_task(player(number, host, port, duration, bet, results, prefix)))
+        if ramp:
+            await asyncio.sleep(ramp / sessions)  # Spread the connects out so the listen queue keeps up
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - start
+
+
+def format_results(results, elapsed, sessions):
+    d = results.latency.to_dict()
+    return "\n".join([
+        f"Sessions:   {results.connected:,} of {sessions:,} connected",
+        f"Hands:      {results.hands:,} in {elapsed:.1f}s ({results.hands / elapsed:,.0f} hands/s)",
+        f"Requests:   {results.requests:,} ({results.requests / elapsed:,.0f} req/s), {results.errors:,} errors",
+        f"Latency:    p50 {d['p50_ms']:.2f} ms  p95 {d['p95_ms']:.2f} ms  p99 {d['p99_ms']:.2f} ms  max {d['max_ms']:.2f} ms",
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play many concurrent sessions against bj_server.py and report throughput and latency')
+    parser.add_argument('--sessions', type=int, default=1000, help='Concurrent sessions (default: 1000)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds each session plays for (default: 10)')
+    parser.add_argument('--host', default=HOST, help=f'Server address (default: {HOST})')
+    parser.add_argument('--port', type=int, default=PORT, help=f'Server port (default: {PORT})')
+    parser.add_argument('--bet', type=int, default=10, help='Bet per hand (default: 10)')
+    parser.add_argument('--ramp', type=float, default=1.0, help='Seconds over which to open the sessions (default: 1)')
+    parser.add_argument('--prefix', default='load', help='Player name prefix (default: load); players are named load-0, load-1, ...')
+    args = parser.parse_args()
+
+    raise_file_limit()
+    results, elapsed = asyncio.run(run_load(args.sessions, args.duration, args.host, args.port,
+                                            args.bet, args.ramp, args.prefix))
+    print(format_results(results, elapsed, args.sessions))
+    if results.errors:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
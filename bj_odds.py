@@ -0,0 +1,150 @@
+# Dealer outcome probabilities for whatever cards are still unseen.
+#
+# Every way the dealer can finish from a given up card is a multiset of drawn
+# point values, and its probability only depends on the composition through a
+# product of falling factorials, one per value. The multisets (with the number
+# of valid draw orders) never change, so they're enumerated once per up card
+# and reused for every composition. When a card comes out, only the factor row
+# for its value changes, and evaluating a composition is a single pass over a
+# fixed list of terms.
+from functools import lru_cache
+
+from bj_core import CARD_HARD, DEALER_STANDS_ON, RANK_HARD
+
+# Dealer final totals, in the order outcomes() returns them, then bust
+DEALER_TOTALS = (17, 18, 19, 20, 21)
+BUST = len(DEALER_TOTALS)
+# Most cards of one value the dealer can draw in a single hand
+MAX_DRAWS = 16
+
+
+@lru_cache(maxsize=None)
+def dealer_terms(up_value, hit_soft_17=False):
+    """Every finishing draw for a dealer showing `up_value` (1-10, ace is 1).
+
+    With hit_soft_17 the dealer draws to soft 17 instead of standing.
+
+    Returns a tuple of (outcome, cards drawn, terms) groups, where each term
+    is (orderings, factor indexes) and the indexes point into
+    DealerOdds.factors.
+    """
+    terms = {}
+
+    def draw(hard, has_ace, drawn):
+        soft = has_ace and hard <= 11
+        score = hard + 10 if soft else hard
+        if hard > 21 or (score >= DEALER_STANDS_ON and not (hit_soft_17 and soft and score == DEALER_STANDS_ON)):
+            key = (drawn, BUST if hard > 21 else score - 17)
+            terms[key] = terms.get(key, 0) + 1
+            return
+        for value in range(1, 11):
+            counts = list(drawn)
+            counts[value - 1] += 1
+            draw(hard + value, has_ace or value == 1, tuple(counts))
+
+    draw(up_value, up_value == 1, (0,) * 10)
+    groups = {}
+    for (drawn, outcome), orderings in terms.items():
+        indexes = tuple((value - 1) * MAX_DRAWS + m for value, m in zip(range(1, 11), drawn) if m)
+        groups.setdefault((outcome, sum(drawn)), []).append((orderings, indexes))
+    return tuple((outcome, drawn, tuple(group)) for (outcome, drawn), group in groups.items())
+
+
+class DealerOdds:
+    """Probabilities of the dealer busting or finishing on 17-21.
+
+    Tracks how many cards of each point value (1-10) are still unseen.
+    It can watch a Shoe, updating as cards are seen and resetting on the
+    reshuffle, or be fed counts directly by analysis scripts.
+    """
+
+    def __init__(self, counts=None, decks=1, hit_soft_17=False):
+        if counts is None:
+            counts = [4 * decks] * 9 + [16 * decks]
+        self.counts = list(counts)
+        self.hit_soft_17 = hit_soft_17
+        # factors[(value - 1) * MAX_DRAWS + m] = counts * (counts - 1) * ... (m terms)
+        self.factors = [0.0] * (10 * MAX_DRAWS)
+        for value in range(1, 11):
+            self._refresh(value)
+        self._results = {}
+
+    @classmethod
+    def for_shoe(cls, shoe, hit_soft_17=False):
+        """Create odds for the unseen cards of `shoe` and keep them in step with it."""
+        odds = cls(cls.shoe_counts(shoe), hit_soft_17=hit_soft_17)
+        shoe.watchers.append(odds)
+        return odds
+
+    @staticmethod
+    def shoe_counts(shoe):
+        counts = [0] * 10
+        for rank, count in enumerate(shoe.rank_counts):
+            counts[RANK_HARD[rank] - 1] += count
+        return counts
+
+    def _refresh(self, value):
+        count = self.counts[value - 1]
+        base = (value - 1) * MAX_DRAWS
+        # Floats rather than exact ints: big-int products are several times slower
+        product = 1.0
+        self.factors[base] = 1.0
+        for m in range(1, MAX_DRAWS):
+            product *= max(count - m + 1, 0)
+            self.factors[base + m] = product
+
+    def remove(self, value):
+        """A card of this point value is no longer unseen."""
+        self.counts[value - 1] -= 1
+        self._refresh(value)
+        self._results.clear()
+
+    def restore(self, value):
+        self.counts[value - 1] += 1
+        self._refresh(value)
+        self._results.clear()
+
+    # Shoe watcher interface
+    def card_seen(self, card):
+        self.remove(CARD_HARD[card])
+
+    def shuffled(self, shoe):
+        self.counts = self.shoe_counts(shoe)
+        for value in range(1, 11):
+            self._refresh(value)
+        self._results.clear()
+
+    def outcomes(self, up_value):
+        """Return (P17, P18, P19, P20, P21, Pbust) for a dealer showing `up_value`.
+
+        The up card must already be out of the unseen counts.
+        """
+        result = self._results.get(up_value)
+        if result is not None:
+            return result
+
+        total = sum(self.counts)
+        falling = [1.0]
+        for n in range(1, 32):
+            falling.append(falling[-1] * max(total - n + 1, 0))
+
+        # Terms are grouped by outcome and number of cards drawn, so each
+        # group shares one falling-factorial denominator
+        probs = [0.0] * (BUST + 1)
+        factors = self.factors
+        for outcome, drawn, group in dealer_terms(up_value, self.hit_soft_17):
+            if not falling[drawn]:
+                continue
+            weight = 0.0
+            for orderings, indexes in group:
+                p = orderings
+                for i in indexes:
+                    p *= factors[i]
+                weight += p
+            probs[outcome] += weight / falling[drawn]
+        result = tuple(probs)
+        self._results[up_value] = result
+        return result
+
+    def bust_chance(self, up_value):
+        return self.outcomes(up_value)[BUST]
@@ -0,0 +1,109 @@
+# Bot players. A policy decides everything a player decides at the table:
+# how much to bet and which move to make, given only what a player sitting
+# there could see. The tournament (bj_tournament.py) plays policies against
+# each other, and anything that can drive a TableSession can use them.
+#
+# A policy is called as policy(hand, dealer_up_card, balance, moves):
+# with hand None it returns the bet for the next hand, otherwise one of the
+# letters in `moves`, the moves allowed right now: 'H' (hit), 'S' (stand),
+# 'D' (double) and 'R' (surrender), as in session logs. Policies that count
+# cards define card_seen and shuffled and get attached to the shoe as
+# watchers, so they only see cards as they're turned face up.
+#
+# Register new policies with @register('name') in any module and pass the
+# module to the tournament with --module.
+from bj_core import Strategy
+from bj_count import CardCounter
+from bj_rules import Rules
+
+# name -> Policy subclass
+POLICIES = {}
+
+STRATEGY_MOVES = {'Hit': 'H', 'Stand': 'S', 'Double': 'D', 'Surrender': 'R'}
+
+
+def register(name):
+    """Class decorator that adds a policy to POLICIES under `name`."""
+    def add(cls):
+        if name in POLICIES:
+            raise ValueError(f"policy {name!r} is already registered")
+        cls.name = name
+        POLICIES[name] = cls
+        return cls
+    return add
+
+
+def make_policy(name, base_bet=10, decks=1, rules=None):
+    try:
+        cls = POLICIES[name]
+    except KeyError:
+        raise ValueError(f"unknown policy {name!r}, choose from {', '.join(sorted(POLICIES))}") from None
+    return cls(base_bet, decks, rules)
+
+
+class Policy:
+    """Base class for policies at a table with `rules`: a flat bet of `base_bet`, and subclasses choose the moves."""
+    name = None
+
+    def __init__(self, base_bet=10, decks=1, rules=None):
+        self.base_bet = base_bet
+        self.decks = decks
+        self.rules = rules or Rules(decks=decks)
+
+    def __call__(self, hand, dealer_up_card, balance, moves='HS'):
+        if hand is None:
+            return self.bet(balance)
+        return self.decide(hand, dealer_up_card, balance, moves)
+
+    def bet(self, balance):
+        return min(self.base_bet, balance)
+
+    def decide(self, hand, dealer_up_card, balance, moves):
+        raise NotImplementedError
+
+
+@register('basic')
+class BasicStrategy(Policy):
+    """The game's strategy hints, flat betting."""
+
+    def decide(self, hand, dealer_up_card, balance, moves):
+        return STRATEGY_MOVES[Strategy.get_basic_strategy(hand.score, dealer_up_card, hand.soft, 'D' in moves, self.decks,
+                                                          self.rules.hit_soft_17, 'R' in moves)]
+
+
+@register('mimic-dealer')
+class MimicDealer(Policy):
+    """Play like the dealer: hit below 17, never double."""
+
+    def decide(self, hand, dealer_up_card, balance, moves):
+        return 'H' if hand.score < 17 else 'S'
+
+
+@register('never-bust')
+class NeverBust(Policy):
+    """Only hit when no card can bust the hand."""
+
+    def decide(self, hand, dealer_up_card, balance, moves):
+        return 'H' if hand.score <= 11 or (hand.soft and hand.score < 18) else 'S'
+
+
+@register('hilo-spread')
+class HiLoSpread(BasicStrategy):
+    """Basic strategy, betting one unit per point of Hi-Lo true count, from 1 up to 8 units."""
+
+    MAX_UNITS = 8
+
+    def __init__(self, base_bet=10, decks=1, rules=None):
+        super().__init__(base_bet, decks, rules)
+        self.counter = CardCounter('hilo', decks)
+
+    # Shoe watcher interface
+    def card_seen(self, card):
+        self.counter.card_seen(card)
+
+    def shuffled(self, shoe):
+        self.counter.shuffled(shoe)
+
+    def bet(self, balance):
+        units = min(max(1, int(self.counter.true_count)), self.MAX_UNITS)
+        return min(self.base_bet * units, balance)
@@ -0,0 +1,225 @@
+# Frame renderer: collects everything a screen prints, compares it cell by
+# cell with the previous frame and sends only the cells that changed, in a
+# single write. Replaces clearing and repainting the whole terminal.
+import io
+import os
+import re
+import sys
+import time
+import unicodedata
+from contextlib import contextmanager
+
+ESC = '\x1b['
+BLACK = 40
+CLEAR_SCREEN = f'{ESC}{BLACK}m{ESC}2J{ESC}H'
+# Lines left free under a frame for the options, prompts and replies printed
+# after it. If the terminal is too short for that, diffing isn't safe because
+# the screen may have scrolled, so the frame is repainted in full instead.
+PROMPT_MARGIN = 16
+# Unchanged cells shorter than this between two changed runs are resent
+# rather than paying for another cursor move
+MERGE_GAP = 6
+
+_SGR = re.compile(r'\x1b\[([0-9;]*)([A-Za-z])')
+
+
+def _apply_sgr(style, params):
+    """Return the (intensity, fg, bg) style after an SGR escape."""
+    intensity, fg, bg = style
+    for part in (params.split(';') if params else ['0']):
+        code = int(part) if part else 0
+        if code == 0:
+            intensity, fg, bg = 0, 0, 0
+        elif code in (1, 2):
+            intensity = code
+        elif code == 22:
+            intensity = 0
+        elif 30 <= code <= 37 or 90 <= code <= 97:
+            fg = code
+        elif code == 39:
+            fg = 0
+        elif 40 <= code <= 47 or 100 <= code <= 107:
+            bg = code
+        elif code == 49:
+            bg = 0
+    return intensity, fg, bg
+
+
+def style_code(style):
+    intensity, fg, bg = style
+    codes = ['0']
+    if intensity:
+        codes.append(str(intensity))
+    if fg:
+        codes.append(str(fg))
+    if bg:
+        codes.append(str(bg))
+    return f"{ESC}{';'.join(codes)}m"
+
+
+def _char_width(char):
+    return 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+
+
+def parse_frame(text):
+    """Split ANSI text into rows of (char, style) cells, plus the style at the end.
+
+    Wide characters take two cells, the second one holding None. Escapes
+    other than colours are dropped. Text starts on the black background a
+    full repaint leaves, so both ways of drawing a frame show the same cells.
+    """
+    rows = []
+    cells = []
+    style = (0, 0, BLACK)
+
+    def add_text(chunk):
+        nonlocal cells
+        for i, line in enumerate(chunk.split('\n')):
+            if i:
+                rows.append(cells)
+                cells = []
+            if line.isascii():
+                cells.extend((char, style) for char in line)
+            else:
+                for char in line:
+                    cells.append((char, style))
+                    if _char_width(char) == 2:
+                        cells.append((None, style))
+
+    pos = 0
+    for match in _SGR.finditer(text):
+        add_text(text[pos:match.start()])
+        if match.group(2) == 'm':
+            style = _apply_sgr(style, match.group(1))
+        pos = match.end()
+    add_text(text[pos:])
+    if cells:
+        rows.append(cells)
+    return rows, style
+
+
+def _emit(cells, start, end, out, style):
+    for char, cell_style in cells[start:end]:
+        if char is None:
+            continue
+        if cell_style != style:
+            out.append(style_code(cell_style))
+            style = cell_style
+        out.append(char)
+    return style
+
+
+class FrameRenderer:
+    """Draws frames at the top of the screen and only resends what changed.
+
+    `size` (columns, lines) stands in for the terminal size when `stream`
+    isn't a terminal, e.g. a buffer in benchmarks.
+    """
+
+    def __init__(self, stream=None, size=None):
+        self.stream = stream or sys.stdout
+        self.size = size
+        self.previous = None
+        self.frames = 0
+        self.full_repaints = 0
+        self.total_bytes = 0
+        self.total_raw_bytes = 0
+        self.total_time = 0.0
+        self.last_bytes = 0
+        self.last_time = 0.0
+
+    def invalidate(self):
+        """Something else drew on the screen, so the next frame is a full repaint."""
+        self.previous = None
+
+    def clear(self):
+        """Clear the screen to black without spawning a shell."""
+        self.stream.write(CLEAR_SCREEN)
+        self.stream.flush()
+        self.previous = None
+
+    @contextmanager
+    def frame(self):
+        """Capture everything printed inside the block and present it as one frame."""
+        real_stdout = sys.stdout
+        buffer = io.StringIO()
+        sys.stdout = buffer
+        try:
+            yield
+        finally:
+            sys.stdout = real_stdout
+        self.present(buffer.getvalue())
+
+    def _can_diff(self, rows):
+        if self.previous is None:
+            return False
+        try:
+            columns, lines = self.size or os.get_terminal_size(self.stream.fileno())
+        except (OSError, AttributeError, ValueError):
+            return False
+        height = max(len(rows), len(self.previous))
+        widest = max((len(row) for row in rows), default=0)
+        return widest < columns and height + PROMPT_MARGIN <= lines
+
+    def present(self, text):
+        start = time.perf_counter()
+        rows, end_style = parse_frame(text)
+        if self._can_diff(rows):
+            output = self._diff(rows, end_style)
+        else:
+            output = CLEAR_SCREEN + text
+            self.full_repaints += 1
+        self.stream.write(output)
+        self.stream.flush()
+        self.previous = rows
+
+        self.last_time = time.perf_counter() - start
+        self.last_bytes = len(output.encode('utf-8'))
+        self.frames += 1
+        self.total_time += self.last_time
+        self.total_bytes += self.last_bytes
+        self.total_raw_bytes += len(CLEAR_SCREEN) + len(text.encode('utf-8'))
+
+    def _diff(self, rows, end_style):
+        out = []
+        style = None
+        blank_style = (0, 0, BLACK)
+        for r, new in enumerate(rows):
+            if r >= len(self.previous):
+                # Below the old frame is whatever the prompts printed, so
+                # rewrite the whole row and wipe the rest of it
+                out.append(f"{ESC}{r + 1};1H")
+                style = _emit(new, 0, len(new), out, style)
+                out.append(f"{style_code(blank_style)}{ESC}K")
+                style = blank_style
+                continue
+            old = self.previous[r]
+            if new == old:
+                continue
+            # Find runs of changed cells, merging runs separated by short gaps
+            runs = []
+            for c in range(len(new)):
+                if c >= len(old) or new[c] != old[c]:
+                    if runs and c - runs[-1][1] <= MERGE_GAP:
+                        runs[-1][1] = c + 1
+                    else:
+                        runs.append([c, c + 1])
+            for run_start, run_end in runs:
+                # Never start a run on the second half of a wide character
+                while run_start and new[run_start][0] is None:
+                    run_start -= 1
+                out.append(f"{ESC}{r + 1};{run_start + 1}H")
+                style = _emit(new, run_start, run_end, out, style)
+            if len(old) > len(new):
+                out.append(f"{ESC}{r + 1};{len(new) + 1}H{style_code(blank_style)}{ESC}K")
+                style = blank_style
+        # Park the cursor under the frame and wipe whatever was printed there
+        out.append(f"{ESC}{len(rows) + 1};1H{style_code(blank_style)}{ESC}J{style_code(end_style)}")
+        return ''.join(out)
+
+    def summary(self):
+        frames = self.frames or 1
+        saved = 1 - self.total_bytes / self.total_raw_bytes if self.total_raw_bytes else 0.0
+        return (f"Frames: {self.frames} ({self.full_repaints} full repaints)  "
+                f"Avg: {self.total_bytes / frames:,.0f} bytes, {self.total_time / frames * 1000:.2f} ms per frame  "
+                f"Saved: {saved:.0%} of bytes vs full repaints")
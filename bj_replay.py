@@ -0,0 +1,207 @@
+# Session recording and replay.
+#
+# A game seeded with --seed deals the same cards every time, so a session is
+# fully described by its seed, its shoe settings and the player's decisions.
+# SessionRecorder logs exactly that, one JSON line per event, along with the
+# balance after every hand. replay_session re-runs a log headless against the
+# current rules and reports the first hand whose balance comes out different,
+# which pins regressions in settle_hand, the table, the shoe or the dealer down to one
+# hand. Archives of logs replay in parallel and double as a throughput
+# benchmark.
+import argparse
+import glob
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bj_core import Shoe, Strategy
+from bj_rng import make_rng
+from bj_rules import Rules, add_rule_arguments, rules_from_args
+from bj_table import PLAYER_TURN, TableSession
+
+FORMAT_VERSION = 1
+
+
+class SessionRecorder:
+    """Appends a session's seed and decisions to a JSON-lines log as they happen.
+
+    With flush=True (the game's setting) every event is flushed as soon as it
+    is written, so a crash keeps every finished hand.
+    """
+
+    def __init__(self, path, seed, decks, penetration, balance, flush=True, rules=None, rng='mt'):
+        self.path = path
+        self.flush = flush
+        self.file = open(path, 'a')
+        event = {'type': 'session', 'version': FORMAT_VERSION, 'seed': seed, 'decks': decks,
+                 'penetration': penetration, 'balance': balance}
+        if rules is not None:
+            event['rules'] = rules._asdict()
+        if rng != 'mt':
+            event['rng'] = rng
+        self._write(event)
+
+    def _write(self, event):
+        self.file.write(json.dumps(event, separators=(',', ':')) + '\n')
+        if self.flush:
+            self.file.flush()
+
+    def hand(self, bet, actions, balance):
+        """Record a finished hand: the stake before any double, the decisions and the new balance."""
+        self._write({'type': 'hand', 'bet': bet, 'actions': actions, 'balance': balance})
+
+    def reset(self, balance):
+        """Record a fresh start after going broke."""
+        self._write({'type': 'reset', 'balance': balance})
+
+    def close(self):
+        self.file.close()
+
+
+def run_hand(shoe, bet, decide, rules=None):
+    """Play one hand the way main() does and return (outcome, amount, actions).
+
+    decide(player_hand, dealer_up_card, first) returns the next decision:
+    'H' (hit), 'S' (stand), or when first is True also 'D' (double) or 'R'
+    (surrender). `actions` is the decisions taken, as the recorder stores them.
+    """
+    table = TableSession(shoe, balance=bet * 2, rules=rules)  # Always enough to double
+    table.place_bet(bet)
+    moves = {'H': table.hit, 'S': table.stand, 'D': table.double, 'R': table.surrender}
+    while table.state == PLAYER_TURN:
+        moves[decide(table.player_hand, table.dealer_hand[0], not table.actions)]()
+    table.play_dealer()
+    outcome, amount = table.settle()
+    return outcome, amount, table.actions
+
+
+def recorded_decisions(actions):
+    """A decide function for run_hand that plays back recorded decisions."""
+    decisions = iter(actions)
+    return lambda player_hand, dealer_up_card, first: next(decisions, 'S')
+
+
+def strategy_decisions(decks, rules=None):
+    """A decide function for run_hand that follows the strategy hints for the table's `rules`."""
+    rules = rules or Rules(decks=decks)
+    letters = {'Hit': 'H', 'Stand': 'S', 'Double': 'D', 'Surrender': 'R'}
+
+    def decide(player_hand, dealer_up_card, first):
+        can_double = first and rules.double_allowed(player_hand.hard, player_hand.soft)
+        return letters[Strategy.get_basic_strategy(player_hand.score, dealer_up_card, player_hand.soft, can_double, decks,
+                                                   rules.hit_soft_17, first and rules.surrender)]
+    return decide
+
+
+def read_session(path):
+    with open(path, 'r') as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    if not events or events[0].get('type') != 'session':
+        raise ValueError(f"{path}: not a session log")
+    if events[0].get('version') != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported session log version {events[0].get('version')}")
+    return events[0], events[1:]
+
+
+def replay_session(path):
+    """Replay a recorded session and return (path, hands, mismatches, elapsed).
+
+    Each mismatch is (hand number, recorded balance, replayed balance). The
+    replay keeps the recorded balance after a mismatch, so one regression
+    doesn't make every later hand differ too.
+    """
+    header, events = read_session(path)
+    start = time.perf_counter()
+    shoe = Shoe(header['decks'], header['penetration'], rng=make_rng(header.get('rng', 'mt'), header['seed']))
+    rules = Rules(**header['rules']) if 'rules' in header else None  # Logs from before table rules
+    balance = header['balance']
+    hands = 0
+    mismatches = []
+    for event in events:
+        if event['type'] == 'hand':
+            hands += 1
+            _, amount, _ = run_hand(shoe, event['bet'], recorded_decisions(event['actions']), rules)
+            balance += amount
+            if balance != event['balance']:
+                mismatches.append((hands, event['balance'], balance))
+                balance = event['balance']
+        elif event['type'] == 'reset':
+            balance = event['balance']
+    return path, hands, mismatches, time.perf_counter() - start
+
+
+def replay_archive(paths, workers=None):
+    """Replay many session logs across a process pool, yielding replay_session results."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) == 1:
+        yield from map(replay_session, paths)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        yield from pool.map(replay_session, paths, chunksize=max(1, len(paths) // (workers * 4)))
+
+
+def generate_session(path, seed, hands, decks=1, penetration=0.75, balance=1000, rules=None):
+    """Write a session log of `hands` hands played by the strategy hints at a table with `rules`, for benchmarks."""
+    rules = rules or Rules(decks=decks)
+    shoe = Shoe(decks, penetration, rng=random.Random(seed))
+    bets = random.Random(f"{seed}:bets")
+    decide = strategy_decisions(decks, rules)
+    recorder = SessionRecorder(path, seed, decks, penetration, balance, flush=False, rules=rules)
+    for _ in range(hands):
+        if balance <= 0:
+            balance = 1000
+            recorder.reset(balance)
+        bet = min(bets.choice((5, 10, 25, 50)), balance)
+        _, amount, actions = run_hand(shoe, bet, decide, rules)
+        balance += amount
+        recorder.hand(bet, actions, balance)
+    recorder.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded sessions and check every balance against the current rules')
+    parser.add_argument('logs', nargs='*', help='Session logs or directories of them')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--generate', type=int, metavar='N', help='Instead of replaying, write N strategy-played sessions into the first directory given')
+    parser.add_argument('--hands', type=int, default=1000, help='Hands per generated session (default: 1000)')
+    parser.add_argument('--decks', type=int, default=1, help='Decks for generated sessions (default: 1)')
+    parser.add_argument('--seed', type=int, default=0, help='First seed for generated sessions (default: 0)')
+    add_rule_arguments(parser)
+    args = parser.parse_args()
+
+    if args.generate:
+        rules = rules_from_args(args)
+        directory = args.logs[0] if args.logs else 'sessions'
+        os.makedirs(directory, exist_ok=True)
+        for i in range(args.generate):
+            generate_session(os.path.join(directory, f"session-{args.seed + i}.jsonl"), args.seed + i, args.hands, args.decks,
+                             rules=rules)
+        print(f"Wrote {args.generate} sessions of {args.hands} hands to {directory}")
+        return
+
+    paths = []
+    for path in args.logs:
+        paths.extend(sorted(glob.glob(os.path.join(path, '*.jsonl'))) if os.path.isdir(path) else [path])
+    if not paths:
+        parser.error('no session logs given')
+
+    start = time.perf_counter()
+    total_hands = 0
+    failed = 0
+    for path, hands, mismatches, _ in replay_archive(paths, args.workers):
+        total_hands += hands
+        if mismatches:
+            failed += 1
+            hand, recorded, replayed = mismatches[0]
+            print(f"FAIL {path}: {len(mismatches)} hands differ, first is hand {hand} (recorded balance {recorded}, replayed {replayed})")
+    elapsed = time.perf_counter() - start
+    print(f"{len(paths) - failed}/{len(paths)} sessions match, {total_hands:,} hands in {elapsed:.2f}s "
+          f"({total_hands / elapsed:,.0f} hands/s)")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# Shuffle generators. A Shoe only needs an object with shuffle(cards), and
+# this module makes the three kinds the game can use:
+#
+#   mt       the stdlib Mersenne Twister (random.Random). The default, and
+#            what every seed recorded so far was played with
+#   secrets  the operating system's generator (random.SystemRandom, as used
+#            by the secrets module), for play where the shuffle must not be
+#            predictable. It can't be seeded, so it can't be replayed
+#   pcg64    NumPy's PCG64, generating the permutations for up to BULK
+#            shoes in one call and handing them out one shuffle at a time
+#
+# Workers get their own streams of a root seed: stream i of seed s is
+# independent of every other stream, and the same on every run.
+#
+# Run this module to benchmark the backends and check their shuffles: a
+# chi-square test of which card lands in each position, and the serial
+# correlation of neighbouring cards and of the same position in successive
+# shuffles.
+import argparse
+import math
+import random
+import time
+
+from bj_core import CARD_HARD, FULL_DECK, MAX_DECKS, MIN_DECKS
+
+BACKENDS = ('mt', 'secrets', 'pcg64')
+# Shuffles generated per call by the pcg64 backend
+BULK = 1024
+# Significance below which a check fails. Strict, so an honest generator
+# practically never trips it and a broken one always does.
+ALPHA = 1e-6
+
+
+def _numpy():
+    # NumPy is only needed for pcg64, so it's only imported when that's used
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - numpy is optional
+        return None
+    return numpy
+
+
+class PCGShuffler:
+    """Shuffles from a NumPy PCG64 stream, generated up to BULK shoes at a time.
+
+    The batches start at one shoe and double, so a shoe that's only
+    shuffled a few times (a server seat, say) doesn't hold a thousand.
+    """
+
+    def __init__(self, seed=None, stream=None, bulk=BULK):
+        np = _numpy()
+        if np is None:
+            raise ImportError("The pcg64 generator needs NumPy: pip install numpy")
+        self.np = np
+        sequence = np.random.SeedSequence(seed, spawn_key=() if stream is None else (stream,))
+        self.rng = np.random.Generator(np.random.PCG64(sequence))
+        self.bulk = bulk
+        self.batch = 1
+        self.rows = None
+        self.index = 0
+
+    def shuffle(self, cards):
+        if self.rows is None or self.index == len(self.rows) or self.rows.shape[1] != len(cards):
+            # The cards in a shoe never change, only their order
+            np = self.np
+            base = np.sort(np.frombuffer(bytes(cards), dtype=np.uint8))
+            self.rows = self.rng.permuted(np.broadcast_to(base, (self.batch, len(base))), axis=1)
+            self.batch = min(self.batch * 2, self.bulk)
+            self.index = 0
+        cards[:] = self.rows[self.index].tobytes()
+        self.index += 1
+
+
+def make_rng(backend='mt', seed=None, stream=None):
+    """A shuffler for Shoe(rng=...): stream `stream` of `seed` from `backend`.
+
+    Without a stream, mt is seeded with the seed itself, exactly as the game
+    always has been.
+    """
+    if backend == 'mt':
+        return random.Random(seed if stream is None else f"{seed}:{stream}")
+    if backend == 'secrets':
+        return random.SystemRandom()
+    if backend == 'pcg64':
+        return PCGShuffler(seed, stream)
+    raise ValueError(f"unknown generator {backend!r}, choose from {', '.join(BACKENDS)}")
+
+
+def available_backends():
+    """The backends that can run here: pcg64 needs NumPy."""
+    return [backend for backend in BACKENDS if backend != 'pcg64' or _numpy() is not None]
+
+
+def add_rng_argument(parser):
+    parser.add_argument('--rng', choices=BACKENDS, default='mt', help='Shuffle generator: mt (default), secrets (unseeded, from the OS) or pcg64 (NumPy, bulk)')
+
+
+def shuffles(rng, count, decks=1):
+    """Yield `count` successive shuffles of a shoe as bytes.
+
+    Each starts from the cards in order, since shuffling an already random
+    order would hide a biased shuffle.
+    """
+    ordered = FULL_DECK * decks
+    for _ in range(count):
+        cards = bytearray(ordered)
+        rng.shuffle(cards)
+        yield bytes(cards)
+
+
+def chi_square_p(statistic, df):
+    """Upper tail p-value of a chi-square statistic (Wilson-Hilferty approximation, fine for large df)."""
+    z = ((statistic / df) ** (1 / 3) - (1 - 2 / (9 * df))) / math.sqrt(2 / (9 * df))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def normal_p(z):
+    """Two-sided p-value of a standard normal z."""
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def _correlation(pairs, n):
+    # Pearson correlation from sums over n (x, y) pairs
+    sx, sy, sxx, syy, sxy = pairs
+    cov = sxy / n - (sx / n) * (sy / n)
+    var_x = sxx / n - (sx / n) ** 2
+    var_y = syy / n - (sy / n) ** 2
+    return cov / math.sqrt(var_x * var_y)
+
+
+def _accumulate(sums, xs, ys):
+    # Running sums of x, y, x², y² and xy for a correlation
+    for x, y in zip(xs, ys):
+        sums[0] += x
+        sums[1] += y
+        sums[2] += x * x
+        sums[3] += y * y
+        sums[4] += x * y
+
+
+def check_shuffles(rng, count=10000, decks=1):
+    """Test `count` shuffles and return [(test, statistic, p-value)].
+
+    - position: chi-square of how often each card lands in each position
+    - neighbours: correlation of the values of adjacent cards in a shoe. In
+      a fair shuffle it is -1/(n - 1), not 0, since the cards are drawn
+      without replacement
+    - successive: correlation of the value at each position with the value
+      at the same position in the next shuffle, which should be 0
+    """
+    size = 52 * decks
+    counts = [[0] * 52 for _ in range(size)]
+    values = [CARD_HARD[card] for card in range(52)]
+    neighbours = [0.0] * 5
+    successive = [0.0] * 5
+    previous = None
+    for shoe in shuffles(rng, count, decks):
+        shoe_values = [values[card] for card in shoe]
+        for position, card in enumerate(shoe):
+            counts[position][card] += 1
+        _accumulate(neighbours, shoe_values, shoe_values[1:])
+        if previous is not None:
+            _accumulate(successive, previous, shoe_values)
+        previous = shoe_values
+
+    # Every card is equally likely in every position: count / 52 of the time
+    expected = count / 52
+    statistic = sum((c - expected) ** 2 / expected for row in counts for c in row)
+    results = [('position', statistic, chi_square_p(statistic, size * 51))]
+
+    pairs = count * (size - 1)
+    r = _correlation(neighbours, pairs)
+    z = (r + 1 / (size - 1)) * math.sqrt(pairs)
+    results.append(('neighbours', r, normal_p(z)))
+    pairs = (count - 1) * size
+    r = _correlation(successive, pairs)
+    results.append(('successive', r, normal_p(r * math.sqrt(pairs))))
+    return results
+
+
+def throughput(rng, decks=1, min_time=0.5):
+    """Shuffles per second of a shoe of `decks` decks."""
+    cards = bytearray(FULL_DECK * decks)
+    done = 0
+    start = time.perf_counter()
+    while True:
+        for _ in range(100):
+            rng.shuffle(cards)
+        done += 100
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return done / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the shuffle generators and check their shuffles for bias')
+    parser.add_argument('backends', nargs='*', help=f"Generators to test: {', '.join(BACKENDS)} (default: all available)")
+    parser.add_argument('--decks', type=int, default=6, choices=range(MIN_DECKS, MAX_DECKS + 1), metavar=f'{MIN_DECKS}-{MAX_DECKS}', help='Decks per shoe (default: 6)')
+    parser.add_argument('--shuffles', type=int, default=10000, help='Shuffles tested per generator (default: 10000)')
+    parser.add_argument('--seed', type=int, default=0, help='Root seed (default: 0)')
+    parser.add_argument('--stream', type=int, help='Test this worker stream of the seed')
+    args = parser.parse_args()
+    unknown = [b for b in args.backends if b not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown generators: {', '.join(unknown)} (choose from {', '.join(BACKENDS)})")
+    backends = args.backends or available_backends()
+
+    failed = False
+    print(f"{'generator':<10} {'shuffles/s':>12} {'position χ²':>16} {'neighbours r':>20} {'successive r':>20}")
+    for backend in backends:
+        rate = throughput(make_rng(backend, args.seed, args.stream), args.decks)
+        results = check_shuffles(make_rng(backend, args.seed, args.stream), args.shuffles, args.decks)
+        cells = []
+        for test, statistic, p in results:
+            ok = p >= ALPHA
+            failed |= not ok
+            cells.append(f"{statistic:.{0 if test == 'position' else 5}f} p={p:.3f}{'' if ok else ' FAIL'}")
+        print(f"{backend:<10} {rate:>12,.0f} {cells[0]:>16} {cells[1]:>20} {cells[2]:>20}")
+    print(f"{args.shuffles:,} shuffles of {args.decks} deck{'s' if args.decks != 1 else ''} per generator; "
+          f"a check fails below p={ALPHA:g}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Table rules. Rules() is the game's classic table: dealer stands on all 17s,
+# naturals pay 3:2, double on any first two cards, no splits or surrender.
+#
+# Rules are immutable and hashable, and key() gives a stable digest of every
+# setting, which bj_edge uses to cache the house edge of each combination.
+# The dealer never peeks for blackjack at this table, so surrender is always
+# offered before the dealer's hand is known. The split settings are only
+# modelled by bj_edge so far: the game and the server don't deal splits.
+import hashlib
+import json
+from collections import namedtuple
+
+from bj_core import DEALER_STANDS_ON, MAX_DECKS, MIN_DECKS
+
+# Which first two cards may be doubled: any, or only hard 9-11 or 10-11
+DOUBLE_ON = ('any', '9-11', '10-11')
+DOUBLE_TOTALS = {'any': None, '9-11': (9, 10, 11), '10-11': (10, 11)}
+# What a natural pays, as (win, stake)
+PAYOUTS = {'3:2': (3, 2), '6:5': (6, 5), '1:1': (1, 1)}
+# Most splits allowed (a player who splits 3 times plays 4 hands)
+MAX_SPLITS = 3
+
+_FIELDS = ('decks', 'hit_soft_17', 'blackjack_pays', 'double_on', 'double_after_split',
+           'surrender', 'max_splits', 'resplit_aces', 'hit_split_aces')
+
+
+class Rules(namedtuple('Rules', _FIELDS, defaults=(1, False, '3:2', 'any', True, False, 0, False, False))):
+    """One table's rule set. Raises ValueError for settings the game can't deal."""
+    __slots__ = ()
+
+    def __new__(cls, *args, **kwargs):
+        rules = super().__new__(cls, *args, **kwargs)
+        if not MIN_DECKS <= rules.decks <= MAX_DECKS:
+            raise ValueError(f"decks must be between {MIN_DECKS} and {MAX_DECKS}")
+        if rules.blackjack_pays not in PAYOUTS:
+            raise ValueError(f"blackjack_pays must be one of {', '.join(PAYOUTS)}")
+        if rules.double_on not in DOUBLE_ON:
+            raise ValueError(f"double_on must be one of {', '.join(DOUBLE_ON)}")
+        if not 0 <= rules.max_splits <= MAX_SPLITS:
+            raise ValueError(f"max_splits must be between 0 and {MAX_SPLITS}")
+        return rules
+
+    @property
+    def natural_pays(self):
+        return PAYOUTS[self.blackjack_pays]
+
+    def dealer_hits(self, hand):
+        """Whether the dealer draws to `hand`: below 17, and on soft 17 under H17."""
+        score = hand.score
+        return score < DEALER_STANDS_ON or (score == DEALER_STANDS_ON and self.hit_soft_17 and hand.soft)
+
+    def double_allowed(self, hard, soft):
+        """Whether a two-card total may be doubled. `hard` counts aces as 1."""
+        totals = DOUBLE_TOTALS[self.double_on]
+        return totals is None or (not soft and hard in totals)
+
+    def key(self):
+        """A stable digest of every setting, for caching results per rule set."""
+        text = json.dumps(self._asdict(), sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(text.encode()).hexdigest()[:20]
+
+    def describe(self):
+        parts = [f"{self.decks} deck{'s' if self.decks != 1 else ''}",
+                 'H17' if self.hit_soft_17 else 'S17',
+                 f"BJ {self.blackjack_pays}",
+                 'double any' if self.double_on == 'any' else f"double {self.double_on}"]
+        if self.max_splits:
+            parts.append(f"split to {self.max_splits + 1}")
+            parts.append('DAS' if self.double_after_split else 'no DAS')
+            if self.resplit_aces:
+                parts.append('RSA')
+            if self.hit_split_aces:
+                parts.append('hit split aces')
+        else:
+            parts.append('no splits')
+        if self.surrender:
+            parts.append('surrender')
+        return ', '.join(parts)
+
+
+def add_rule_arguments(parser):
+    """Add the table rule options the game and the server share."""
+    parser.add_argument('--h17', action='store_true', help='Dealer hits soft 17 (default: stands on all 17s)')
+    parser.add_argument('--blackjack-pays', choices=sorted(PAYOUTS), default='3:2', help='What a natural pays (default: 3:2)')
+    parser.add_argument('--double-on', choices=DOUBLE_ON, default='any', help='Which first two cards may be doubled (default: any)')
+    parser.add_argument('--surrender', action='store_true', help='Allow surrendering half the bet instead of playing the hand')
+
+
+def rules_from_args(args):
+    return Rules(decks=args.decks, hit_soft_17=args.h17, blackjack_pays=args.blackjack_pays,
+                 double_on=args.double_on, surrender=args.surrender)
@@ -0,0 +1,247 @@
+# Multi-table blackjack server.
+#
+# Every connection is one seat: a TableSession with its own shoe, statistics
+# and save file. The protocol is line based so it can be driven with nc or
+# telnet. The client sends one command per line:
+#
+#   JOIN name   sit down, loading name's saved balance and statistics; the
+#               reply also holds the table's rules, as a Rules dict
+#   BET n       bet n and deal a new hand
+#   HIT, STAND, DOUBLE, SURRENDER (where the table rules allow it)
+#   REBUY       start again with $100 after going broke
+#   STATS       the player's statistics
+#   QUIT        save and leave
+#
+# and gets exactly one JSON line back: the table state, or {"error": ...}.
+# Once the player's turn ends the dealer plays and the hand is settled before
+# the reply goes out, so a hand is a BET, a few moves and nothing else.
+#
+# Everything runs on one asyncio event loop. A seat costs a shoe and a few
+# small objects, and nothing blocks the loop: saves are written on a worker
+# thread every SAVE_EVERY hands and when the player leaves.
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+
+from bj_core import CARD_CODES, MAX_DECKS, MIN_DECKS, Shoe
+from bj_journal import read_snapshot, write_atomic
+from bj_rng import add_rng_argument, make_rng
+from bj_rules import add_rule_arguments, rules_from_args
+from bj_stats import Stats
+from bj_table import BROKE, PLAYER_TURN, STARTING_BALANCE, TableError, TableSession
+
+HOST = '127.0.0.1'
+PORT = 8765
+SAVE_DIR = 'saves'
+# Hands between saves of a seat's balance and statistics
+SAVE_EVERY = 20
+# Longest command line accepted, in bytes
+MAX_LINE = 256
+
+_NAME = re.compile(r'[A-Za-z0-9_-]{1,32}$')
+
+
+def raise_file_limit():
+    """Lift the open file limit to the hard limit, since every seat holds a socket."""
+    try:
+        import resource
+    except ImportError:
+        return None  # Not on Windows
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            soft = hard
+        except (ValueError, OSError):
+            pass
+    return soft
+
+
+def table_state(table):
+    """The reply for a seat: its balance, the hands (dealer's hole card hidden until it's turned) and the last result."""
+    state = {'state': table.state, 'balance': table.balance}
+    if table.player_hand is not None:
+        player, dealer = table.player_hand, table.dealer_hand
+        shown = dealer.cards[:1] if table.state == PLAYER_TURN else dealer.cards
+        state.update(bet=table.bet, player=[CARD_CODES[c] for c in player], score=player.score,
+                     soft=player.soft, dealer=[CARD_CODES[c] for c in shown],
+                     can_double=table.can_double, can_surrender=table.can_surrender)
+        if table.state != PLAYER_TURN:
+            state.update(dealer_score=dealer.score, outcome=table.outcome, amount=table.amount)
+    return state
+
+
+class TableServer:
+    """Seats players, one TableSession per connection, and saves them by name."""
+
+    def __init__(self, decks=6, penetration=0.75, save_dir=SAVE_DIR, save_every=SAVE_EVERY, rules=None, rng='mt'):
+        self.decks = decks
+        self.rng = rng
+        self.penetration = penetration
+        self.rules = rules
+        self.save_dir = save_dir
+        self.save_every = save_every
+        self.seated = set()
+        self.hands = 0
+        self.sessions = 0
+        self.started = time.perf_counter()
+        os.makedirs(save_dir, exist_ok=True)
+
+    def save_path(self, name):
+        return os.path.join(self.save_dir, f"{name}.json")
+
+    async def load(self, name):
+        snapshot = await asyncio.to_thread(read_snapshot, self.save_path(name))
+        stats = Stats()
+        if snapshot:
+            stats.from_dict(snapshot['stats'])
+            return snapshot['balance'], stats
+        return STARTING_BALANCE, stats
+
+    async def save(self, name, table):
+        data = {'balance': table.balance, 'stats': table.stats.to_dict()}
+        await asyncio.to_thread(write_atomic, self.save_path(name), data)
+
+    async def join(self, name):
+        if not _NAME.match(name):
+            raise TableError("names are 1-32 letters, digits, '-' or '_'")
+        if name in self.seated:
+            raise TableError(f"{name} is already seated")
+        self.seated.add(name)
+        try:
+            balance, stats = await self.load(name)
+        except Exception:
+            self.seated.discard(name)
+            raise
+        shoe = Shoe(self.decks, self.penetration, rng=make_rng(self.rng))
+        return TableSession(shoe, balance, stats, self.rules)
+
+    def play(self, table, command, argument):
+        """Apply one in-game command to `table`. Returns True when a hand was settled."""
+        if command == 'BET':
+            try:
+                table.place_bet(int(argument))
+            except ValueError as e:
+                raise TableError(str(e) if isinstance(e, TableError) else "BET needs a whole number") from None
+        elif command == 'HIT':
+            table.hit()
+        elif command == 'STAND':
+            table.stand()
+        elif command == 'DOUBLE':
+            table.double()
+        elif command == 'SURRENDER':
+            table.surrender()
+        elif command == 'REBUY':
+            table.rebuy()
+            return False
+        else:
+            raise TableError(f"unknown command {command!r}")
+        if table.state == PLAYER_TURN:
+            return False
+        table.play_dealer()
+        table.settle()
+        return True
+
+    async def handle(self, reader, writer):
+        self.sessions += 1
+        name = table = None
+        unsaved = 0
+
+        def send(reply):
+            writer.write(json.dumps(reply, separators=(',', ':')).encode() + b'\n')
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break  # Line too long, or the client went away
+                if not line:
+                    break
+                command, _, argument = line.decode(errors='replace').strip().partition(' ')
+                command = command.upper()
+                if not command:
+                    continue
+                try:
+                    if command == 'QUIT':
+                        break
+                    if command == 'JOIN':
+                        if table is not None:
+                            raise TableError("already seated")
+                        table = await self.join(argument.strip())
+                        name = argument.strip()
+                        send(dict(table_state(table), rules=table.rules._asdict()))
+                    elif table is None:
+                        raise TableError("JOIN first")
+                    elif command == 'STATS':
+                        send(table.stats.to_dict())
+                    else:
+                        if self.play(table, command, argument.strip()):
+                            self.hands += 1
+                            unsaved += 1
+                        send(table_state(table))
+                        if unsaved >= self.save_every or (unsaved and table.state == BROKE):
+                            unsaved = 0
+                            await self.save(name, table)
+                except TableError as e:
+                    send({'error': str(e)})
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if name is not None:
+                try:
+                    if unsaved:
+                        await self.save(name, table)
+                finally:
+                    self.seated.discard(name)
+            writer.close()
+
+    def status(self):
+        elapsed = time.perf_counter() - self.started
+        return (f"{len(self.seated):,} seated, {self.sessions:,} sessions served, "
+                f"{self.hands:,} hands ({self.hands / elapsed:,.0f} hands/s)")
+
+
+async def serve(host=HOST, port=PORT, report_every=10.0, **table_options):
+    tables = TableServer(**table_options)
+    server = await asyncio.start_server(tables.handle, host, port, limit=MAX_LINE, backlog=4096)
+    rules = f" ({tables.rules.describe()})" if tables.rules else ''
+    print(f"Serving blackjack on {host}:{port}{rules}, saves in {tables.save_dir}/", flush=True)
+    async with server:
+        while True:
+            await asyncio.sleep(report_every)
+            print(tables.status(), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve blackjack tables over TCP, one seat per connection')
+    parser.add_argument('--host', default=HOST, help=f'Address to listen on (default: {HOST})')
+    parser.add_argument('--port', type=int, default=PORT, help=f'Port to listen on (default: {PORT})')
+    parser.add_argument('--decks', type=int, default=6, choices=range(MIN_DECKS, MAX_DECKS + 1), metavar=f'{MIN_DECKS}-{MAX_DECKS}', help='Decks in each shoe (default: 6)')
+    parser.add_argument('--penetration', type=float, default=0.75, help='Fraction of each shoe dealt before the reshuffle (default: 0.75)')
+    parser.add_argument('--saves', default=SAVE_DIR, help=f'Directory for the players\' save files (default: {SAVE_DIR})')
+    parser.add_argument('--save-every', type=int, default=SAVE_EVERY, help=f'Hands between saves (default: {SAVE_EVERY})')
+    parser.add_argument('--report-every', type=float, default=10.0, help='Seconds between status lines (default: 10)')
+    add_rule_arguments(parser)
+    add_rng_argument(parser)
+    args = parser.parse_args()
+    if not 0 < args.penetration <= 1:
+        parser.error('--penetration must be between 0 and 1')
+
+    limit = raise_file_limit()
+    if limit is not None and limit < 2048:
+        print(f"Warning: only {limit} open files allowed, which caps the number of seats")
+    try:
+        asyncio.run(serve(args.host, args.port, args.report_every, decks=args.decks,
+                          penetration=args.penetration, save_dir=args.saves, save_every=args.save_every,
+                          rules=rules_from_args(args), rng=args.rng))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
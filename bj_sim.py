@@ -0,0 +1,188 @@
+# Headless simulator: plays hands with the real game rules from bj_core
+# without any rendering, sleeps, sound or keyboard input.
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bj_core import Hand, Shoe, Strategy, settle_hand
+from bj_rng import make_rng
+from bj_rules import Rules
+
+# Hands per unit of work. Every chunk gets its own stream of the root seed,
+# picked by its index, so totals never depend on how many workers ran it.
+CHUNK_SIZE = 20000
+
+WIN_OUTCOMES = ('win', 'dealer_bust', 'blackjack')
+LOSS_OUTCOMES = ('loss', 'bust', 'surrender')
+# The classic table, for callers that don't pass rules
+DEFAULT_RULES = Rules()
+
+
+class SimResult:
+    __slots__ = ('hands', 'net', 'net_sq', 'wins', 'losses', 'pushes', 'blackjacks', 'bet', 'elapsed')
+
+    def __init__(self, bet=10):
+        self.hands = 0
+        self.net = 0
+        self.net_sq = 0
+        self.wins = 0
+        self.losses = 0
+        self.pushes = 0
+        self.blackjacks = 0
+        self.bet = bet
+        self.elapsed = 0.0
+
+    def add(self, outcome, amount, natural):
+        self.hands += 1
+        self.net += amount
+        self.net_sq += amount * amount
+        if outcome in WIN_OUTCOMES:
+            self.wins += 1
+        elif outcome in LOSS_OUTCOMES:
+            self.losses += 1
+        else:
+            self.pushes += 1
+        if natural:
+            self.blackjacks += 1
+
+    def merge(self, other):
+        # Everything is an integer sum, so merging is exact in any order
+        self.hands += other.hands
+        self.net += other.net
+        self.net_sq += other.net_sq
+        self.wins += other.wins
+        self.losses += other.losses
+        self.pushes += other.pushes
+        self.blackjacks += other.blackjacks
+
+    def ev(self):
+        """Mean net result per hand in dollars."""
+        return self.net / self.hands if self.hands else 0.0
+
+    def variance(self):
+        """Population variance of the net result per hand, in dollars squared."""
+        if not self.hands:
+            return 0.0
+        mean = self.net / self.hands
+        return self.net_sq / self.hands - mean * mean
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['ev'] = self.ev()
+        data['variance'] = self.variance()
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        result = cls(data['bet'])
+        for name in cls.__slots__:
+            setattr(result, name, data[name])
+        return result
+
+
+def play_hand(deck, bet, rules=None):
+    """Play one hand the way main() does, following the strategy hints (doubles and surrender included).
+
+    `deck` is a Shoe (or a Deck, which starts every hand fresh) and `rules`
+    the table's Rules, the classic table by default. Returns (outcome,
+    amount, natural) where natural is True when the player was dealt a
+    blackjack.
+    """
+    rules = rules or DEFAULT_RULES
+    deck.start_hand()
+    player_hand = Hand((deck.deal(), deck.deal()))
+    dealer_hand = Hand((deck.deal(), deck.deal()))
+    dealer_up_card = dealer_hand[0]
+
+    natural = player_hand.blackjack
+    can_double = rules.double_allowed(player_hand.hard, player_hand.soft)
+    action = Strategy.get_basic_strategy(player_hand.score, dealer_up_card, player_hand.soft, can_double, deck.decks,
+                                         rules.hit_soft_17, rules.surrender)
+    if action == 'Surrender':
+        # As at the table: half the bet, rounded in the house's favour, and the dealer doesn't play
+        return 'surrender', -((bet + 1) // 2), natural
+    if action == 'Double':
+        player_hand.add(deck.deal())
+        bet *= 2
+    while action == 'Hit':
+        player_hand.add(deck.deal())
+        if player_hand.bust:
+            break
+        action = Strategy.get_basic_strategy(player_hand.score, dealer_up_card, player_hand.soft, False, deck.decks,
+                                             rules.hit_soft_17)
+
+    # Dealer only plays if the player hasn't busted
+    if not player_hand.bust:
+        while rules.dealer_hits(dealer_hand):
+            dealer_hand.add(deck.deal())
+
+    outcome, amount = settle_hand(player_hand, dealer_hand, bet, rules.natural_pays)
+    return outcome, amount, natural
+
+
+def run_chunk(task):
+    """Worker entry point: play one seeded chunk of hands."""
+    seed, index, hands, bet, decks, penetration, rng, rules = task
+    shoe = Shoe(decks, penetration, rng=make_rng(rng, seed, index))
+    result = SimResult(bet)
+    for _ in range(hands):
+        result.add(*play_hand(shoe, bet, rules))
+    return result
+
+
+def make_tasks(hands, seed, bet, decks, penetration, rng='mt', rules=None):
+    tasks = []
+    index = 0
+    while hands > 0:
+        size = min(CHUNK_SIZE, hands)
+        tasks.append((seed, index, size, bet, decks, penetration, rng, rules))
+        hands -= size
+        index += 1
+    return tasks
+
+
+def run_simulation(hands, workers=None, seed=None, bet=10, decks=1, penetration=0.75, rng='mt', rules=None):
+    """Simulate a number of hands across a process pool and return (SimResult, seed).
+
+    Each chunk plays through its own persistent shoe, at a table with
+    `rules` (the classic table by default).
+    """
+    if seed is None:
+        seed = random.randrange(2**32)
+    workers = workers or os.cpu_count() or 1
+    Strategy.table(decks, rules is not None and rules.hit_soft_17)  # Build or load the strategy table once, before forking
+    tasks = make_tasks(hands, seed, bet, decks, penetration, rng, rules)
+
+    total = SimResult(bet)
+    start = time.perf_counter()
+    if workers == 1 or len(tasks) == 1:
+        for task in tasks:
+            total.merge(run_chunk(task))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            for result in pool.map(run_chunk, tasks):
+                total.merge(result)
+    total.elapsed = time.perf_counter() - start
+    return total, seed
+
+
+def format_report(result, seed, workers, decks=1, penetration=0.75, rules=None):
+    hands = result.hands or 1
+    rate = result.hands / result.elapsed if result.elapsed else float('inf')
+    variance = result.variance()
+    lines = [
+        "SIMULATION RESULTS",
+        f"  Hands:        {result.hands:,} (seed {seed}, {workers} workers, ${result.bet} bet)",
+        f"  Shoe:         {decks} deck{'s' if decks != 1 else ''}, {penetration:.0%} penetration",
+        f"  Rules:        {(rules or DEFAULT_RULES)._replace(decks=decks).describe()}",
+        f"  Speed:        {rate:,.0f} hands/sec in {result.elapsed:.2f}s",
+        f"  EV per hand:  ${result.ev():+.4f} ({result.ev() / result.bet:+.4%} of bet)",
+        f"  Variance:     {variance:.4f} $^2 ({variance / result.bet ** 2:.4f} bets^2)",
+        f"  Std error:    ${(variance / hands) ** 0.5:.4f}",
+        f"  Win rate:     {result.wins / hands:.4%}",
+        f"  Loss rate:    {result.losses / hands:.4%}",
+        f"  Push rate:    {result.pushes / hands:.4%}",
+        f"  Blackjacks:   {result.blackjacks / hands:.4%}",
+    ]
+    return "\n".join(lines)
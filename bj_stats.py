@@ -0,0 +1,270 @@
+# Per-player statistics, shared by the terminal game, the table server and
+# anything else that settles hands.
+#
+# Everything is kept as a stream: each hand updates a fixed set of counters
+# in O(1), so a player's statistics take the same memory after ten hands or
+# ten million. The net result per hand is summarised by its running mean and
+# variance (Welford's method), the last WINDOW hands, and a quantile sketch.
+# Two Stats from separate workers or sessions merge into the Stats of both
+# streams of hands played one after the other.
+import math
+from collections import deque
+
+# Hands kept for the rolling window
+WINDOW = 100
+# Relative accuracy of the quantile sketch: a quantile is within 2% of the true value
+SKETCH_ACCURACY = 0.02
+_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+# Most buckets in the sketch. 2% buckets cover amounts up to $10^9 in about
+# 1,000 buckets, so this is only reached by absurd amounts, and then the
+# smallest amounts are folded together.
+SKETCH_BUCKETS = 2048
+# z for a 95% confidence interval
+Z_95 = 1.96
+
+
+def result_for(amount):
+    """The result Stats.update expects for a hand that paid `amount`."""
+    return 'win' if amount > 0 else 'loss' if amount < 0 else 'push'
+
+
+def _same_sign(a, b):
+    return (a > 0 and b > 0) or (a < 0 and b < 0)
+
+
+class QuantileSketch:
+    """Counts of amounts in logarithmic buckets, from which any quantile can be read.
+
+    Bucket i holds the amounts whose size is in (gamma^(i-1), gamma^i], signed
+    like the amount, with 0 in a bucket of its own (the DDSketch layout).
+    Merging two sketches adds their counts, which is exact.
+    """
+
+    __slots__ = ('buckets', 'count')
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+
+    @staticmethod
+    def key(amount):
+        if amount == 0:
+            return 0
+        index = 1 + math.ceil(math.log(abs(amount)) / _LOG_GAMMA)
+        return index if amount > 0 else -index
+
+    @staticmethod
+    def value(key):
+        """The amount a bucket stands for: the middle of its range, within SKETCH_ACCURACY of every amount in it."""
+        if key == 0:
+            return 0.0
+        size = 2 * _GAMMA ** (abs(key) - 1) / (_GAMMA + 1)
+        return size if key > 0 else -size
+
+    def add(self, amount, count=1):
+        key = self.key(amount)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += count
+        if len(self.buckets) > SKETCH_BUCKETS:
+            self._collapse()
+
+    def _collapse(self):
+        # Fold the smallest non-zero amounts into their neighbours, keeping
+        # the large ones (the ones that matter for the tails) accurate
+        while len(self.buckets) > SKETCH_BUCKETS:
+            key = min((k for k in self.buckets if k), key=abs)
+            count = self.buckets.pop(key)
+            outward = key + 1 if key > 0 else key - 1
+            self.buckets[outward] = self.buckets.get(outward, 0) + count
+
+    def quantile(self, q):
+        """The amount below which a fraction `q` of the hands fell, or None with no hands."""
+        if not self.count:
+            return None
+        rank = min(int(q * self.count), self.count - 1)
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return self.value(key)
+        return self.value(max(self.buckets))
+
+    def merge(self, other):
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += other.count
+        if len(self.buckets) > SKETCH_BUCKETS:
+            self._collapse()
+
+    def to_list(self):
+        return sorted(self.buckets.items())
+
+    @classmethod
+    def from_list(cls, pairs):
+        sketch = cls()
+        for key, count in pairs:
+            sketch.buckets[key] = count
+            sketch.count += count
+        return sketch
+
+
+class Stats:
+    """Results of one player's hands: counts, extremes, streaks and the spread of the net result.
+
+    `measured` counts the hands behind the mean, variance, window and sketch.
+    It only differs from games_played for statistics saved before those were
+    tracked, whose earlier hands have no amounts to go on.
+    """
+
+    __slots__ = ('games_played', 'wins', 'losses', 'pushes', 'biggest_win', 'biggest_loss',
+                 'current_streak', 'best_streak', 'hot_streak', 'opening_streak',
+                 'measured', 'net', 'mean', 'm2', 'window', 'window_net', 'sketch')
+
+    def __init__(self):
+        self.games_played = 0
+        self.wins = 0
+        self.losses = 0
+        self.pushes = 0
+        self.biggest_win = 0
+        self.biggest_loss = 0
+        self.current_streak = 0
+        self.best_streak = 0
+        self.hot_streak = 0
+        self.opening_streak = 0  # The streak the first hands made, needed to merge streaks
+        self.measured = 0
+        self.net = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared differences from the mean
+        self.window = deque(maxlen=WINDOW)
+        self.window_net = 0
+        self.sketch = QuantileSketch()
+
+    def to_dict(self):
+        return {
+            'games_played': self.games_played,
+            'wins': self.wins,
+            'losses': self.losses,
+            'pushes': self.pushes,
+            'biggest_win': self.biggest_win,
+            'biggest_loss': self.biggest_loss,
+            'current_streak': self.current_streak,
+            'best_streak': self.best_streak,
+            'hot_streak': self.hot_streak,
+            'opening_streak': self.opening_streak,
+            'measured': self.measured,
+            'net': self.net,
+            'mean': self.mean,
+            'm2': self.m2,
+            'window': list(self.window),
+            'sketch': self.sketch.to_list()
+        }
+
+    def from_dict(self, data):
+        self.games_played = data.get('games_played', 0)
+        self.wins = data.get('wins', 0)
+        self.losses = data.get('losses', 0)
+        self.pushes = data.get('pushes', 0)
+        self.biggest_win = data.get('biggest_win', 0)
+        self.biggest_loss = data.get('biggest_loss', 0)
+        self.current_streak = data.get('current_streak', 0)
+        self.best_streak = data.get('best_streak', 0)
+        self.hot_streak = data.get('hot_streak', 0)
+        self.opening_streak = data.get('opening_streak', 0)
+        self.measured = data.get('measured', 0)
+        self.net = data.get('net', 0)
+        self.mean = data.get('mean', 0.0)
+        self.m2 = data.get('m2', 0.0)
+        self.window = deque(data.get('window', ()), maxlen=WINDOW)
+        self.window_net = sum(self.window)
+        self.sketch = QuantileSketch.from_list(data.get('sketch', ()))
+
+    def update(self, result, amount):
+        self.games_played += 1
+        if result == "win":
+            self.wins += 1
+            self.current_streak = max(1, self.current_streak + 1)
+            self.biggest_win = max(self.biggest_win, amount)
+            self.hot_streak += 1
+        elif result == "loss":
+            self.losses += 1
+            self.current_streak = min(-1, self.current_streak - 1)
+            self.biggest_loss = min(self.biggest_loss, amount)
+            self.hot_streak = 0
+        else:  # push
+            self.pushes += 1
+            self.current_streak = 0
+            self.hot_streak = 0
+        self.best_streak = max(self.best_streak, abs(self.current_streak))
+        if abs(self.current_streak) == self.games_played:
+            self.opening_streak = self.current_streak
+
+        # Welford's update of the mean and variance
+        self.measured += 1
+        self.net += amount
+        delta = amount - self.mean
+        self.mean += delta / self.measured
+        self.m2 += delta * (amount - self.mean)
+        if len(self.window) == WINDOW:
+            self.window_net -= self.window[0]
+        self.window.append(amount)
+        self.window_net += amount
+        self.sketch.add(amount)
+
+    def merge(self, other):
+        """Add `other`'s hands, as if they were played after these ones."""
+        if not other.games_played:
+            return
+        if not self.games_played:
+            self.from_dict(other.to_dict())
+            return
+        # A streak can carry on across the join
+        joined = self.current_streak + other.opening_streak if _same_sign(self.current_streak, other.opening_streak) else 0
+        if abs(self.current_streak) == self.games_played and joined:
+            self.opening_streak = joined
+        if abs(other.current_streak) == other.games_played and _same_sign(self.current_streak, other.current_streak):
+            self.current_streak += other.current_streak
+        else:
+            self.current_streak = other.current_streak
+        self.best_streak = max(self.best_streak, other.best_streak, abs(joined))
+        self.hot_streak = max(0, self.current_streak)
+        self.games_played += other.games_played
+        self.wins += other.wins
+        self.losses += other.losses
+        self.pushes += other.pushes
+        self.biggest_win = max(self.biggest_win, other.biggest_win)
+        self.biggest_loss = min(self.biggest_loss, other.biggest_loss)
+
+        # Chan et al.'s combination of two Welford states
+        measured = self.measured + other.measured
+        if other.measured:
+            delta = other.mean - self.mean
+            self.mean += delta * other.measured / measured
+            self.m2 += other.m2 + delta * delta * self.measured * other.measured / measured
+        self.measured = measured
+        self.net += other.net
+        self.window.extend(other.window)
+        self.window_net = sum(self.window)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def variance(self):
+        """Sample variance of the net result per hand."""
+        return self.m2 / (self.measured - 1) if self.measured > 1 else 0.0
+
+    @property
+    def std_dev(self):
+        return math.sqrt(self.variance)
+
+    def confidence_interval(self, z=Z_95):
+        """(low, high) bounds on the mean net result per hand, 95% by default."""
+        margin = z * self.std_dev / math.sqrt(self.measured) if self.measured else 0.0
+        return self.mean - margin, self.mean + margin
+
+    @property
+    def window_mean(self):
+        """Mean net result over the last WINDOW hands."""
+        return self.window_net / len(self.window) if self.window else 0.0
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
@@ -0,0 +1,173 @@
+# Exact basic strategy for the game's rules, computed from expected values
+# and cached on disk so the hint line only ever does a table lookup.
+#
+# The dealer's final-total probabilities come from bj_odds for the shoe with
+# the up card removed. The player's draws use the same composition, so the
+# result is total-dependent basic strategy for the configured number of
+# decks. The dealer doesn't peek in this game, so a dealer natural simply
+# counts as 21.
+import argparse
+import json
+import os
+from functools import lru_cache
+
+from bj_odds import BUST, DEALER_TOTALS, DealerOdds
+
+# Bump whenever the EV model changes so stale cache files get rebuilt
+CACHE_VERSION = 2
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.bj_cache', 'strategy.json')
+
+ACTIONS = ('Stand', 'Hit', 'Double')
+# Table layout: index = (soft * 22 + score) * 12 + dealer up card points (2-11)
+TABLE_SIZE = 2 * 22 * 12
+
+
+def table_index(score, soft, up_points):
+    return (soft * 22 + score) * 12 + up_points
+
+
+def shoe_counts(decks):
+    """Cards per point value 1-10 (ace is 1) in a full shoe."""
+    return tuple([4 * decks] * 9 + [16 * decks])
+
+
+def hand_score(hard, has_ace):
+    return hard + 10 if has_ace and hard <= 11 else hard
+
+
+@lru_cache(maxsize=4096)
+def dealer_distribution(counts, up_value, hit_soft_17=False):
+    """Final-total probabilities for a dealer showing `up_value` (1-10), drawn from `counts` (a tuple).
+
+    Cached, since house-edge matrices ask for the same compositions under many rule sets.
+    """
+    odds = DealerOdds(counts, hit_soft_17=hit_soft_17)
+    odds.remove(up_value)
+    return odds.outcomes(up_value)
+
+
+def stand_ev(score, dealer):
+    """EV of standing on `score` against a dealer final-total distribution."""
+    if score > 21:
+        return -1.0
+    ev = dealer[BUST]
+    for i, total in enumerate(DEALER_TOTALS):
+        if total < score:
+            ev += dealer[i]
+        elif total > score:
+            ev -= dealer[i]
+    return ev
+
+
+class UpCardAnalysis:
+    """Player EVs against one dealer up card."""
+
+    def __init__(self, counts, up_value, hit_soft_17=False):
+        rest = list(counts)
+        rest[up_value - 1] -= 1
+        total = sum(rest)
+        self.draw = [(value, rest[value - 1] / total) for value in range(1, 11) if rest[value - 1]]
+        self.dealer = dealer_distribution(counts, up_value, hit_soft_17)
+        self.best = lru_cache(maxsize=None)(self._best)
+
+    def stand(self, hard, has_ace):
+        return stand_ev(hand_score(hard, has_ace), self.dealer)
+
+    def hit(self, hard, has_ace):
+        ev = 0.0
+        for value, p in self.draw:
+            new_hard = hard + value
+            if new_hard > 21:
+                ev -= p
+            else:
+                ev += p * self.best(new_hard, has_ace or value == 1)
+        return ev
+
+    def double(self, hard, has_ace):
+        ev = 0.0
+        for value, p in self.draw:
+            ev += p * stand_ev(hand_score(hard + value, has_ace or value == 1), self.dealer)
+        return 2 * ev
+
+    def _best(self, hard, has_ace):
+        # Best of hit and stand, which is all that's left after the first decision
+        return max(self.stand(hard, has_ace), self.hit(hard, has_ace))
+
+
+def build_strategy(decks, hit_soft_17=False):
+    """Compute the strategy table for a shoe of `decks` decks, against a dealer who hits soft 17 if `hit_soft_17`.
+
+    Returns a dict with flat lists 'first' (best of stand/hit/double on the
+    first two cards), 'later' (best of stand/hit afterwards) and 'ev'
+    ([stand, hit, double] per entry), all laid out by table_index.
+    """
+    counts = shoe_counts(decks)
+    first = ['Stand'] * TABLE_SIZE
+    later = ['Stand'] * TABLE_SIZE
+    ev = [None] * TABLE_SIZE
+    for up_points in range(2, 12):
+        analysis = UpCardAnalysis(counts, 1 if up_points == 11 else up_points, hit_soft_17)
+        # Hard totals 4-21 and soft totals 12-21 (hard part 2-11 plus an ace)
+        states = [(score, False, score) for score in range(4, 22)]
+        states += [(score, True, score - 10) for score in range(12, 22)]
+        for score, soft, hard in states:
+            evs = [analysis.stand(hard, soft), analysis.hit(hard, soft), analysis.double(hard, soft)]
+            i = table_index(score, soft, up_points)
+            ev[i] = [round(x, 12) for x in evs]
+            later[i] = ACTIONS[0 if evs[0] >= evs[1] else 1]
+            first[i] = ACTIONS[max(range(3), key=lambda a: (evs[a], -a))]
+    return {'first': first, 'later': later, 'ev': ev}
+
+
+def _read_cache(path):
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {'version': CACHE_VERSION, 'tables': {}}
+    if data.get('version') != CACHE_VERSION:
+        return {'version': CACHE_VERSION, 'tables': {}}
+    return data
+
+
+def load_strategy(decks, hit_soft_17=False, path=CACHE_FILE):
+    """Return the strategy table for `decks` and the soft-17 rule, computing and caching it if needed."""
+    data = _read_cache(path)
+    key = f"{decks}{'h17' if hit_soft_17 else 's17'}"
+    table = data['tables'].get(key)
+    if table is not None and len(table.get('first', ())) == TABLE_SIZE:
+        return table
+
+    table = build_strategy(decks, hit_soft_17)
+    data['tables'][key] = table
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # A read-only install just recomputes next time
+    return table
+
+
+def print_table(decks, hit_soft_17=False):
+    """Print the first-decision strategy chart for `decks` decks."""
+    table = load_strategy(decks, hit_soft_17)
+    letters = {'Stand': 'S', 'Hit': 'H', 'Double': 'D'}
+    header = "       " + " ".join(f"{'A' if up == 11 else up:>2}" for up in range(2, 12))
+    for soft, scores in ((False, range(5, 22)), (True, range(13, 22))):
+        print(f"{'SOFT' if soft else 'HARD'} TOTALS ({decks} deck{'s' if decks != 1 else ''}, {'H17' if hit_soft_17 else 'S17'})")
+        print(header)
+        for score in scores:
+            row = " ".join(f"{letters[table['first'][table_index(score, soft, up)]]:>2}" for up in range(2, 12))
+            print(f"  {score:>3}  {row}")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Print the basic strategy chart for the game rules')
+    parser.add_argument('--decks', type=int, default=1, help='Decks in the shoe (default: 1)')
+    parser.add_argument('--h17', action='store_true', help='Dealer hits soft 17')
+    args = parser.parse_args()
+    print_table(args.decks, args.h17)
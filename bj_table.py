@@ -0,0 +1,146 @@
+# One player's seat at the table, as a state machine.
+#
+# A hand moves BETTING -> PLAYER_TURN -> DEALER_TURN and back to BETTING (or
+# to BROKE once the money is gone). Every method is a single step that checks
+# it is legal in the current state, and none of them draw, sleep or wait for
+# input. The terminal game, session replay and the table server all play
+# through this class, so the server can keep thousands of seats and advance
+# each one only when its player's next command arrives.
+from bj_core import Hand, settle_hand
+from bj_rules import Rules
+from bj_stats import Stats, result_for
+
+STARTING_BALANCE = 100
+
+BETTING = 'betting'
+PLAYER_TURN = 'player_turn'
+DEALER_TURN = 'dealer_turn'
+BROKE = 'broke'
+
+
+class TableError(ValueError):
+    """A move that isn't allowed right now, like betting mid-hand or doubling on three cards."""
+
+
+class TableSession:
+    """One player's balance, statistics and current hand, dealt from `shoe` under `rules`."""
+
+    def __init__(self, shoe, balance=STARTING_BALANCE, stats=None, rules=None):
+        self.shoe = shoe
+        self.rules = rules or Rules(decks=shoe.decks)
+        self.balance = balance
+        self.stats = stats if stats is not None else Stats()
+        self.state = BETTING if balance > 0 else BROKE
+        self.bet = 0
+        self.player_hand = None
+        self.dealer_hand = None
+        self.actions = ''  # One letter per decision: H, S, D or R (surrender)
+        self.surrendered = False
+        self.outcome = None
+        self.amount = 0
+
+    def _require(self, state):
+        if self.state != state:
+            raise TableError(f"not allowed during {self.state.replace('_', ' ')}")
+
+    def place_bet(self, bet):
+        """Take the bet and deal a new hand."""
+        self._require(BETTING)
+        if not 0 < bet <= self.balance:
+            raise TableError(f"bet must be between 1 and {self.balance}")
+        shoe = self.shoe
+        shoe.start_hand()  # Reshuffles if the cut card has come out
+        self.bet = bet
+        self.player_hand = Hand((shoe.deal(), shoe.deal()))
+        self.dealer_hand = Hand((shoe.deal(), shoe.deal(seen=False)))  # Hole card stays face down
+        self.actions = ''
+        self.surrendered = False
+        self.outcome = None
+        self.amount = 0
+        self.state = PLAYER_TURN
+
+    def hit(self):
+        self._require(PLAYER_TURN)
+        self.actions += 'H'
+        self.player_hand.add(self.shoe.deal())
+        if self.player_hand.bust:
+            self._end_turn()
+
+    def stand(self):
+        self._require(PLAYER_TURN)
+        self.actions += 'S'
+        self._end_turn()
+
+    @property
+    def can_double(self):
+        hand = self.player_hand
+        return (self.state == PLAYER_TURN and len(hand) == 2 and self.balance >= self.bet
+                and self.rules.double_allowed(hand.hard, hand.soft))
+
+    def double(self):
+        self._require(PLAYER_TURN)
+        if not self.can_double:
+            if self.rules.double_on != 'any':
+                raise TableError(f"you can only double down on hard {self.rules.double_on}, on your first two cards and if you have enough balance")
+            raise TableError("you can only double down on your first two cards and if you have enough balance")
+        self.actions += 'D'
+        self.bet *= 2
+        self.player_hand.add(self.shoe.deal())
+        self._end_turn()
+
+    @property
+    def can_surrender(self):
+        return self.state == PLAYER_TURN and self.rules.surrender and len(self.player_hand) == 2
+
+    def surrender(self):
+        """Give up the hand for half the bet (the house keeps any odd dollar)."""
+        self._require(PLAYER_TURN)
+        if not self.can_surrender:
+            raise TableError("surrender is only allowed on your first two cards, at tables that offer it")
+        self.actions += 'R'
+        self.surrendered = True
+        self._end_turn()
+
+    def _end_turn(self):
+        self.shoe.reveal(self.dealer_hand[1])  # Dealer turns over the hole card
+        self.state = DEALER_TURN
+
+    @property
+    def dealer_must_hit(self):
+        # Dealer only plays if the player hasn't busted or surrendered
+        return (self.state == DEALER_TURN and not self.player_hand.bust and not self.surrendered
+                and self.rules.dealer_hits(self.dealer_hand))
+
+    def dealer_hit(self):
+        if not self.dealer_must_hit:
+            raise TableError("the dealer stands")
+        self.dealer_hand.add(self.shoe.deal())
+
+    def play_dealer(self):
+        while self.dealer_must_hit:
+            self.dealer_hit()
+
+    def settle(self):
+        """Pay out the finished hand and return (outcome, amount), as settle_hand does.
+
+        A surrendered hand settles as ('surrender', minus half the bet).
+        """
+        self._require(DEALER_TURN)
+        if self.dealer_must_hit:
+            raise TableError("the dealer hasn't finished")
+        if self.surrendered:
+            outcome, amount = 'surrender', -((self.bet + 1) // 2)
+        else:
+            outcome, amount = settle_hand(self.player_hand, self.dealer_hand, self.bet, self.rules.natural_pays)
+        self.balance += amount
+        self.stats.update(result_for(amount), amount)
+        self.outcome, self.amount = outcome, amount
+        self.state = BROKE if self.balance <= 0 else BETTING
+        return outcome, amount
+
+    def rebuy(self, balance=STARTING_BALANCE):
+        """Start fresh after going broke, with new statistics."""
+        self._require(BROKE)
+        self.balance = balance
+        self.stats = type(self.stats)()
+        self.state = BETTING
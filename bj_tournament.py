@@ -0,0 +1,177 @@
+# Policy tournament: plays every bot policy (bj_policy) through the same
+# seeded shoes and ranks them.
+#
+# The hands are split into chunks. Chunk i is played by every policy from a
+# shoe seeded with (seed, i), so each policy is dealt from the same shuffles
+# and the differences between them come from their play and betting, not
+# from the cards. Chunks run across a process pool, each returning a Stats
+# that the parent merges exactly in chunk order, so the leaderboard doesn't
+# depend on the number of workers.
+import argparse
+import importlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bj_core import MAX_DECKS, MIN_DECKS, Shoe, Strategy
+from bj_policy import POLICIES, make_policy
+from bj_rng import add_rng_argument, make_rng
+from bj_rules import Rules, add_rule_arguments, rules_from_args
+from bj_stats import Stats
+from bj_table import BROKE, PLAYER_TURN, TableError, TableSession
+
+# Hands per unit of work
+CHUNK_SIZE = 20000
+
+
+class PolicyResult:
+    """A policy's hands, money wagered, rebuys and time spent, merged across chunks."""
+
+    def __init__(self, name, bet=10):
+        self.name = name
+        self.bet = bet
+        self.stats = Stats()
+        self.wagered = 0
+        self.rebuys = 0
+        self.elapsed = 0.0  # Time spent in the workers
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.wagered += other.wagered
+        self.rebuys += other.rebuys
+        self.elapsed += other.elapsed
+
+    @property
+    def hands(self):
+        return self.stats.games_played
+
+    @property
+    def std_error(self):
+        """Standard error of the EV per hand."""
+        return self.stats.std_dev / self.hands ** 0.5 if self.hands else 0.0
+
+    @property
+    def rate(self):
+        return self.hands / self.elapsed if self.elapsed else float('inf')
+
+
+def play_chunk(task):
+    """Worker entry point: one policy plays one seeded chunk. Returns a PolicyResult."""
+    name, seed, index, hands, bet, bankroll, decks, penetration, rules, rng, modules = task
+    for module in modules:
+        importlib.import_module(module)  # Registers the module's policies in this process
+    start = time.perf_counter()
+    policy = make_policy(name, bet, decks, rules)
+    shoe = Shoe(decks, penetration, rng=make_rng(rng, seed, index))
+    if hasattr(policy, 'card_seen'):
+        shoe.watchers.append(policy)
+    result = PolicyResult(name, bet)
+    table = TableSession(shoe, bankroll, Stats(), rules)
+    moves = {'H': table.hit, 'S': table.stand, 'D': table.double, 'R': table.surrender}
+    try:
+        for _ in range(hands):
+            if table.state == BROKE:
+                result.stats.merge(table.stats)  # rebuy starts new statistics
+                table.rebuy(bankroll)
+                result.rebuys += 1
+            table.place_bet(policy(None, None, table.balance))
+            result.wagered += table.bet
+            while table.state == PLAYER_TURN:
+                allowed = 'HS' + 'D' * table.can_double + 'R' * table.can_surrender
+                move = policy(table.player_hand, table.dealer_hand[0], table.balance, allowed)
+                if move not in allowed:
+                    raise TableError(f"chose {move!r} where only {allowed} are allowed")
+                doubled = move == 'D'
+                moves[move]()
+                if doubled:
+                    result.wagered += table.bet // 2
+            table.play_dealer()
+            table.settle()
+    except TableError as e:
+        raise TableError(f"policy {name}: {e}") from None
+    result.stats.merge(table.stats)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def make_tasks(names, hands, seed, bet, bankroll, decks, penetration, rules, rng='mt', modules=()):
+    tasks = []
+    index = 0
+    while hands > 0:
+        size = min(CHUNK_SIZE, hands)
+        for name in names:
+            tasks.append((name, seed, index, size, bet, bankroll, decks, penetration, rules, rng, tuple(modules)))
+        hands -= size
+        index += 1
+    return tasks
+
+
+def run_tournament(names, hands, workers=None, seed=0, bet=10, bankroll=1000, decks=1, penetration=0.75,
+                   rules=None, rng='mt', modules=()):
+    """Play `hands` hands with every policy in `names` and return (PolicyResults best first, elapsed)."""
+    workers = workers or os.cpu_count() or 1
+    rules = rules or Rules(decks=decks)
+    Strategy.table(decks, rules.hit_soft_17)  # Build or load the strategy table once, before forking
+    tasks = make_tasks(names, hands, seed, bet, bankroll, decks, penetration, rules, rng, modules)
+    totals = {name: PolicyResult(name, bet) for name in names}
+    start = time.perf_counter()
+    if workers == 1 or len(tasks) == 1:
+        results = map(play_chunk, tasks)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(tasks)))
+        results = pool.map(play_chunk, tasks)
+    try:
+        for result in results:  # In task order, so the merges are too
+            totals[result.name].merge(result)
+    finally:
+        if pool:
+            pool.shutdown()
+    elapsed = time.perf_counter() - start
+    return sorted(totals.values(), key=lambda r: r.stats.mean, reverse=True), elapsed
+
+
+def format_leaderboard(results):
+    lines = [f"  {'#':>2} {'policy':<18} {'EV/hand':>9} {'std err':>8} {'% wagered':>10} {'std dev':>8} "
+             f"{'rebuys':>6} {'hands/s':>9}"]
+    for rank, result in enumerate(results, 1):
+        stats = result.stats
+        returned = stats.net / result.wagered if result.wagered else 0.0
+        lines.append(f"  {rank:>2} {result.name:<18} {stats.mean:>+9.4f} {result.std_error:>8.4f} {returned:>+10.3%} "
+                     f"{stats.std_dev:>8.2f} {result.rebuys:>6} {result.rate:>9,.0f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play bot policies through the same shoes and rank them by EV')
+    parser.add_argument('policies', nargs='*', help='Policies to play (default: every registered policy)')
+    parser.add_argument('--module', action='append', default=[], help='Import MODULE first, to register its policies (repeatable)')
+    parser.add_argument('--hands', type=int, default=200000, help='Hands per policy (default: 200000)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the shoes (default: 0)')
+    parser.add_argument('--bet', type=int, default=10, help='Base bet (default: 10)')
+    parser.add_argument('--bankroll', type=int, default=1000, help='Balance at the start and after each rebuy (default: 1000)')
+    parser.add_argument('--decks', type=int, default=1, choices=range(MIN_DECKS, MAX_DECKS + 1), metavar=f'{MIN_DECKS}-{MAX_DECKS}', help='Decks in the shoe (default: 1)')
+    parser.add_argument('--penetration', type=float, default=0.75, help='Fraction of the shoe dealt before the reshuffle (default: 0.75)')
+    add_rule_arguments(parser)
+    add_rng_argument(parser)
+    args = parser.parse_args()
+    if not 0 < args.penetration <= 1:
+        parser.error('--penetration must be between 0 and 1')
+    for module in args.module:
+        importlib.import_module(module)
+    names = args.policies or sorted(POLICIES)
+    unknown = [name for name in names if name not in POLICIES]
+    if unknown:
+        parser.error(f"unknown policies: {', '.join(unknown)} (choose from {', '.join(sorted(POLICIES))})")
+
+    rules = rules_from_args(args)
+    results, elapsed = run_tournament(names, args.hands, args.workers, args.seed, args.bet, args.bankroll,
+                                      args.decks, args.penetration, rules, args.rng, args.module)
+    print(f"TOURNAMENT: {args.hands:,} hands per policy, seed {args.seed}, ${args.bet} base bet, {rules.describe()}")
+    print(format_leaderboard(results))
+    print(f"  EV and std dev in dollars per hand. {len(names) * args.hands:,} hands in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# Screen pieces: card art, the title and the table with both hands. Only
+# builds and prints text, so it can be imported (and benchmarked) without
+# the game's globals, sound or terminal setup.
+from colorama import Back, Fore, Style
+
+from bj_core import CARD_HARD, CARD_POINTS, Strategy, calculate_score, card_dict
+
+
+def print_cards(cardlist, padding=""):
+    if not cardlist:
+        return
+
+    # Add black background to padding and between cards
+    formatted_padding = f"{Back.BLACK}{padding}"
+    card_separator = f"{Back.BLACK}  "
+
+    for i in range(len(cardlist[0])):
+        print(formatted_padding + card_separator.join(card[i] for card in cardlist) + Back.BLACK)
+
+
+def hidden_card():
+    card = [
+        f'{Back.BLACK}{Fore.WHITE}╭─────────╮{Style.RESET_ALL}',
+        f'{Back.BLACK}{Fore.WHITE}│{Fore.BLUE}░░░░░░░░░{Fore.WHITE}│{Style.RESET_ALL}',
+        f'{Back.BLACK}{Fore.WHITE}│{Fore.BLUE}░░░░░░░░░{Fore.WHITE}│{Style.RESET_ALL}',
+        f'{Back.BLACK}{Fore.WHITE}│{Fore.BLUE}░░░░░░░░░{Fore.WHITE}│{Style.RESET_ALL}',
+        f'{Back.BLACK}{Fore.WHITE}│{Fore.BLUE}░░░░░░░░░{Fore.WHITE}│{Style.RESET_ALL}',
+        f'{Back.BLACK}{Fore.WHITE}│{Fore.BLUE}░░░░░░░░░{Fore.WHITE}│{Style.RESET_ALL}',
+        f'{Back.BLACK}{Fore.WHITE}╰─────────╯{Style.RESET_ALL}'
+    ]
+    return card
+
+
+def reg_card_visual(card):
+    suits = "Spades Diamonds Hearts Clubs".split()
+    suit_symbols = ['♠','♦','♥','♣']
+    suit_colors = {
+        '♠': Fore.WHITE,
+        '♦': Fore.RED,
+        '♥': Fore.RED,
+        '♣': Fore.WHITE
+    }
+
+    # Get card details
+    value = card["value"]
+    suit = suit_symbols[suits.index(card["suit"])]
+    color = suit_colors[suit]
+
+    # Create a decorative card
+    card = [
+        f'{Back.BLACK}{Fore.WHITE}╭─────────╮{Style.RESET_ALL}',
+        f'{Back.BLACK}{Fore.WHITE}│{color}{value:<9}{Fore.WHITE}│{Style.RESET_ALL}',
+        f'{Back.BLACK}{Fore.WHITE}│         │{Style.RESET_ALL}',
+        f'{Back.BLACK}{Fore.WHITE}│    {color}{suit}    {Fore.WHITE}│{Style.RESET_ALL}',
+        f'{Back.BLACK}{Fore.WHITE}│         │{Style.RESET_ALL}',
+        f'{Back.BLACK}{Fore.WHITE}│{color}{value:>9}{Fore.WHITE}│{Style.RESET_ALL}',
+        f'{Back.BLACK}{Fore.WHITE}╰─────────╯{Style.RESET_ALL}'
+    ]
+    return card
+
+
+# Card art never changes, so build it once for every card
+CARD_GLYPHS = tuple(reg_card_visual(card_dict(c)) for c in range(52))
+HIDDEN_GLYPH = hidden_card()
+
+
+def display_title(balance=None):
+    title = f"""{Back.BLACK}
+{Back.BLACK}
+{Back.BLACK}    {Fore.BLUE}██████╗ ██╗      █████╗  ██████╗██╗  ██╗     ██╗ █████╗  ██████╗██╗  ██╗{Style.RESET_ALL}{Back.BLACK}
+{Back.BLACK}    {Fore.BLUE}██╔══██╗██║     ██╔══██╗██╔════╝██║ ██╔╝     ██║██╔══██╗██╔════╝██║ ██╔╝{Style.RESET_ALL}{Back.BLACK}
+{Back.BLACK}    {Fore.CYAN}██████╔╝██║     ███████║██║     █████╔╝      ██║███████║██║     █████╔╝{Style.RESET_ALL}{Back.BLACK}
+{Back.BLACK}    {Fore.CYAN}██╔══██╗██║     ██╔══██║██║     ██╔═██╗ ██   ██║██╔══██║██║     ██╔═██╗{Style.RESET_ALL}{Back.BLACK}
+{Back.BLACK}    {Fore.WHITE}██████╔╝███████╗██║  ██║╚██████╗██║  ██╗╚█████╔╝██║  ██║╚██████╗██║  ██╗{Style.RESET_ALL}{Back.BLACK}
+{Back.BLACK}    {Fore.WHITE}╚═════╝ ╚══════╝╚═╝  ╚═╝ ╚═════╝╚═╝  ╚═╝ ╚════╝ ╚═╝  ╚═╝ ╚═════╝╚═╝  ╚═╝{Style.RESET_ALL}{Back.BLACK}
+
+{Back.BLACK}             {Fore.BLUE}♠{Fore.WHITE} 'h' for help  {Fore.CYAN}♥{Fore.WHITE} 'q' to quit {Fore.WHITE}♦{Fore.WHITE} Enter bet to play {Fore.BLUE}♣{Style.RESET_ALL}{Back.BLACK}
+"""
+    if balance is not None:
+        title += f"\n{Back.BLACK}    {Fore.CYAN}Current Balance: ${balance}{Style.RESET_ALL}{Back.BLACK}\n"
+    title += f"\n{Back.BLACK}"
+    print(title)
+
+
+def print_hands(player_hand, dealer_hand, hidden=True, dealer_action=None):
+    """Print the dealer's and the player's hands with their scores."""
+    # Display dealer's hand
+    print(f"{Back.BLACK}    {Fore.CYAN}♠ ♥ DEALER'S HAND ♦ ♣{Style.RESET_ALL}{Back.BLACK}")
+    if hidden:
+        print(f"{Back.BLACK}    {Fore.YELLOW}Hidden{Style.RESET_ALL}{Back.BLACK}")
+        print_cards([CARD_GLYPHS[c] for c in dealer_hand[:1]] + [HIDDEN_GLYPH], padding=f"{Back.BLACK}    ")
+    else:
+        dealer_score = calculate_score(dealer_hand)
+        color_dealer = Fore.GREEN if dealer_score <= 21 else Fore.RED
+        dealer_status = f"{Back.BLACK}    {color_dealer}{dealer_score}"
+        if dealer_action:
+            dealer_status += f"    {Fore.CYAN}{dealer_action}{Style.RESET_ALL}{Back.BLACK}"
+        else:
+            dealer_status += f"{Style.RESET_ALL}{Back.BLACK}"
+        print(dealer_status)
+        print_cards([CARD_GLYPHS[c] for c in dealer_hand], padding=f"{Back.BLACK}    ")
+
+    # Display player's hand
+    print(f"{Back.BLACK}\n{Back.BLACK}")
+    print(f"{Back.BLACK}    {Fore.CYAN}♠ ♥ PLAYER'S HAND ♦ ♣{Style.RESET_ALL}{Back.BLACK}")
+    player_score = calculate_score(player_hand)
+    color = Fore.GREEN if player_score <= 21 else Fore.RED
+    print(f"{Back.BLACK}    {color}{player_score}{Style.RESET_ALL}{Back.BLACK}")
+    print_cards([CARD_GLYPHS[c] for c in player_hand], padding=f"{Back.BLACK}    ")
+    print(Back.BLACK)
+
+
+def format_dealer_odds(odds, up_card):
+    """Describe how the dealer is likely to finish, given the cards still unseen."""
+    outcomes = odds.outcomes(CARD_HARD[up_card])
+    totals = '  '.join(f"{total}: {p:.0%}" for total, p in zip(range(17, 22), outcomes))
+    return f"Dealer Odds: Bust {outcomes[-1]:.0%}  {totals}"
+
+
+def print_table(player_hand, dealer_hand, hidden=True, balance=None, dealer_action=None, hot_streak=0,
+                rules=None, counter=None, odds=None, deviations=None):
+    """Print the game screen: the title, both hands and the streak.
+
+    With a `counter` (hints on) it also shows the count and, during the
+    player's turn, the strategy hint for the table's `rules`, adjusted by the
+    `deviations` table if there is one, and the dealer `odds`.
+    """
+    display_title(balance)
+    print_hands(player_hand, dealer_hand, hidden, dealer_action)
+
+    # Card counting status
+    if counter is not None:
+        print(f"{Back.BLACK}    {Fore.MAGENTA}{counter.describe()}{Style.RESET_ALL}{Back.BLACK}")
+
+    # Add basic strategy hint only during player's turn (when dealer's card is hidden)
+    if hidden and counter is not None:
+        can_double = len(player_hand) == 2 and rules.double_allowed(player_hand.hard, player_hand.soft)
+        can_surrender = rules.surrender and len(player_hand) == 2
+        suggestion = Strategy.get_basic_strategy(player_hand.score, dealer_hand[0], player_hand.soft, can_double, rules.decks, rules.hit_soft_17, can_surrender)
+        if deviations and suggestion != 'Surrender':
+            # The count can move the play away from basic strategy
+            play = deviations.play(player_hand.score, player_hand.soft, CARD_POINTS[dealer_hand[0]], can_double, counter.true_count)
+            if play and play != suggestion:
+                suggestion = f"{play} (index play at true count {counter.true_count:+.1f}, basic strategy says {suggestion})"
+        print(f"{Back.BLACK}    {Fore.CYAN}Suggested Play: {suggestion}{Style.RESET_ALL}{Back.BLACK}")
+        print(f"{Back.BLACK}    {Fore.CYAN}{format_dealer_odds(odds, dealer_hand[0])}{Style.RESET_ALL}{Back.BLACK}")
+
+    # Show hot/cold streak
+    if hot_streak >= 3:
+        print(f"{Back.BLACK}    {Fore.RED}🔥 Hot Streak: {hot_streak} wins in a row! 🔥{Style.RESET_ALL}")
@@ -0,0 +1,2 @@
+# The game's modules live at the top of the repository, next to this file,
+# so pytest puts this directory on sys.path and the tests import them as-is.
@@ -0,0 +1,45 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from bj_bankroll import MEASURE_BET, NATURAL, SAMPLE_TABLE, SYSTEMS, run, simulate, unit_payouts
+from bj_rules import Rules
+
+
+def constant_table(value):
+    return np.full(SAMPLE_TABLE, value, dtype=np.int8)
+
+
+@pytest.mark.parametrize('system', SYSTEMS)
+def test_balances_never_go_negative(system):
+    results, _ = run([system], sessions=2000, hands=300, balance=25, bet=10, sample_hands=50000)
+    assert (results[0].final >= 0).all()
+
+
+def test_double_needs_the_balance_to_cover_it():
+    # Every hand is a lost double, but $15 can't cover doubling a $10 bet
+    tables = (constant_table(-2 * MEASURE_BET), constant_table(-MEASURE_BET))
+    final, busted_at = simulate('flat', tables, sessions=4, hands=10, balance=15, bet=10)
+    assert final.tolist() == [0] * 4
+    assert busted_at.tolist() == [2] * 4  # $10 lost, then the last $5
+
+
+def test_doubles_when_the_balance_covers_it():
+    tables = (constant_table(2 * MEASURE_BET), constant_table(MEASURE_BET))
+    final, _ = simulate('flat', tables, sessions=2, hands=3, balance=20, bet=10)
+    assert final.tolist() == [80, 80]
+
+
+@pytest.mark.parametrize('pays, won', [('3:2', 15), ('6:5', 12), ('1:1', 10)])
+def test_naturals_pay_the_table_ratio(pays, won):
+    rules = Rules(blackjack_pays=pays)
+    tables = (constant_table(NATURAL), constant_table(NATURAL))
+    final, _ = simulate('flat', tables, sessions=1, hands=1, balance=100, bet=10, rules=rules)
+    assert final.tolist() == [100 + won]
+    assert unit_payouts(np.array([NATURAL]), rules)[0] == won / 10
+
+
+def test_surrender_keeps_the_odd_dollar():
+    tables = (constant_table(-MEASURE_BET // 2), constant_table(-MEASURE_BET // 2))
+    final, _ = simulate('flat', tables, sessions=1, hands=1, balance=100, bet=5)
+    assert final.tolist() == [97]
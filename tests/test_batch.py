@@ -0,0 +1,29 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import bj_batch
+from bj_batch import cross_validate
+from bj_rules import Rules
+
+
+@pytest.mark.parametrize('rules', [
+    Rules(),
+    Rules(decks=6),
+    Rules(decks=2, hit_soft_17=True),
+    Rules(decks=6, surrender=True, hit_soft_17=True),
+    Rules(blackjack_pays='6:5', double_on='10-11'),
+], ids=lambda rules: rules.describe())
+def test_batch_engine_matches_the_scalar_engine(rules):
+    assert cross_validate(shoes=150, seed=11, bet=15, decks=rules.decks, rules=rules) == []
+
+
+def test_cross_check_catches_a_wrong_play(monkeypatch):
+    build = bj_batch.build_action_tables
+
+    def stand_on_hard_12(decks=1, rules=None, double=True):
+        first, later = build(decks, rules, double)
+        first[12, 0, :] = later[12, 0, :] = 0  # Basic strategy hits hard 12 against most up cards
+        return first, later
+    monkeypatch.setattr(bj_batch, 'build_action_tables', stand_on_hard_12)
+    assert cross_validate(shoes=150, seed=11)
@@ -0,0 +1,32 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from bj_batch import run_batch
+from bj_columns import HandColumns, HandSink
+from bj_core import calculate_score
+
+
+def test_start_total_is_the_first_two_cards(tmp_path):
+    with HandSink(str(tmp_path), chunk_rows=1000) as sink:
+        run_batch(2500, seed=3, sink=sink)
+    columns = HandColumns(str(tmp_path))
+    assert columns.rows == 2500
+    for chunk in columns.chunks(['player_card1', 'player_card2', 'player_cards', 'start_total', 'player_total']):
+        for card1, card2, cards, start, final in zip(*(chunk[name].tolist() for name in
+                                                       ('player_card1', 'player_card2', 'player_cards', 'start_total', 'player_total'))):
+            assert start == calculate_score([card1, card2])
+            if cards == 2:
+                assert final == start
+    groups = columns.aggregate('start_total')
+    assert min(groups) >= 4 and max(groups) <= 21
+    assert sum(totals[0] for totals in groups.values()) == 2500
+
+
+def test_close_keeps_meta_changes(tmp_path):
+    # The last chunk is full, so closing has no chunk left to finish
+    sink = HandSink(str(tmp_path), chunk_rows=500, meta={'seed': None})
+    run_batch(500, seed=9, sink=sink)
+    sink.meta['seed'] = 9
+    sink.close()
+    assert HandColumns(str(tmp_path)).meta == {'seed': 9}
@@ -0,0 +1,82 @@
+import csv
+import json
+import random
+
+import pytest
+
+import bj_history
+from bj_core import CARD_CODES, Hand, settle_hand
+from bj_history import COLUMNS, INDEXES, HandHistory
+
+
+def played_hands(count, seed=4):
+    rng = random.Random(seed)
+    hands = []
+    for number in range(count):
+        cards = rng.sample(range(52), 6)
+        player, dealer = Hand(cards[:rng.choice((2, 3))]), Hand(cards[3:5])
+        bet = rng.choice((5, 10, 25))
+        outcome, payout = settle_hand(player, dealer, bet)
+        actions = 'S' if len(player) == 2 else 'HS'
+        hands.append((1700000000.0 + number, bet, payout, outcome, list(player), list(dealer), actions))
+    return hands
+
+
+def stored_rows(history):
+    history.flush()
+    return history.db.execute(f"SELECT {', '.join(COLUMNS)} FROM hands ORDER BY id").fetchall()
+
+
+def game_rows(tmp_path, hands):
+    history = HandHistory(str(tmp_path / 'game.db'))
+    for played_at, bet, payout, outcome, player, dealer, actions in hands:
+        history.add(bet, payout, outcome, player, dealer, actions, played_at)
+    rows = stored_rows(history)
+    history.close()
+    return rows
+
+
+def imported_rows(tmp_path, log):
+    history = HandHistory(str(tmp_path / 'imported.db'))
+    history.import_log(log)
+    rows = stored_rows(history)
+    indexes = {name for (name,) in history.db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    history.close()
+    assert indexes == set(INDEXES)
+    return rows
+
+
+@pytest.mark.parametrize('codes', [False, True])
+def test_json_log_round_trip(tmp_path, monkeypatch, codes):
+    monkeypatch.setattr(bj_history, 'IMPORT_CHUNK', 64)  # Several chunks, so the indexes are dropped and rebuilt
+    hands = played_hands(500)
+    log = tmp_path / 'hands.jsonl'
+    with open(log, 'w') as f:
+        for played_at, bet, payout, outcome, player, dealer, actions in hands:
+            if codes:
+                player, dealer = [CARD_CODES[c] for c in player], [CARD_CODES[c] for c in dealer]
+            f.write(json.dumps({'time': played_at, 'bet': bet, 'payout': payout, 'outcome': outcome,
+                                'player': player, 'dealer': dealer, 'actions': actions}) + '\n')
+    assert imported_rows(tmp_path, str(log)) == game_rows(tmp_path, hands)
+
+
+def test_csv_log_round_trip(tmp_path):
+    hands = played_hands(200)
+    log = tmp_path / 'hands.csv'
+    with open(log, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['time', 'bet', 'payout', 'outcome', 'player', 'dealer', 'actions'])
+        for played_at, bet, payout, outcome, player, dealer, actions in hands:
+            writer.writerow([played_at, bet, payout, outcome, ' '.join(CARD_CODES[c] for c in player),
+                             ' '.join(map(str, dealer)), actions])
+    assert imported_rows(tmp_path, str(log)) == game_rows(tmp_path, hands)
+
+
+def test_bad_record_names_its_line(tmp_path):
+    log = tmp_path / 'hands.jsonl'
+    log.write_text('{"time": 1, "bet": 10, "payout": 10, "outcome": "win", "player": [1, 2], "dealer": [3, 4]}\n'
+                   '{"time": 2, "bet": 10, "payout": 10, "outcome": "win", "player": ["ZZ"], "dealer": [3, 4]}\n')
+    history = HandHistory(str(tmp_path / 'bad.db'))
+    with pytest.raises(ValueError, match='record 2'):
+        history.import_log(str(log))
+    history.close()
@@ -0,0 +1,33 @@
+from bj_index import MIN_SAMPLES, MIN_TC, STATES, _empty, build_table, settled
+from bj_strategy import load_strategy, table_index
+
+ZERO = -MIN_TC
+
+
+def clear_bucket(totals, n=MIN_SAMPLES * 2):
+    # Every sample says stand +1, hit 0, double -1: no doubt about the best play
+    totals[:] = [n, n * 1.0, 0.0, -n * 1.0, n * 1.0, n * 4.0, n * 1.0]
+
+
+def test_empty_buckets_do_not_hold_up_sampling():
+    sums = _empty()
+    for state in sums:
+        clear_bucket(state[ZERO])
+    assert settled(sums)
+
+
+def test_true_count_zero_is_the_basic_strategy_play():
+    # Standing looks best everywhere in the samples, but the hint at true count 0 wins
+    sums = {up_value: _empty() for up_value in range(1, 11)}
+    for state_sums in sums.values():
+        for buckets in state_sums:
+            for totals in buckets:
+                clear_bucket(totals)
+    table = build_table(sums, dict.fromkeys(sums, 0), decks=1)
+    strategy = load_strategy(1)
+    for score, soft, _ in STATES:
+        for up_points in range(2, 12):
+            index = table_index(score, soft, up_points)
+            for kind in ('first', 'later'):
+                assert table[kind][index][ZERO] == strategy[kind][index]
+                assert table[kind][index][ZERO + 1] == 'Stand'
@@ -0,0 +1,51 @@
+from bj_journal import HandJournal, journal_path, read_journal, write_atomic
+
+
+def play(journal, balances):
+    for balance in balances:
+        journal.append({'kind': 'hand', 'balance': balance})
+
+
+def test_replay_after_a_crash_mid_append(tmp_path):
+    save = str(tmp_path / 'save.json')
+    journal = HandJournal(save, compact_every=3)
+    journal.recover()
+    play(journal, [110, 120, 130])
+    journal.compact({'balance': 130})
+    play(journal, [140, 150])
+    journal.close()  # Everything queued reaches the file, as it would before a crash
+    with open(journal_path(save), 'ab') as f:
+        f.write(b'{"kind":"hand","balance":16')  # The append the crash cut short
+
+    journal = HandJournal(save)
+    snapshot, records = journal.recover()
+    assert snapshot['balance'] == 130 and snapshot['seq'] == 3
+    assert [(r['seq'], r['balance']) for r in records] == [(4, 140), (5, 150)]
+    # The torn record is gone and new records carry on after the last good one
+    assert journal.append({'kind': 'hand', 'balance': 160}) == 6
+    journal.close()
+    records, _ = read_journal(journal_path(save), after=3)
+    assert [r['seq'] for r in records] == [4, 5, 6]
+
+
+def test_replay_skips_records_the_snapshot_already_has(tmp_path):
+    # A crash after the snapshot is renamed into place but before the journal is emptied
+    save = str(tmp_path / 'save.json')
+    journal = HandJournal(save)
+    journal.recover()
+    play(journal, [110, 120, 130, 140])
+    journal.close()
+    write_atomic(save, {'balance': 120, 'seq': 2})
+
+    journal = HandJournal(save)
+    snapshot, records = journal.recover()
+    journal.close()
+    assert snapshot['balance'] == 120
+    assert [r['balance'] for r in records] == [130, 140]
+
+
+def test_recover_without_a_save(tmp_path):
+    journal = HandJournal(str(tmp_path / 'save.json'))
+    assert journal.recover() == (None, [])
+    assert journal.append({'kind': 'hand', 'balance': 100}) == 1
+    journal.close()
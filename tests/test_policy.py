@@ -0,0 +1,25 @@
+from bj_core import VALUES, Hand
+from bj_policy import make_policy
+from bj_rules import Rules
+
+
+def card(value):
+    return VALUES.index(value)
+
+
+def test_basic_follows_the_soft_17_rule():
+    soft_19 = Hand((card('A'), card('8')))
+    assert make_policy('basic', decks=6, rules=Rules(decks=6))(soft_19, card('6'), 100, 'HSD') == 'S'
+    assert make_policy('basic', decks=6, rules=Rules(decks=6, hit_soft_17=True))(soft_19, card('6'), 100, 'HSD') == 'D'
+
+
+def test_basic_surrenders_only_where_offered():
+    hard_16 = Hand((card('10'), card('6')))
+    policy = make_policy('basic', decks=6, rules=Rules(decks=6, surrender=True))
+    assert policy(hard_16, card('10'), 100, 'HSDR') == 'R'
+    assert policy(hard_16, card('10'), 100, 'HSD') == 'H'
+
+
+def test_basic_never_picks_a_move_it_was_not_offered():
+    eleven = Hand((card('5'), card('6')))
+    assert make_policy('basic')(eleven, card('6'), 100, 'HS') == 'H'
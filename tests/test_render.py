@@ -0,0 +1,151 @@
+import io
+import random
+import re
+
+import pytest
+
+from bj_core import Hand, Shoe
+from bj_render import CLEAR_SCREEN, FrameRenderer, _apply_sgr, _char_width
+from bj_rules import Rules
+from bj_view import print_table
+
+_ESCAPE = re.compile(r'\x1b\[([0-9;]*)([A-Za-z])')
+
+
+class Screen:
+    """Just enough of a terminal to follow what the renderer sends: text, colours, cursor moves and erases."""
+
+    def __init__(self):
+        self.cells = {}  # (row, column) -> (char, style)
+        self.row = self.column = 0
+        self.style = (0, 0, 0)
+
+    def write(self, text):
+        pos = 0
+        for match in _ESCAPE.finditer(text):
+            self._text(text[pos:match.start()])
+            self._escape(match.group(1), match.group(2))
+            pos = match.end()
+        self._text(text[pos:])
+
+    def flush(self):
+        pass
+
+    def _text(self, text):
+        for char in text:
+            if char == '\n':
+                self.row += 1
+                self.column = 0
+                continue
+            self.cells[self.row, self.column] = (char, self.style)
+            if _char_width(char) == 2:
+                self.cells[self.row, self.column + 1] = (None, self.style)
+            self.column += _char_width(char)
+
+    def _escape(self, params, command):
+        if command == 'm':
+            self.style = _apply_sgr(self.style, params)
+        elif command == 'H':
+            row, column = (int(n) for n in params.split(';')) if params else (1, 1)
+            self.row, self.column = row - 1, column - 1
+        elif command == 'J':
+            self.cells = {at: cell for at, cell in self.cells.items() if at < (self.row, self.column)}
+            if params == '2':
+                self.cells = {}
+        elif command == 'K':
+            self.cells = {at: cell for at, cell in self.cells.items() if at[0] != self.row or at[1] < self.column}
+
+    def lines(self):
+        """What's on screen, row by row, ignoring trailing blanks and the colour of blank cells."""
+        rows = {}
+        for (row, column), (char, style) in sorted(self.cells.items()):
+            rows.setdefault(row, []).append((column, char, style if char != ' ' else None))
+        lines = []
+        for row in range(max(rows, default=-1) + 1):
+            cells = rows.get(row, [])
+            while cells and cells[-1][1] == ' ':
+                cells.pop()
+            lines.append(cells)
+        while lines and not lines[-1]:
+            lines.pop()
+        return lines
+
+
+def repainted(text):
+    screen = Screen()
+    screen.write(CLEAR_SCREEN + text)
+    return screen.lines()
+
+
+def capture(draw):
+    buffer = io.StringIO()
+    renderer = FrameRenderer(buffer)
+    with renderer.frame():
+        draw()
+    return buffer.getvalue()[len(CLEAR_SCREEN):]
+
+
+def game_frames():
+    """Table screens from a few hands: hits, the dealer's turn, streaks and wide characters."""
+    shoe = Shoe(6)
+    rules = Rules(decks=6)
+    frames = []
+    for streak in range(5):
+        player = Hand((shoe.deal(), shoe.deal()))
+        dealer = Hand((shoe.deal(), shoe.deal()))
+        frames.append((player, dealer, True, 100 + streak, None, streak))
+        player = Hand(player)
+        player.add(shoe.deal())
+        frames.append((player, dealer, True, 100 + streak, None, streak))
+        frames.append((player, dealer, False, 100 + streak, 'Dealer stands', streak))
+    return [capture(lambda frame=frame: print_table(*frame, rules)) for frame in frames]
+
+
+def random_frames(seed, count=30):
+    rng = random.Random(seed)
+    words = ['blackjack', '♠ ♥ ♦ ♣', '🔥 hot', '漢字', 'bust', '21']
+    frames = []
+    for _ in range(count):
+        lines = []
+        for _ in range(rng.randrange(1, 12)):
+            parts = [f"\x1b[{rng.choice((0, 1, 31, 32, 36, 40, 44))}m{rng.choice(words)}" for _ in range(rng.randrange(4))]
+            lines.append(' ' * rng.randrange(6) + ' '.join(parts))
+        frames.append('\n'.join(lines) + '\n')
+    return frames
+
+
+@pytest.mark.parametrize('frames', [game_frames(), random_frames(1), random_frames(2)], ids=['game', 'random1', 'random2'])
+def test_diffed_frames_leave_the_screen_a_repaint_would(frames):
+    screen = Screen()
+    renderer = FrameRenderer(screen, size=(120, 80))
+    for number, text in enumerate(frames):
+        renderer.present(text)
+        assert screen.lines() == repainted(text), f"frame {number}"
+        # The game prints its prompts under each frame
+        screen.write(f"    Your move ({number}): h\n")
+    assert renderer.full_repaints == 1
+
+
+def test_game_frames_send_fewer_bytes_than_repaints():
+    renderer = FrameRenderer(Screen(), size=(120, 80))
+    for text in game_frames():
+        renderer.present(text)
+    assert renderer.total_bytes < renderer.total_raw_bytes / 2
+
+
+def test_unchanged_frame_sends_almost_nothing():
+    text = game_frames()[0]
+    renderer = FrameRenderer(Screen(), size=(120, 80))
+    renderer.present(text)
+    renderer.present(text)
+    assert renderer.last_bytes < 40
+
+
+def test_repaints_when_the_terminal_is_too_small():
+    text = game_frames()[0]
+    screen = Screen()
+    renderer = FrameRenderer(screen, size=(120, 20))
+    renderer.present(text)
+    renderer.present(text)
+    assert renderer.full_repaints == 2
+    assert screen.lines() == repainted(text)
@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+from bj_stats import Stats, result_for
+
+
+def play(amounts):
+    stats = Stats()
+    for amount in amounts:
+        stats.update(result_for(amount), amount)
+    return stats
+
+
+def assert_same(merged, sequential):
+    merged, sequential = merged.to_dict(), sequential.to_dict()
+    for key in ('mean', 'm2'):
+        assert merged.pop(key) == pytest.approx(sequential.pop(key))
+    assert merged == sequential
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_merge_equals_a_sequential_run(seed):
+    rng = random.Random(seed)
+    # Few distinct amounts and short pieces, so streaks often run across the joins
+    amounts = [rng.choice((-20, -10, 0, 10, 15, 20)) for _ in range(rng.randrange(1, 300))]
+    cuts = sorted(rng.sample(range(len(amounts) + 1), min(len(amounts) + 1, rng.randrange(1, 12))))
+    pieces = [amounts[start:end] for start, end in zip([0] + cuts, cuts + [len(amounts)])]
+    merged = Stats()
+    for piece in pieces:
+        merged.merge(play(piece))
+    assert_same(merged, play(amounts))
+
+
+@pytest.mark.parametrize('amounts', [
+    [10, 10, 10, 10],     # One winning streak split in every piece
+    [-10, -10, 10, -10],  # A losing streak broken by a win
+    [10, 0, 10, 10],      # A push ends the streak
+    [-10, -10, -10, 10],
+])
+def test_merge_streaks(amounts):
+    for split in range(len(amounts) + 1):
+        merged = play(amounts[:split])
+        merged.merge(play(amounts[split:]))
+        assert_same(merged, play(amounts))